@@ -0,0 +1,68 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management import BaseCommand
+from pydantic import ValidationError
+
+from bot.tg.dc import GetUpdatesResponse, UpdateObj
+from bot.tg.updates import decode_updates
+
+RECORDED_PAYLOAD = Path(__file__).resolve().parents[2] / 'tg' / 'payloads' / 'get_updates.json'
+
+
+class Command(BaseCommand):
+    """Compares getUpdates decoding by the pydantic models of bot.tg.dc and by bot.tg.updates"""
+    help = 'Reports microseconds per getUpdates payload for both decoders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payload', default=str(RECORDED_PAYLOAD), help='Recorded getUpdates response')
+        parser.add_argument('--repeat', type=int, default=2000)
+
+    @staticmethod
+    def measure(decode, raw: str, repeat: int) -> float:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            decode(raw)
+        return (time.perf_counter() - started) / repeat * 1_000_000
+
+    @staticmethod
+    def decode_pydantic(raw: str) -> None:
+        for item in GetUpdatesResponse(**json.loads(raw)).result:
+            item.message.chat.id, item.message.text
+
+    @staticmethod
+    def decode_lean(raw: str) -> None:
+        for item in decode_updates(json.loads(raw)).result:
+            if item.message:
+                item.message.chat.id, item.message.text
+
+    def handle(self, *args, **options) -> None:
+        payload: dict = json.loads(Path(options['payload']).read_text())
+        updates: list[dict] = payload['result']
+        try:
+            GetUpdatesResponse(**payload)
+        except ValidationError as error:
+            self.stdout.write(f'pydantic models reject the payload: {len(error.errors())} errors')
+
+        # pydantic is measured on the updates it accepts, so both decoders do the same work
+        accepted: list[dict] = []
+        for item in updates:
+            try:
+                UpdateObj(**item)
+            except ValidationError:
+                continue
+            accepted.append(item)
+        subset: str = json.dumps({**payload, 'result': accepted})
+        self.stdout.write(f'{len(accepted)} of {len(updates)} updates are accepted by pydantic models')
+
+        repeat: int = options['repeat']
+        json_only: float = self.measure(json.loads, subset, repeat)
+        pydantic: float = self.measure(self.decode_pydantic, subset, repeat)
+        lean: float = self.measure(self.decode_lean, subset, repeat)
+        lean_whole: float = self.measure(self.decode_lean, json.dumps(payload), repeat)
+
+        self.stdout.write(f'{"us per payload":<24}{"pydantic":>10}{"lean":>10}')
+        self.stdout.write(f'{"json.loads only":<24}{json_only:>10.1f}{json_only:>10.1f}')
+        self.stdout.write(f'{"accepted updates":<24}{pydantic:>10.1f}{lean:>10.1f}')
+        self.stdout.write(f'{"whole payload":<24}{"-":>10}{lean_whole:>10.1f}')
@@ -0,0 +1,10 @@
+from django.core.management import BaseCommand
+
+from bot.verification import purge_codes
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired Telegram verification codes'
+
+    def handle(self, *args, **options) -> None:
+        self.stdout.write(f'{purge_codes()} codes deleted')
@@ -1,34 +1,44 @@
+import asyncio
 import logging
 import os
-from skypro.settings import env
+import socket
+import threading
+import time
 from datetime import datetime
-from enum import Enum, auto
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import QuerySet
 from pydantic import BaseModel
 
 from bot.models import TgUser
-from bot.tg.client import TgClient
-from bot.tg.data_storage import BotDataStorage
-
-from bot.tg.dc import Message
-from goals.models import Goal, GoalCategory, BoardParticipant
+from bot.tg import metrics
+from bot.tg.async_runner import AsyncBotRunner
+from bot.tg.client import get_tg_client
+from bot.tg.bot_data import StateEnum, get_storage
+from bot.tg.coordinator import OffsetLease, ShardWorker, UpdatePoller
+from bot.tg.db_storage import DbDataStorage
+from bot.tg.housekeeping import Housekeeper
+
+from bot.tg.updates import Message
+from bot.tg.outbox import get_outbox
+from bot.tg.paging import chunk_lines, read_page
+from bot.tg.user_cache import resolve_tg_user
+from bot.verification import issue_code
+from goals.models import Goal, GoalCategory
+from goals.services import DuplicateGoalTitle, GoalCreateError, create_goal
 
 logger = logging.getLogger(__name__)
 
-
-class StateEnum(Enum):
-    """Класс для выбора состояния:
-    - до выбора категории
-    - после выбора категории"""
-    CREATE_CATEGORY_SELECT = auto()
-    CHOSEN_CATEGORY = auto()
+LIST_PAGE_SIZE = 50
 
 
 class NewGoal(BaseModel):
     """Класс модели для создания новой цели"""
     category_id: int | None = None
     goal_title: str | None = None
+    category_ids: list[int] = []
 
     @property
     def is_completed(self) -> bool:
@@ -40,101 +50,124 @@ class Command(BaseCommand):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.tg_client = TgClient(env.str('TG_TOKEN'))
-        self.storage = BotDataStorage()
+        self.tg_client = get_tg_client()
+        self.storage = get_storage()
+        self.outbox = get_outbox()
 
-    @staticmethod
-    def _generate_verification_code() -> str:
-        """Generates verification code"""
-        return os.urandom(12).hex()
+    def send_message(self, chat_id: int, text: str) -> None:
+        """Queues the message to the outbox once the handler's transaction commits,
+        handlers never wait for Telegram"""
+        transaction.on_commit(lambda: self.outbox.send_message(chat_id, text))
 
     def handle_unverified_user(self, msg: Message, tg_user: TgUser):
         """Generates code for unidentified users and sends it to user"""
-        code: str = self._generate_verification_code()
-        tg_user.verification_code = code
-        tg_user.save(update_fields=('verification_code',))
-        self.tg_client.send_message(
-            chat_id=msg.chat.id, text=f'[verification code] {tg_user.verification_code}')
+        code: str | None = issue_code(tg_user)
+        if code is None:
+            self.send_message(chat_id=msg.chat.id, text='[too many verification codes, try later]')
+        else:
+            self.send_message(chat_id=msg.chat.id, text=f'[verification code] {code}')
+
+    def send_list_page(self, msg: Message, queryset: QuerySet, command: str, empty: str, header: str = '',
+                       ids_key: str | None = None) -> None:
+        """Sends a page of the list after the cursor kept in chat's data, "/<command> next" continues the list.
+        With ids_key the listed ids are added to the list kept in chat's data under that key"""
+        cursor_key: str = f'{command}_cursor'
+        data: dict = self.storage.get_data(msg.chat.id)
+        if msg.text == f'/{command} next':
+            after: int | None = data.get(cursor_key)
+            if after is None:
+                self.send_message(msg.chat.id, '[No more items]')
+                return
+        else:
+            after = 0
+
+        rows, cursor = read_page(queryset, after=after, size=LIST_PAGE_SIZE)
+        changes: dict = {cursor_key: cursor}
+        if ids_key:
+            changes[ids_key] = [*data.get(ids_key, []), *(row_id for row_id, _ in rows)]
+        self.storage.update_data(chat_id=msg.chat.id, **changes)
+        lines: list[str] = [f'{row_id} {title}' for row_id, title in rows]
+        if not lines:
+            self.send_message(msg.chat.id, empty)
+            return
+        if header:
+            lines.insert(0, header)
+        if cursor:
+            lines.append(f'[/{command} next]')
+        for text in chunk_lines(lines):
+            self.send_message(msg.chat.id, text)
 
     def handle_goals_list(self, msg: Message, tg_user: TgUser) -> None:
         """Gets goals list"""
-        resp_goals: list[str] = [
-            f'{goal.id} {goal.title}'
-            for goal in Goal.objects.filter(user_id=tg_user.user,
-                                            status__in=(1, 2, 3)
-                                            ).order_by('created')
-        ]
-        if resp_goals:
-            self.tg_client.send_message(msg.chat.id, '\n'.join(resp_goals))
-        else:
-            self.tg_client.send_message(msg.chat.id, '[No visible goals]')
+        self.send_list_page(msg, Goal.objects.filter(user_id=tg_user.user, status__in=(1, 2, 3)),
+                            command='goals', empty='[No visible goals]')
 
     def handle_goal_categories_list(self, msg: Message, tg_user: TgUser) -> None:
-        """Gets categories list"""
-        resp_categories: list[str] = [
-            f'{category.id} {category.title}'
-            for category in GoalCategory.objects.filter(
-                board__participants__user_id=tg_user.user, is_deleted=False)
-        ]
-        if resp_categories:
-            self.tg_client.send_message(msg.chat.id, 'Select category\n' + '\n'.join(resp_categories))
+        """Gets categories list. While a goal is created only writable categories are listed,
+        their ids are kept in chat's data for the selection step"""
+        if self.storage.get_state(msg.chat.id) == StateEnum.CREATE_CATEGORY_SELECT:
+            self.send_list_page(msg, GoalCategory.objects.writable_by(tg_user.user), command='categories',
+                                empty='[You have no categories]', header='Select category', ids_key='category_ids')
         else:
-            self.tg_client.send_message(msg.chat.id, '[You have no categories]')
+            self.send_list_page(msg, GoalCategory.objects.visible_to(tg_user.user),
+                                command='categories', empty='[You have no categories]', header='Select category')
 
     def handle_save_selected_category(self, msg: Message, tg_user: TgUser) -> None:
         """Gets and validates chosen category"""
         if msg.text.isdigit():
             category_id = int(msg.text)
-            if GoalCategory.objects.filter(
-                    board__participants__user_id=tg_user.user,
-                    board__participants__role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-                    is_deleted=False,
-                    id=category_id
-            ).exists():
-                self.storage.update_data(tg_chat_id=msg.chat.id, category_id=category_id)
-                self.tg_client.send_message(msg.chat.id, '[set title]')
+            if category_id in NewGoal(**self.storage.get_data(msg.chat.id)).category_ids:
+                self.storage.update_data(chat_id=msg.chat.id, category_id=category_id)
+                self.send_message(msg.chat.id, '[set title]')
                 self.storage.set_state(msg.chat.id, state=StateEnum.CHOSEN_CATEGORY)
             else:
-                self.tg_client.send_message(msg.chat.id, '[category not found]')
+                self.send_message(msg.chat.id, '[category not found]')
         else:
-            self.tg_client.send_message(msg.chat.id, '[Invalid category id]')
+            self.send_message(msg.chat.id, '[Invalid category id]')
 
     def handle_save_new_category(self, msg: Message, tg_user: TgUser) -> None:
         """Creates new goal"""
         goal = NewGoal(**self.storage.get_data(tg_user.tg_chat_id))
         goal.goal_title = msg.text
-        if goal.is_completed:
-            Goal.objects.create(
-                title=goal.goal_title,
-                category_id=goal.category_id,
-                user_id=tg_user.user,
-                due_date=datetime.now()
-            )
-            self.tg_client.send_message(msg.chat.id, '[New goal created]')
+        if not goal.is_completed:
+            self.send_message(msg.chat.id, '[An error occurred]')
         else:
-            self.tg_client.send_message(msg.chat.id, '[An error occurred]')
+            try:
+                create_goal(tg_user.user, goal.category_id, title=goal.goal_title, due_date=datetime.now())
+            except DuplicateGoalTitle:
+                self.send_message(msg.chat.id, '[Goal with this title already exists, set another title]')
+                return
+            except GoalCreateError:
+                self.send_message(msg.chat.id, '[category not found]')
+            else:
+                self.send_message(msg.chat.id, '[New goal created]')
         self.storage.reset(tg_user.tg_chat_id)
 
-    def handle_verified_user(self, msg: Message, tg_user: TgUser) -> None:
-        """Works with identified users
-        /goals -> goals list
-        /categories -> categories list
+    def handle_verified_user(self, msg: Message, tg_user: TgUser) -> str:
+        """Works with identified users, returns the handled command for metrics
+        /goals -> goals list, /goals next -> next page
+        /categories -> categories list, /categories next -> next page
         /create -> creates new goal
         /cancel -> cancels operation"""
-        if msg.text == '/goals':
+        if msg.text in ('/goals', '/goals next'):
             self.handle_goals_list(msg=msg, tg_user=tg_user)
-        elif msg.text == '/categories':
+            return '/goals'
+        elif msg.text in ('/categories', '/categories next'):
             self.handle_goal_categories_list(msg=msg, tg_user=tg_user)
+            return '/categories'
         elif msg.text == '/create':
-            self.handle_goal_categories_list(msg=msg, tg_user=tg_user)
             self.storage.set_state(msg.chat.id, state=StateEnum.CREATE_CATEGORY_SELECT)
             self.storage.set_data(msg.chat.id, data=NewGoal().dict())
+            self.handle_goal_categories_list(msg=msg, tg_user=tg_user)
+            return '/create'
 
         elif msg.text == '/cancel' and self.storage.get_state(tg_user.tg_chat_id):
             self.storage.reset(tg_user.tg_chat_id)
-            self.tg_client.send_message(msg.chat.id, '[Canceled]')
+            self.send_message(msg.chat.id, '[Canceled]')
+            return '/cancel'
         elif msg.text.startswith('/'):
-            self.tg_client.send_message(msg.chat.id, '[unknown command]')
+            self.send_message(msg.chat.id, '[unknown command]')
+            return 'unknown'
 
         elif state := self.storage.get_state(tg_user.tg_chat_id):
             match state:
@@ -144,25 +177,76 @@ class Command(BaseCommand):
                     self.handle_save_new_category(msg, tg_user)
                 case _:
                     logger.warning('invalid state: %s', state)
+            return state.name.lower()
+        return 'text'
 
     def handle_message(self, msg: Message) -> None:
-        """Checks user verified or not"""
-        tg_user, _ = TgUser.objects.select_related('user').get_or_create(
-            tg_chat_id=msg.chat.id,
-            defaults={
-                'tg_user_name': msg.from_.username,
-            }
-        )
-        if tg_user.user:
-            self.handle_verified_user(msg=msg, tg_user=tg_user)
-        else:
-            self.handle_unverified_user(msg=msg, tg_user=tg_user)
+        """Checks user verified or not, records handler latency, its database time and the update's age"""
+        if msg.date:
+            metrics.update_age.observe(max(time.time() - msg.date, 0))
+        timer = metrics.QueryTimer()
+        started: float = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            tg_user: TgUser = resolve_tg_user(msg.chat.id, msg.from_.username or '')
+            if tg_user.user:
+                command: str = self.handle_verified_user(msg=msg, tg_user=tg_user)
+            else:
+                self.handle_unverified_user(msg=msg, tg_user=tg_user)
+                command = 'unverified'
+        metrics.handler_latency.observe(time.perf_counter() - started, command=command)
+        metrics.handler_db_time.observe(timer.seconds, command=command)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--async', action='store_true', dest='async_mode',
+                            help='Handle chats concurrently on asyncio runner')
+        parser.add_argument('--workers', type=int, default=8, help='Handler threads of asyncio runner')
+        parser.add_argument('--coordinated', action='store_true',
+                            help='Share offset and inbox with other replicas through the database')
+        parser.add_argument('--shard', type=int, default=0, help='Chats with chat_id %% shards == shard are handled')
+        parser.add_argument('--shards', type=int, default=1, help='Number of coordinated replicas')
+        parser.add_argument('--metrics-port', type=int, default=settings.BOT_METRICS_PORT,
+                            help='Serve Prometheus metrics on 127.0.0.1:<port>/metrics, 0 disables')
+
+    def start_metrics(self, port: int) -> metrics.MetricsServer:
+        metrics.REGISTRY.register(metrics.Gauge('bot_outbox_depth', 'Messages waiting in the outbox',
+                                                lambda: self.outbox.depth))
+        return metrics.MetricsServer(port=port).start()
+
+    def run_coordinated(self, shard: int, shards: int) -> None:
+        """Every replica competes for polling and handles chats of its shard only,
+        so one chat's updates are handled by one process in order.
+        Chat states must roll back with a failed handler's savepoint, so they are kept in the database"""
+        if not 0 <= shard < shards:
+            raise CommandError('--shard must be in [0, --shards)')
+        if not isinstance(self.storage, DbDataStorage):
+            raise CommandError('--coordinated needs BOT_STORAGE_BACKEND=bot.tg.db_storage.DbDataStorage')
+        stop = threading.Event()
+        poller = UpdatePoller(self.tg_client, OffsetLease(f'{socket.gethostname()}:{os.getpid()}'), shards=shards)
+        threading.Thread(target=poller.run, args=(stop,), name='bot-poller', daemon=True).start()
+        try:
+            ShardWorker(self.handle_message, shard=shard).run(stop)
+        finally:
+            stop.set()
 
     def handle(self, *args, **options) -> None:
         """Checks chats updates"""
+        if options.get('metrics_port'):
+            self.start_metrics(options['metrics_port'])
+        Housekeeper(self.storage).start()
+        if options.get('coordinated'):
+            self.run_coordinated(options['shard'], options['shards'])
+            return
+        if options.get('async_mode'):
+            runner = AsyncBotRunner(self.tg_client, self.handle_message, workers=options['workers'])
+            metrics.REGISTRY.register(metrics.Gauge('bot_pending_updates', 'Updates dispatched but not handled',
+                                                    lambda: len(runner.pending)))
+            asyncio.run(runner.run())
+            return
+
         offset: int = 0
         while True:
             res = self.tg_client.get_updates(offset=offset)
             for item in res.result:
                 offset = item.update_id + 1
-                self.handle_message(msg=item.message)
+                if item.message:
+                    self.handle_message(msg=item.message)
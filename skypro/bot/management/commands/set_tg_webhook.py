@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from bot.tg.client import get_tg_client
+
+
+class Command(BaseCommand):
+    """Switches the bot to webhook mode, runbot must not run at the same time"""
+    help = 'Registers <url>/bot/webhook with TG_WEBHOOK_SECRET, empty url returns the bot to polling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Public url of the API, e.g. https://example.com')
+
+    def handle(self, *args, **options) -> None:
+        url: str = options['url'] and f"{options['url'].rstrip('/')}/bot/webhook"
+        self.stdout.write(str(get_tg_client().set_webhook(url, settings.TG_WEBHOOK_SECRET)))
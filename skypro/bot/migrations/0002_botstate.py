@@ -0,0 +1,26 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotState',
+            fields=[
+                ('chat_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='tg chat_id')),
+                ('state', models.PositiveSmallIntegerField(null=True, verbose_name='state')),
+                ('data', models.JSONField(default=dict, verbose_name='data')),
+                ('updated', models.DateTimeField(auto_now=True, db_index=True, verbose_name='updated')),
+            ],
+            options={
+                'verbose_name': 'BotState',
+                'verbose_name_plural': 'BotStates',
+            },
+        ),
+    ]
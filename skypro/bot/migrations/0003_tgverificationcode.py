@@ -0,0 +1,37 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0002_botstate'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='tguser',
+            name='verification_code',
+        ),
+        migrations.CreateModel(
+            name='TgVerificationCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code_hash', models.CharField(max_length=64, unique=True, verbose_name='code hash')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='expires at')),
+                ('used_at', models.DateTimeField(null=True, verbose_name='used at')),
+                ('tg_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='verification_codes', to='bot.tguser', verbose_name='tg user')),
+            ],
+            options={
+                'verbose_name': 'TgVerificationCode',
+                'verbose_name_plural': 'TgVerificationCodes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tgverificationcode',
+            index=models.Index(fields=['tg_user', 'created'], name='tg_code_user_created_idx'),
+        ),
+    ]
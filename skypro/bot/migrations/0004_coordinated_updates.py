@@ -0,0 +1,45 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0003_tgverificationcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotOffset',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='name')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='offset')),
+                ('lease_owner', models.CharField(blank=True, default='', max_length=128, verbose_name='lease owner')),
+                ('lease_expires', models.DateTimeField(null=True, verbose_name='lease expires')),
+            ],
+            options={
+                'verbose_name': 'BotOffset',
+                'verbose_name_plural': 'BotOffsets',
+            },
+        ),
+        migrations.CreateModel(
+            name='BotUpdate',
+            fields=[
+                ('update_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='update id')),
+                ('chat_id', models.BigIntegerField(verbose_name='tg chat_id')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='shard')),
+                ('message', models.JSONField(verbose_name='message')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('handled_at', models.DateTimeField(db_index=True, null=True, verbose_name='handled at')),
+            ],
+            options={
+                'verbose_name': 'BotUpdate',
+                'verbose_name_plural': 'BotUpdates',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='botupdate',
+            index=models.Index(condition=models.Q(('handled_at__isnull', True)), fields=['shard', 'update_id'], name='bot_update_pending_idx'),
+        ),
+    ]
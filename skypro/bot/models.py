@@ -13,4 +13,69 @@ class TgUser(models.Model):
     tg_chat_id = models.PositiveIntegerField(verbose_name='tg chat_id', unique=True)
     tg_user_name = models.CharField(verbose_name='tg username', max_length=256, default=None)
     user = models.ForeignKey(User, verbose_name='user', on_delete=models.PROTECT, null=True, db_column='user')
-    verification_code = models.CharField(max_length=32, null=True)
+
+
+class TgVerificationCode(models.Model):
+    """Single-use code linking a chat to an account, only sha256 of the code is stored"""
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'TgVerificationCode'
+        verbose_name_plural = 'TgVerificationCodes'
+        indexes = [
+            models.Index(fields=('tg_user', 'created'), name='tg_code_user_created_idx'),
+        ]
+
+    tg_user = models.ForeignKey(TgUser, verbose_name='tg user', on_delete=models.CASCADE,
+                                related_name='verification_codes')
+    code_hash = models.CharField(verbose_name='code hash', max_length=64, unique=True)
+    created = models.DateTimeField(verbose_name='created', auto_now_add=True)
+    expires_at = models.DateTimeField(verbose_name='expires at', db_index=True)
+    used_at = models.DateTimeField(verbose_name='used at', null=True)
+
+
+class BotState(models.Model):
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'BotState'
+        verbose_name_plural = 'BotStates'
+
+    chat_id = models.BigIntegerField(verbose_name='tg chat_id', primary_key=True)
+    state = models.PositiveSmallIntegerField(verbose_name='state', null=True)
+    data = models.JSONField(verbose_name='data', default=dict)
+    updated = models.DateTimeField(verbose_name='updated', auto_now=True, db_index=True)
+
+
+class BotOffset(models.Model):
+    """getUpdates offset shared by bot replicas, only the lease owner polls Telegram"""
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'BotOffset'
+        verbose_name_plural = 'BotOffsets'
+
+    name = models.CharField(verbose_name='name', max_length=64, primary_key=True)
+    offset = models.BigIntegerField(verbose_name='offset', default=0)
+    lease_owner = models.CharField(verbose_name='lease owner', max_length=128, blank=True, default='')
+    lease_expires = models.DateTimeField(verbose_name='lease expires', null=True)
+
+
+class BotUpdate(models.Model):
+    """Inbox of polled messages, the shard's worker handles its rows in update_id order"""
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'BotUpdate'
+        verbose_name_plural = 'BotUpdates'
+        indexes = [
+            models.Index(fields=('shard', 'update_id'), condition=models.Q(handled_at__isnull=True),
+                         name='bot_update_pending_idx'),
+        ]
+
+    update_id = models.BigIntegerField(verbose_name='update id', primary_key=True)
+    chat_id = models.BigIntegerField(verbose_name='tg chat_id')
+    shard = models.PositiveSmallIntegerField(verbose_name='shard')
+    message = models.JSONField(verbose_name='message')
+    created = models.DateTimeField(verbose_name='created', auto_now_add=True)
+    handled_at = models.DateTimeField(verbose_name='handled at', null=True, db_index=True)
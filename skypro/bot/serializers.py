@@ -1,8 +1,8 @@
-from django.db.models import QuerySet
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from bot.models import TgUser
+from bot.verification import consume_code
 
 
 class TgUserSerializer(serializers.ModelSerializer):
@@ -15,7 +15,7 @@ class TgUserSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs: dict):
         verification_code: str = attrs.get('verification_code')
-        tg_user: QuerySet = TgUser.objects.filter(verification_code=verification_code).first()
+        tg_user: TgUser | None = consume_code(verification_code)
 
         if not tg_user:
             raise ValidationError('Invalid verification code')
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from bot.models import TgUser, TgVerificationCode
+from bot.tg.user_cache import tg_user_cache
+
+
+@receiver([post_save, post_delete], sender=TgUser)
+def invalidate_tg_user(sender, instance: TgUser, **kwargs) -> None:
+    tg_user_cache.invalidate(instance.tg_chat_id)
+
+
+@receiver(post_save, sender=TgVerificationCode)
+def invalidate_tg_user_on_new_code(sender, instance: TgVerificationCode, created: bool, **kwargs) -> None:
+    if created:
+        tg_user_cache.invalidate(instance.tg_user.tg_chat_id)
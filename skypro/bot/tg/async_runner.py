@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+
+from django.db import close_old_connections
+
+from .client import TgClient
+from .dc import SendMessagesResponse
+from .updates import Message, UpdatesResponse
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTgClient:
+    """Awaitable facade over TgClient, HTTP calls run in their own small thread pool
+    so a long poll never occupies the handlers' pool"""
+
+    def __init__(self, client: TgClient, max_connections: int = 4):
+        self.client = client
+        self.executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='tg-http')
+
+    async def get_updates(self, offset: int = 0, timeout: int = 60) -> UpdatesResponse:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(self.client.get_updates, offset, timeout))
+
+    async def send_message(self, chat_id: int, text: str) -> SendMessagesResponse:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(self.client.send_message, chat_id, text))
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+class AsyncBotRunner:
+    """Polls updates on the event loop and runs the handler in a bounded thread pool.
+    Messages of different chats are handled concurrently, messages of one chat - in order"""
+
+    def __init__(self, client: TgClient, handler: Callable[[Message], None], workers: int = 8,
+                 poll_timeout: int = 60, max_pending: int = 1000):
+        self.client = AsyncTgClient(client)
+        self.handler = handler
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bot-handler')
+        self.poll_timeout = poll_timeout
+        self.max_pending = max_pending
+        self.offset: int = 0
+        self.received: int = 0
+        self.pending: set[asyncio.Task] = set()
+        self.chat_tails: dict[int, asyncio.Task] = {}
+
+    def _handle(self, msg: Message) -> None:
+        """Runs in the handlers' pool, ORM connections are per thread"""
+        close_old_connections()
+        try:
+            self.handler(msg)
+        except Exception:
+            logger.exception('failed to handle message %s in chat %s', msg.message_id, msg.chat.id)
+        finally:
+            close_old_connections()
+
+    async def _handle_after(self, previous: asyncio.Task | None, msg: Message) -> None:
+        if previous:
+            await asyncio.wait([previous])
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._handle, msg)
+
+    def _forget(self, chat_id: int, task: asyncio.Task) -> None:
+        self.pending.discard(task)
+        if self.chat_tails.get(chat_id) is task:
+            del self.chat_tails[chat_id]
+
+    def dispatch(self, msg: Message) -> asyncio.Task:
+        """Chains message handling after the previous message of the same chat"""
+        chat_id: int = msg.chat.id
+        task = asyncio.create_task(self._handle_after(self.chat_tails.get(chat_id), msg))
+        self.chat_tails[chat_id] = task
+        self.pending.add(task)
+        task.add_done_callback(partial(self._forget, chat_id))
+        return task
+
+    async def drain(self) -> None:
+        """Waits until every dispatched message is handled"""
+        while self.pending:
+            await asyncio.wait(list(self.pending))
+
+    async def run(self, max_updates: int | None = None) -> None:
+        """Polls until max_updates are received or forever"""
+        try:
+            while max_updates is None or self.received < max_updates:
+                if len(self.pending) >= self.max_pending:
+                    await asyncio.wait(list(self.pending), return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                res = await self.client.get_updates(offset=self.offset, timeout=self.poll_timeout)
+                for item in res.result:
+                    self.offset = item.update_id + 1
+                    self.received += 1
+                    if item.message:
+                        self.dispatch(item.message)
+            await self.drain()
+        finally:
+            self.client.close()
+            self.executor.shutdown(wait=True)
@@ -1,8 +1,24 @@
 from abc import ABC, abstractmethod
-from enum import Enum
+from enum import Enum, auto
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class StateEnum(Enum):
+    """Класс для выбора состояния:
+    - до выбора категории
+    - после выбора категории"""
+    CREATE_CATEGORY_SELECT = auto()
+    CHOSEN_CATEGORY = auto()
 
 
 class Storage(ABC):
+    @classmethod
+    def from_settings(cls) -> 'Storage':
+        """Creates storage configured by BOT_STORAGE_* settings"""
+        return cls(ttl=settings.BOT_STORAGE_TTL)
+
     @abstractmethod
     def get_state(self, chat_id: int) -> Enum | None:
         """Checks chat's state"""
@@ -32,3 +48,12 @@ class Storage(ABC):
     def update_data(self, chat_id: int, **kwargs) -> None:
         """Updates exists chats data"""
         raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        """Removes chats idle longer than ttl, returns number of removed chats"""
+        return 0
+
+
+def get_storage() -> Storage:
+    """Creates storage of BOT_STORAGE_BACKEND class"""
+    return import_string(settings.BOT_STORAGE_BACKEND).from_settings()
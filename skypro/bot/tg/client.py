@@ -1,31 +1,122 @@
+import logging
+import time
+from functools import lru_cache
+
 import requests
+from django.conf import settings
 from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from . import metrics
+from .dc import SendMessagesResponse
+from .updates import UpdatesResponse, decode_updates
 
-from .dc import GetUpdatesResponse, SendMessagesResponse
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
 
 
 class TgClient:
-    def __init__(self, token: str):
+    def __init__(self, token: str, api_url: str = 'https://api.telegram.org', pool_size: int = 10,
+                 timeout: float = 10, max_retries: int = 3, backoff: float = 0.5):
         self.token = token
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def get_url(self, method: str) -> str:
         """
         Returns url to TG bot in str format with requested method
         """
-        return f'https://api.telegram.org/bot{self.token}/{method}'
+        return f'{self.api_url}/bot{self.token}/{method}'
+
+    def _retry_delay(self, response: Response | None, attempt: int) -> float:
+        """Seconds to wait before the next attempt, retry_after of the API wins over backoff"""
+        if response is not None:
+            try:
+                retry_after = response.json().get('parameters', {}).get('retry_after')
+            except ValueError:
+                retry_after = response.headers.get('Retry-After')
+            if retry_after is not None:
+                return float(retry_after)
+        return self.backoff * 2 ** attempt
+
+    @staticmethod
+    def _not_sent(error: requests.RequestException) -> bool:
+        """True when the request failed before reaching the API, so resending it can't repeat it"""
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def _request(self, http_method: str, method: str, read_timeout: float,
+                 retry_statuses: frozenset = RETRY_STATUSES, **kwargs) -> dict:
+        """
+        Requests TG bot over the pooled session, retries connection errors and retry_statuses.
+        A POST may have been handled when its response is lost, so it is retried only when it was not sent
+        """
+        url: str = self.get_url(method)
+        with metrics.api_latency.time(method=method):
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response: Response = self.session.request(http_method, url,
+                                                              timeout=(self.timeout, read_timeout), **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    metrics.api_requests.inc(method=method, status='error')
+                    if attempt == self.max_retries or (http_method != 'GET' and not self._not_sent(e)):
+                        raise
+                    response = None
+                else:
+                    metrics.api_requests.inc(method=method, status=response.status_code)
+                    if response.status_code not in retry_statuses or attempt == self.max_retries:
+                        return response.json()
+
+                delay: float = self._retry_delay(response, attempt)
+                logger.warning('%s failed, retry in %s s', method, delay)
+                time.sleep(delay)
 
-    def get_updates(self, offset: int = 0, timeout: int = 60) -> GetUpdatesResponse:
+    def get_updates(self, offset: int = 0, timeout: int = 60) -> UpdatesResponse:
         """
         Requests TG bot with getUpdates
         """
-        url: str = self.get_url(method='getUpdates')
-        response: Response = requests.get(url, params={'offset': offset, 'timeout': timeout})
-        return GetUpdatesResponse(**response.json())
+        data: dict = self._request('GET', 'getUpdates', read_timeout=timeout + self.timeout,
+                                   params={'offset': offset, 'timeout': timeout})
+        return decode_updates(data)
+
+    def send_message(self, chat_id: int, text: str, retry_throttled: bool = True) -> SendMessagesResponse:
+        """
+        Requests TG bot with sendMessage, retry_throttled=False returns 429 responses to the caller
+        """
+        retry_statuses: frozenset = RETRY_STATUSES if retry_throttled else RETRY_STATUSES - {429}
+        data: dict = self._request('POST', 'sendMessage', read_timeout=self.timeout, retry_statuses=retry_statuses,
+                                   json={'chat_id': chat_id, 'text': text})
+        return SendMessagesResponse(**data)
 
-    def send_message(self, chat_id: int, text: str) -> SendMessagesResponse:
+    def set_webhook(self, url: str, secret_token: str) -> dict:
         """
-        Requests TG bot with sendMessage
+        Requests TG bot with setWebhook, empty url removes webhook
         """
-        url: str = self.get_url('sendMessage')
-        response: Response = requests.post(url, json={'chat_id': chat_id, 'text': text})
-        return SendMessagesResponse(**response.json())
+        return self._request('POST', 'setWebhook', read_timeout=self.timeout,
+                             json={'url': url, 'secret_token': secret_token})
+
+    def close(self) -> None:
+        self.session.close()
+
+
+@lru_cache(maxsize=None)
+def get_tg_client() -> TgClient:
+    """Process-wide client sharing one connection pool"""
+    return TgClient(
+        settings.TG_TOKEN,
+        api_url=settings.TG_API_URL,
+        pool_size=settings.TG_POOL_SIZE,
+        timeout=settings.TG_TIMEOUT,
+        max_retries=settings.TG_MAX_RETRIES,
+    )
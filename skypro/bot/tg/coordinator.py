@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Callable
+
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from bot.models import BotOffset, BotUpdate
+from .client import TgClient
+from .updates import Message, Update
+
+logger = logging.getLogger(__name__)
+
+LEASE_TTL = 60
+POLL_TIMEOUT = 25
+IDLE_DELAY = 0.5
+# seconds a shard worker backs off after a failed batch, e.g. a dropped connection or lock timeout
+ERROR_DELAY = 5
+PURGE_INTERVAL = 60 * 60
+HANDLED_RETENTION = timedelta(days=1)
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class OffsetLease:
+    """getUpdates offset kept in the database. Replicas compete for a lease on the row,
+    only the owner polls Telegram, so an update is fetched by one replica"""
+
+    def __init__(self, owner: str, ttl: int = LEASE_TTL, name: str = 'default'):
+        self.owner = owner
+        self.ttl = ttl
+        self.name = name
+
+    def acquire(self) -> int | None:
+        """Takes or renews the lease, returns the offset to poll from or None if another replica owns it"""
+        BotOffset.objects.get_or_create(name=self.name)
+        now = timezone.now()
+        acquired: int = BotOffset.objects.filter(
+            Q(lease_owner=self.owner) | Q(lease_expires__isnull=True) | Q(lease_expires__lt=now),
+            name=self.name,
+        ).update(lease_owner=self.owner, lease_expires=now + timedelta(seconds=self.ttl))
+        if not acquired:
+            return None
+        return BotOffset.objects.values_list('offset', flat=True).get(name=self.name)
+
+    def release(self) -> None:
+        BotOffset.objects.filter(name=self.name, lease_owner=self.owner).update(lease_expires=None)
+
+    def store(self, updates: list[Update], shards: int) -> int:
+        """Saves messages to the inbox and moves the offset past the updates in one transaction.
+        Raises LeaseLost if another replica took the lease meanwhile"""
+        offset: int = updates[-1].update_id + 1
+        with transaction.atomic():
+            BotUpdate.objects.bulk_create([
+                BotUpdate(update_id=update.update_id, chat_id=update.message.chat.id,
+                          shard=update.message.chat.id % shards, message=update.message.data)
+                for update in updates if update.message
+            ], ignore_conflicts=True)
+            moved: int = BotOffset.objects.filter(
+                name=self.name, lease_owner=self.owner, offset__lte=offset,
+            ).update(offset=offset)
+            if not moved:
+                raise LeaseLost(self.name)
+        return offset
+
+
+class UpdatePoller:
+    """Polls Telegram while it holds the offset lease and fills the inbox"""
+
+    def __init__(self, client: TgClient, lease: OffsetLease, shards: int, poll_timeout: int = POLL_TIMEOUT):
+        self.client = client
+        self.lease = lease
+        self.shards = shards
+        self.poll_timeout = poll_timeout
+
+    def poll_once(self) -> int | None:
+        """Returns the number of stored updates, None if another replica polls"""
+        offset: int | None = self.lease.acquire()
+        if offset is None:
+            return None
+        updates: list[Update] = self.client.get_updates(offset=offset, timeout=self.poll_timeout).result
+        if updates:
+            self.lease.store(updates, self.shards)
+        return len(updates)
+
+    def run(self, stop: threading.Event) -> None:
+        next_purge: float = 0
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                polled: int | None = self.poll_once()
+                if polled is not None and time.monotonic() >= next_purge:
+                    purge_handled()
+                    next_purge = time.monotonic() + PURGE_INTERVAL
+            except Exception:
+                logger.exception('failed to poll updates')
+                polled = None
+            if polled is None:
+                stop.wait(self.lease.ttl / 4)
+        self.lease.release()
+
+
+class ShardWorker:
+    """Handles inbox rows of one shard. A row is marked handled in the transaction of its handler,
+    so its database changes and the mark commit together, and replies go out on commit.
+    Chat states are database changes only with DbDataStorage, which runbot --coordinated requires"""
+
+    def __init__(self, handler: Callable[[Message], None], shard: int, batch_size: int = 20):
+        self.handler = handler
+        self.shard = shard
+        self.batch_size = batch_size
+
+    def work_once(self) -> int:
+        """Handles a batch of the shard's oldest rows, returns its size"""
+        with transaction.atomic():
+            rows: list[BotUpdate] = list(
+                BotUpdate.objects.select_for_update(skip_locked=True)
+                .filter(shard=self.shard, handled_at__isnull=True)
+                .order_by('update_id')[:self.batch_size]
+            )
+            for row in rows:
+                try:
+                    with transaction.atomic():
+                        self.handler(Message(row.message))
+                except Exception:
+                    logger.exception('failed to handle update %s in chat %s', row.update_id, row.chat_id)
+            if rows:
+                BotUpdate.objects.filter(update_id__in=[row.update_id for row in rows]).update(
+                    handled_at=timezone.now())
+        return len(rows)
+
+    def run(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                handled: int = self.work_once()
+            except Exception:
+                logger.exception('failed to work shard %s', self.shard)
+                stop.wait(ERROR_DELAY)
+                continue
+            if not handled:
+                stop.wait(IDLE_DELAY)
+
+
+def purge_handled() -> int:
+    """Deletes inbox rows handled longer than HANDLED_RETENTION ago"""
+    deleted, _ = BotUpdate.objects.filter(handled_at__lt=timezone.now() - HANDLED_RETENTION).delete()
+    return deleted
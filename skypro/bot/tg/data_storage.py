@@ -1,3 +1,4 @@
+import time
 from enum import Enum
 from pydantic import BaseModel
 from .bot_data import Storage
@@ -6,26 +7,42 @@ from .bot_data import Storage
 class StorageData(BaseModel):
     state: Enum | None = None
     data: dict = {}
+    touched: float = 0
 
 
 class BotDataStorage(Storage):
     """Working with bot data"""
-    def __init__(self):
+    def __init__(self, ttl: int | None = None):
+        self.ttl = ttl
         self.data: dict[int, StorageData] = {}
 
+    def _is_expired(self, chat: StorageData, now: float) -> bool:
+        return self.ttl is not None and now - chat.touched > self.ttl
+
     def _resolve_chat(self, chat_id: int):
         """Checks if there is chat_id in storage. If not - creates one."""
-        if chat_id not in self.data:
+        now = time.monotonic()
+        if chat_id not in self.data or self._is_expired(self.data[chat_id], now):
             self.data[chat_id] = StorageData()
+        self.data[chat_id].touched = now
         return self.data[chat_id]
 
+    def _find_chat(self, chat_id: int) -> StorageData | None:
+        """Returns chat if it is in storage and not expired, reading doesn't create chats"""
+        chat = self.data.get(chat_id)
+        if chat is None or self._is_expired(chat, time.monotonic()):
+            return None
+        return chat
+
     def get_state(self, chat_id: int) -> StorageData | None:
         """Checks chat's state"""
-        return self._resolve_chat(chat_id).state
+        chat = self._find_chat(chat_id)
+        return chat.state if chat else None
 
     def get_data(self, chat_id: int) -> dict:
         """Gets chat_id from storage"""
-        return self._resolve_chat(chat_id).data
+        chat = self._find_chat(chat_id)
+        return chat.data if chat else {}
 
     def set_state(self, chat_id, state: Enum) -> None:
         """Sets chat's state"""
@@ -42,3 +59,11 @@ class BotDataStorage(Storage):
     def update_data(self, chat_id: int, **kwargs) -> None:
         """Updates exists chats data"""
         self._resolve_chat(chat_id).data.update(**kwargs)
+
+    def purge_expired(self) -> int:
+        """Removes chats idle longer than ttl"""
+        now = time.monotonic()
+        expired: list[int] = [chat_id for chat_id, chat in list(self.data.items()) if self._is_expired(chat, now)]
+        for chat_id in expired:
+            self.data.pop(chat_id, None)
+        return len(expired)
@@ -0,0 +1,77 @@
+from datetime import timedelta
+from enum import Enum
+
+from django.db import transaction
+from django.utils import timezone
+
+from bot.models import BotState
+from .bot_data import Storage, StateEnum
+
+
+class DbDataStorage(Storage):
+    """Keeps chats' state in BotState table, shared by every bot worker.
+    States are stored as StateEnum values, chats idle longer than ttl are treated as empty"""
+
+    def __init__(self, ttl: int | None = None, state_enum: type[Enum] = StateEnum):
+        self.ttl = ttl
+        self.state_enum = state_enum
+
+    def _alive(self):
+        rows = BotState.objects.all()
+        if self.ttl is not None:
+            rows = rows.filter(updated__gte=timezone.now() - timedelta(seconds=self.ttl))
+        return rows
+
+    def _get(self, chat_id: int) -> BotState | None:
+        return self._alive().filter(chat_id=chat_id).first()
+
+    def _expired(self, chat: BotState) -> bool:
+        return self.ttl is not None and chat.updated < timezone.now() - timedelta(seconds=self.ttl)
+
+    def _change(self, chat_id: int, **fields) -> None:
+        """Locks chat's row and saves it, expired row starts from scratch.
+        get_or_create inserts a missing row in a savepoint, so of concurrent first writes
+        the losers wait for the winner's row instead of failing on the primary key"""
+        with transaction.atomic():
+            chat, created = BotState.objects.select_for_update().get_or_create(chat_id=chat_id)
+            if not created and self._expired(chat):
+                chat.state, chat.data = None, {}
+            data: dict = fields.pop('data_update', {})
+            for name, value in fields.items():
+                setattr(chat, name, value)
+            chat.data = {**chat.data, **data}
+            chat.save()
+
+    def get_state(self, chat_id: int) -> Enum | None:
+        """Checks chat's state"""
+        chat = self._get(chat_id)
+        return self.state_enum(chat.state) if chat and chat.state is not None else None
+
+    def get_data(self, chat_id: int) -> dict:
+        """Gets chat_id from storage"""
+        chat = self._get(chat_id)
+        return chat.data if chat else {}
+
+    def set_state(self, chat_id: int, state: Enum) -> None:
+        """Sets chat's state"""
+        self._change(chat_id, state=state.value)
+
+    def set_data(self, chat_id: int, data: dict) -> None:
+        """Sends chat_id and new goal to storage"""
+        self._change(chat_id, data=data)
+
+    def reset(self, chat_id: int) -> bool:
+        """Resets chat's data in storage"""
+        deleted, _ = BotState.objects.filter(chat_id=chat_id).delete()
+        return bool(deleted)
+
+    def update_data(self, chat_id: int, **kwargs) -> None:
+        """Updates exists chats data"""
+        self._change(chat_id, data_update=kwargs)
+
+    def purge_expired(self) -> int:
+        """Removes chats idle longer than ttl"""
+        if self.ttl is None:
+            return 0
+        deleted, _ = BotState.objects.filter(updated__lt=timezone.now() - timedelta(seconds=self.ttl)).delete()
+        return deleted
@@ -37,6 +37,14 @@ class GetUpdatesResponse(BaseModel):
     result: list[UpdateObj] = []
 
 
+class ResponseParameters(BaseModel):
+    retry_after: int | None = None
+    migrate_to_chat_id: int | None = None
+
+
 class SendMessagesResponse(BaseModel):
     ok: bool
-    result: Message
+    result: Message | None = None
+    error_code: int | None = None
+    description: str | None = None
+    parameters: ResponseParameters | None = None
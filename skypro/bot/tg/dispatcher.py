@@ -0,0 +1,83 @@
+import logging
+import queue
+import threading
+from functools import lru_cache
+from typing import Callable
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections
+
+from .updates import Message
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDispatcher:
+    """In-process queue drained by a pool of worker threads.
+    Messages are sharded by chat id, so messages of one chat are handled in order"""
+
+    def __init__(self, handler: Callable[[Message], None], workers: int = 4, queue_size: int = 1000):
+        self.handler = handler
+        self.queues: list[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.threads: list[threading.Thread] = []
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        with self.lock:
+            if self.threads:
+                return
+            for number, messages in enumerate(self.queues):
+                thread = threading.Thread(target=self._work, args=(messages,), name=f'bot-worker-{number}',
+                                          daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def _work(self, messages: queue.Queue) -> None:
+        while True:
+            msg: Message = messages.get()
+            close_old_connections()
+            try:
+                self.handler(msg)
+            except Exception:
+                logger.exception('failed to handle message %s in chat %s', msg.message_id, msg.chat.id)
+            finally:
+                close_old_connections()
+                messages.task_done()
+
+    def submit(self, msg: Message) -> bool:
+        """Queues the message, returns False if the chat's queue is full"""
+        self.start()
+        try:
+            self.queues[msg.chat.id % len(self.queues)].put_nowait(msg)
+        except queue.Full:
+            return False
+        return True
+
+    @property
+    def depth(self) -> int:
+        return sum(messages.qsize() for messages in self.queues)
+
+    def join(self) -> None:
+        """Waits until every queued message is handled"""
+        for messages in self.queues:
+            messages.join()
+
+
+@lru_cache(maxsize=None)
+def get_dispatcher() -> UpdateDispatcher:
+    """Process-wide dispatcher running the bot's message handler.
+    Every web worker runs one, so chats' state must be in storage the workers share.
+    Webhook deployments run no runbot, so the dispatcher's process does the bot's housekeeping"""
+    from bot.management.commands.runbot import Command
+    from .db_storage import DbDataStorage
+    from .housekeeping import Housekeeper
+    from .redis_storage import RedisDataStorage
+
+    command = Command()
+    if not isinstance(command.storage, (DbDataStorage, RedisDataStorage)):
+        raise ImproperlyConfigured('the webhook needs BOT_STORAGE_BACKEND=bot.tg.db_storage.DbDataStorage '
+                                   'or bot.tg.redis_storage.RedisDataStorage')
+    Housekeeper(command.storage).start()
+    return UpdateDispatcher(command.handle_message, workers=settings.TG_WEBHOOK_WORKERS,
+                            queue_size=settings.TG_WEBHOOK_QUEUE_SIZE)
@@ -0,0 +1,45 @@
+import logging
+import threading
+
+from django.db import connection
+
+from bot.verification import purge_codes
+from .bot_data import Storage
+from .user_cache import tg_user_cache
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Housekeeper:
+    """Purges chats idle longer than the storage's ttl and expired verification codes every interval seconds.
+    Runs in a daemon thread of every runbot mode and of the webhook dispatcher, purges are idempotent,
+    so processes doing it at the same time only repeat a delete"""
+
+    def __init__(self, storage: Storage, interval: float = PURGE_INTERVAL):
+        self.storage = storage
+        self.interval = interval
+
+    def run_once(self) -> None:
+        try:
+            states: int = self.storage.purge_expired()
+            codes: int = purge_codes()
+            logger.info('purged %s chat states and %s verification codes, tg user cache: %s',
+                        states, codes, tg_user_cache.stats())
+        except Exception:
+            logger.exception('bot housekeeping failed')
+
+    def run(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                self.run_once()
+            finally:
+                connection.close()
+            stop.wait(self.interval)
+
+    def start(self) -> threading.Event:
+        """Runs the purges in a daemon thread until the returned event is set"""
+        stop = threading.Event()
+        threading.Thread(target=self.run, args=(stop,), name='bot-housekeeping', daemon=True).start()
+        return stop
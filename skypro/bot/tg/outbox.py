@@ -0,0 +1,205 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Callable
+
+from django.conf import settings
+
+from . import metrics
+from .client import TgClient, get_tg_client
+from .dc import SendMessagesResponse
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+PRUNE_INTERVAL = 60
+
+
+class TokenBucket:
+    """Allows rate events per second on average and bursts of up to capacity events"""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available, 0 if there is one now"""
+        self._refill(now)
+        # float error must not turn a full token into a tiny wait
+        return 0 if self.tokens >= 1 - 1e-9 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class Outbox:
+    """Queue of outgoing messages sent by a background thread within Telegram's flood limits.
+    Every send takes a token from the global and the chat's bucket, queued messages of one chat
+    are joined into one message up to 4096 chars, 429 answers are retried after their retry_after.
+    step() does one iteration of the sender, so tests drive it with a fake clock"""
+
+    def __init__(self, client: TgClient, rate: float = 30, chat_rate: float = 1, chat_burst: float = 3,
+                 max_retries: int = 5, clock: Callable[[], float] = time.monotonic):
+        self.client = client
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.clock = clock
+
+        self.global_bucket = TokenBucket(rate, rate, clock())
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self.pending: OrderedDict[int, deque[str]] = OrderedDict()
+        self.not_before: dict[int, float] = {}
+        self.attempts: dict[int, int] = {}
+        self.in_flight = 0
+        self.sent = 0
+        self.dropped = 0
+        self.next_prune = clock() + PRUNE_INTERVAL
+
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.wakeup = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='bot-outbox', daemon=True)
+                self.thread.start()
+
+    def send_message(self, chat_id: int, text: str) -> None:
+        """Queues the message and returns at once"""
+        self.start()
+        with self.lock:
+            self.pending.setdefault(chat_id, deque()).append(text)
+        self.wakeup.set()
+
+    @property
+    def depth(self) -> int:
+        with self.lock:
+            return sum(len(texts) for texts in self.pending.values())
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        """Forgets buckets of chats which have nothing queued and are back to a full bucket"""
+        if now < self.next_prune:
+            return
+        self.next_prune = now + PRUNE_INTERVAL
+        for chat_id in [chat_id for chat_id, bucket in self.chat_buckets.items()
+                        if chat_id not in self.pending and bucket.is_full(now)]:
+            del self.chat_buckets[chat_id]
+            self.not_before.pop(chat_id, None)
+
+    def _coalesce(self, chat_id: int) -> str:
+        """Pops queued messages of the chat joined into one text no longer than 4096 chars"""
+        texts: deque[str] = self.pending[chat_id]
+        text: str = texts.popleft()
+        while texts and len(text) + 1 + len(texts[0]) <= MAX_MESSAGE_LENGTH:
+            text += '\n' + texts.popleft()
+        if texts:
+            self.pending.move_to_end(chat_id)
+        else:
+            del self.pending[chat_id]
+        return text
+
+    def _next_chat(self, now: float) -> tuple[int | None, float]:
+        """Returns the first chat allowed to send now or seconds until one is"""
+        wait: float = math.inf
+        for chat_id in self.pending:
+            chat_wait: float = max(self.not_before.get(chat_id, 0) - now,
+                                   self._chat_bucket(chat_id, now).wait_time(now))
+            if chat_wait <= 0:
+                return chat_id, 0
+            wait = min(wait, chat_wait)
+        return None, wait
+
+    def step(self) -> float | None:
+        """Sends at most one message. Returns 0 if it may be called again right away,
+        seconds to wait before the next message may be sent or None if nothing is queued"""
+        with self.lock:
+            now: float = self.clock()
+            self._prune(now)
+            if not self.pending:
+                return None
+            wait: float = self.global_bucket.wait_time(now)
+            if wait:
+                return wait
+            chat_id, wait = self._next_chat(now)
+            if chat_id is None:
+                return wait
+
+            self.global_bucket.take(now)
+            self.chat_buckets[chat_id].take(now)
+            text: str = self._coalesce(chat_id)
+            self.in_flight += 1
+
+        try:
+            response: SendMessagesResponse | None = self.client.send_message(chat_id, text, retry_throttled=False)
+        except Exception:
+            logger.exception('failed to send message to chat %s', chat_id)
+            response = None
+
+        with self.lock:
+            self.in_flight -= 1
+            self._handle_response(chat_id, text, response)
+            self.idle.notify_all()
+        return 0
+
+    def _handle_response(self, chat_id: int, text: str, response: SendMessagesResponse | None) -> None:
+        if response is not None and response.ok:
+            self.sent += 1
+            metrics.outbox_messages.inc(result='sent')
+            self.attempts.pop(chat_id, None)
+            return
+
+        retry_after: int | None = response and response.parameters and response.parameters.retry_after
+        attempts: int = self.attempts.get(chat_id, 0) + 1
+        if retry_after is None or attempts > self.max_retries:
+            self.dropped += 1
+            metrics.outbox_messages.inc(result='dropped')
+            self.attempts.pop(chat_id, None)
+            logger.warning('dropped message to chat %s: %s', chat_id, response and response.description)
+            return
+
+        self.attempts[chat_id] = attempts
+        metrics.outbox_messages.inc(result='retried')
+        self.pending.setdefault(chat_id, deque()).appendleft(text)
+        self.not_before[chat_id] = self.clock() + retry_after
+
+    def run(self) -> None:
+        while True:
+            wait: float | None = self.step()
+            if wait != 0:
+                self.wakeup.wait(wait)
+                self.wakeup.clear()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until every queued message is sent or dropped"""
+        with self.idle:
+            return self.idle.wait_for(lambda: not self.pending and not self.in_flight, timeout)
+
+
+@lru_cache(maxsize=None)
+def get_outbox() -> Outbox:
+    """Process-wide outbox, so every handler shares the flood limits"""
+    return Outbox(get_tg_client(), rate=settings.TG_SEND_RATE, chat_rate=settings.TG_CHAT_SEND_RATE,
+                  chat_burst=settings.TG_CHAT_SEND_BURST)
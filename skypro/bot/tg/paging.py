@@ -0,0 +1,30 @@
+from typing import Iterable, Iterator
+
+from django.db.models import QuerySet
+
+from .outbox import MAX_MESSAGE_LENGTH
+
+
+def chunk_lines(lines: Iterable[str], limit: int = MAX_MESSAGE_LENGTH) -> Iterator[str]:
+    """Joins lines into messages no longer than limit, longer lines are cut"""
+    chunk: str = ''
+    for line in lines:
+        line = line[:limit]
+        if chunk and len(chunk) + 1 + len(line) > limit:
+            yield chunk
+            chunk = line
+        else:
+            chunk = f'{chunk}\n{line}' if chunk else line
+    if chunk:
+        yield chunk
+
+
+def read_page(queryset: QuerySet, after: int, size: int) -> tuple[list[tuple[int, str]], int | None]:
+    """Streams up to size (id, title) pairs of rows with id greater than after.
+    Returns the pairs and the cursor of the next page, None on the last page"""
+    rows: list[tuple[int, str]] = []
+    for obj in queryset.filter(id__gt=after).order_by('id').only('id', 'title')[:size + 1].iterator():
+        if len(rows) == size:
+            return rows, rows[-1][0]
+        rows.append((obj.id, obj.title))
+    return rows, None
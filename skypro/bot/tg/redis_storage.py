@@ -0,0 +1,78 @@
+import json
+from enum import Enum
+
+from django.conf import settings
+
+from .bot_data import Storage, StateEnum
+
+
+class RedisDataStorage(Storage):
+    """Keeps chats' state in Redis hashes {s: StateEnum value, d: json data}.
+    Every write renews the key ttl, so idle chats expire on the server side"""
+
+    def __init__(self, client, ttl: int | None = None, prefix: str = 'bot:chat:',
+                 state_enum: type[Enum] = StateEnum):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.state_enum = state_enum
+
+    @classmethod
+    def from_settings(cls) -> 'RedisDataStorage':
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError('RedisDataStorage requires redis package: pip install redis') from e
+
+        return cls(redis.Redis.from_url(settings.BOT_STORAGE_REDIS_URL), ttl=settings.BOT_STORAGE_TTL)
+
+    def _key(self, chat_id: int) -> str:
+        return f'{self.prefix}{chat_id}'
+
+    @staticmethod
+    def _dumps(data: dict) -> str:
+        return json.dumps(data, separators=(',', ':'))
+
+    def _write(self, chat_id: int, mapping: dict) -> None:
+        key = self._key(chat_id)
+        with self.client.pipeline() as pipe:
+            pipe.hset(key, mapping=mapping)
+            if self.ttl is not None:
+                pipe.expire(key, self.ttl)
+            pipe.execute()
+
+    def get_state(self, chat_id: int) -> Enum | None:
+        """Checks chat's state"""
+        state = self.client.hget(self._key(chat_id), 's')
+        return self.state_enum(int(state)) if state is not None else None
+
+    def get_data(self, chat_id: int) -> dict:
+        """Gets chat_id from storage"""
+        data = self.client.hget(self._key(chat_id), 'd')
+        return json.loads(data) if data is not None else {}
+
+    def set_state(self, chat_id: int, state: Enum) -> None:
+        """Sets chat's state"""
+        self._write(chat_id, {'s': state.value})
+
+    def set_data(self, chat_id: int, data: dict) -> None:
+        """Sends chat_id and new goal to storage"""
+        self._write(chat_id, {'d': self._dumps(data)})
+
+    def reset(self, chat_id: int) -> bool:
+        """Resets chat's data in storage"""
+        return bool(self.client.delete(self._key(chat_id)))
+
+    def update_data(self, chat_id: int, **kwargs) -> None:
+        """Updates exists chats data, retried if the chat is changed concurrently"""
+        key = self._key(chat_id)
+
+        def update(pipe) -> None:
+            raw = pipe.hget(key, 'd')
+            data: dict = {**(json.loads(raw) if raw is not None else {}), **kwargs}
+            pipe.multi()
+            pipe.hset(key, 'd', self._dumps(data))
+            if self.ttl is not None:
+                pipe.expire(key, self.ttl)
+
+        self.client.transaction(update, key)
@@ -0,0 +1,100 @@
+from typing import Any
+
+
+class LazyObject:
+    """Keeps the decoded JSON object, fields are read when a handler asks for them"""
+    __slots__ = ('_data',)
+
+    def __init__(self, data: dict):
+        self._data = data
+
+    @property
+    def data(self) -> dict:
+        return self._data
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self._data!r})'
+
+
+class Chat(LazyObject):
+    __slots__ = ()
+
+    @property
+    def id(self) -> int:
+        return self._data['id']
+
+    @property
+    def type(self) -> str | None:
+        return self._data.get('type')
+
+
+class Sender(LazyObject):
+    __slots__ = ()
+
+    @property
+    def id(self) -> int | None:
+        return self._data.get('id')
+
+    @property
+    def username(self) -> str | None:
+        return self._data.get('username')
+
+
+class Message(LazyObject):
+    __slots__ = ()
+
+    @property
+    def message_id(self) -> int | None:
+        return self._data.get('message_id')
+
+    @property
+    def text(self) -> str | None:
+        return self._data.get('text')
+
+    @property
+    def date(self) -> int | None:
+        """Unix time the message was sent"""
+        return self._data.get('date')
+
+    @property
+    def chat(self) -> Chat:
+        return Chat(self._data['chat'])
+
+    @property
+    def from_(self) -> Sender:
+        return Sender(self._data.get('from') or {})
+
+
+class Update:
+    """message is None for updates the bot doesn't handle: edited messages, callbacks, etc."""
+    __slots__ = ('update_id', 'message')
+
+    def __init__(self, update_id: int, message: Message | None):
+        self.update_id = update_id
+        self.message = message
+
+
+class UpdatesResponse:
+    __slots__ = ('ok', 'result')
+
+    def __init__(self, ok: bool, result: list[Update]):
+        self.ok = ok
+        self.result = result
+
+
+def decode_update(data: Any) -> Update | None:
+    """Checks only what the bot relies on: update_id, and chat id of a message.
+    Returns None for payloads without update_id"""
+    if not isinstance(data, dict) or not isinstance(data.get('update_id'), int):
+        return None
+    message = data.get('message')
+    if not isinstance(message, dict) or not isinstance(message.get('chat'), dict) \
+            or not isinstance(message['chat'].get('id'), int):
+        return Update(data['update_id'], None)
+    return Update(data['update_id'], Message(message))
+
+
+def decode_updates(data: dict) -> UpdatesResponse:
+    """Decodes getUpdates response, unknown update types don't break the batch"""
+    updates = (decode_update(item) for item in data.get('result') or ())
+    return UpdatesResponse(bool(data.get('ok')), [update for update in updates if update is not None])
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable
+
+from django.conf import settings
+
+from bot.models import TgUser
+
+
+class TgUserCache:
+    """Process-level LRU of verified TgUsers by chat id.
+    Entries expire after ttl seconds and are dropped by bot.signals when a TgUser is saved or deleted,
+    maxsize=0 disables caching"""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[int, tuple[float, TgUser]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, chat_id: int) -> TgUser | None:
+        with self._lock:
+            entry = self._data.get(chat_id)
+            if entry is not None and entry[0] <= self.clock():
+                del self._data[chat_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(chat_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, chat_id: int, tg_user: TgUser) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[chat_id] = (self.clock() + self.ttl, tg_user)
+            self._data.move_to_end(chat_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, *chat_ids: int) -> None:
+        with self._lock:
+            for chat_id in chat_ids:
+                self._data.pop(chat_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+
+tg_user_cache = TgUserCache(settings.TG_USER_CACHE_SIZE, settings.TG_USER_CACHE_TTL)
+
+
+def resolve_tg_user(chat_id: int, username: str | None) -> TgUser:
+    """Returns chat's TgUser, creates it for unknown chats. Only verified users are cached:
+    unverified ones go through verification on every message"""
+    tg_user = tg_user_cache.get(chat_id)
+    if tg_user is None:
+        tg_user, _ = TgUser.objects.select_related('user').get_or_create(
+            tg_chat_id=chat_id,
+            defaults={
+                'tg_user_name': username,
+            }
+        )
+        if tg_user.user_id:
+            tg_user_cache.set(chat_id, tg_user)
+    return tg_user
@@ -1,7 +1,8 @@
 from django.urls import path
 
-from bot.views import TgVerificationView
+from bot.views import TgVerificationView, TgWebhookView
 
 urlpatterns = [
     path('verify', TgVerificationView.as_view(), name='verify-user'),
+    path('webhook', TgWebhookView.as_view(), name='webhook'),
 ]
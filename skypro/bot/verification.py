@@ -0,0 +1,56 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from bot.models import TgUser, TgVerificationCode
+
+
+def hash_code(code: str) -> str:
+    return hashlib.sha256(code.encode()).hexdigest()
+
+
+def issue_code(tg_user: TgUser) -> str | None:
+    """Stores hash of a new code for the chat and returns the code,
+    None if the chat has used up its codes for the current window.
+    The chat's row is locked while codes are counted and inserted, so concurrent requests take turns"""
+    with transaction.atomic():
+        TgUser.objects.select_for_update().get(pk=tg_user.pk)
+        now = timezone.now()
+        issued: int = TgVerificationCode.objects.filter(
+            tg_user=tg_user,
+            created__gt=now - timedelta(seconds=settings.TG_VERIFICATION_CODE_WINDOW),
+        ).count()
+        if issued >= settings.TG_VERIFICATION_CODE_LIMIT:
+            return None
+
+        code: str = os.urandom(12).hex()
+        TgVerificationCode.objects.create(
+            tg_user=tg_user,
+            code_hash=hash_code(code),
+            expires_at=now + timedelta(seconds=settings.TG_VERIFICATION_CODE_TTL),
+        )
+    return code
+
+
+def consume_code(code: str) -> TgUser | None:
+    """Marks the code used and returns its TgUser, None for unknown, expired or used codes.
+    The conditional update lets only one of concurrent requests use the code"""
+    code_hash: str = hash_code(code)
+    now = timezone.now()
+    used: int = TgVerificationCode.objects.filter(
+        code_hash=code_hash, used_at__isnull=True, expires_at__gt=now,
+    ).update(used_at=now)
+    if not used:
+        return None
+    return TgUser.objects.filter(verification_codes__code_hash=code_hash).first()
+
+
+def purge_codes() -> int:
+    """Deletes codes expired longer than the rate limit window ago in one statement"""
+    cutoff = timezone.now() - timedelta(seconds=settings.TG_VERIFICATION_CODE_WINDOW)
+    deleted, _ = TgVerificationCode.objects.filter(expires_at__lt=cutoff).delete()
+    return deleted
@@ -1,11 +1,20 @@
+import hmac
+import logging
+
+from django.conf import settings
+from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
 from bot.models import TgUser
 from bot.serializers import TgUserSerializer
-from bot.tg.client import TgClient
-from skypro.settings import env
+from bot.tg.client import get_tg_client
+from bot.tg.updates import Update, decode_update
+from bot.tg.dispatcher import get_dispatcher
+
+logger = logging.getLogger(__name__)
 
 
 class TgVerificationView(GenericAPIView):
@@ -22,5 +31,25 @@ class TgVerificationView(GenericAPIView):
         tg_user.save(update_fields=('user',))
 
         instance_serializer: TgUserSerializer = self.get_serializer(tg_user)
-        TgClient(env.str('TG_TOKEN')).send_message(tg_user.tg_chat_id, '[verification_completed]')
+        get_tg_client().send_message(tg_user.tg_chat_id, '[verification_completed]')
         return Response(instance_serializer.data)
+
+
+class TgWebhookView(APIView):
+    """Receives Bot API updates, queues them for the dispatcher's workers and answers at once"""
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request, *args, **kwargs) -> Response:
+        secret: str = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if not settings.TG_WEBHOOK_SECRET or not hmac.compare_digest(secret, settings.TG_WEBHOOK_SECRET):
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        update: Update | None = decode_update(request.data)
+        if update is None or update.message is None:
+            logger.debug('skipped update: %s', request.data)
+            return Response(status=status.HTTP_200_OK)
+
+        if not get_dispatcher().submit(update.message):
+            return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(status=status.HTTP_200_OK)
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from core.models import User
+from goals.dashboard import dashboard_cache
+from goals.models import ArchivalJob, Board, Goal, GoalCategory, GoalComment
+from goals.response_cache import bump_board_versions
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED = (ArchivalJob.Status.pending, ArchivalJob.Status.running, ArchivalJob.Status.failed)
+
+
+def _job_goals(job: ArchivalJob) -> QuerySet:
+    """Not archived goals of the job's board or category"""
+    if job.category_id is not None:
+        goals = Goal.objects.filter(category_id=job.category_id)
+    else:
+        goals = Goal.objects.filter(category__board_id=job.board_id)
+    return goals.exclude(status=Goal.Status.archived)
+
+
+def _enqueue(job: ArchivalJob) -> ArchivalJob:
+    """Saves the job, its runner counts the goals, so the deleting request returns at once"""
+    job.save()
+    # the thread must see the committed deletion and job
+    transaction.on_commit(lambda: start_job(job.pk))
+    return job
+
+
+def delete_board(board: Board, user: User) -> ArchivalJob:
+    """Marks the board and its categories deleted and schedules archival of their goals.
+    Goals of a deleted board are hidden at once, visible_to checks the board"""
+    with transaction.atomic():
+        board.is_deleted = True
+        board.save()
+        now = timezone.now()
+        board.categories.filter(is_deleted=False).update(is_deleted=True, deleted_at=now, updated=now)
+        return _enqueue(ArchivalJob(user=user, board=board))
+
+
+def delete_category(category: GoalCategory, user: User) -> ArchivalJob:
+    """Marks the category deleted and schedules archival of its goals.
+    Goals of a deleted category are hidden at once, visible_to checks the category.
+    The update skips GoalCategory.save, which would move the board of every goal in one statement"""
+    with transaction.atomic():
+        now = timezone.now()
+        GoalCategory.objects.filter(pk=category.pk).update(is_deleted=True, deleted_at=now, updated=now)
+        category.is_deleted = True
+        # a dashboard dropped before commit could be cached again from the old rows
+        transaction.on_commit(lambda: dashboard_cache.invalidate_categories(category.pk))
+        bump_board_versions(category.board_id)
+        return _enqueue(ArchivalJob(user=user, board_id=category.board_id, category=category))
+
+
+def run_batch(job_id: int, batch_size: int) -> ArchivalJob:
+    """Archives the next batch of the job's goals and moves its cursor in one short transaction.
+    The job row is locked, so runners of the same job take turns"""
+    with transaction.atomic():
+        job: ArchivalJob = ArchivalJob.objects.select_for_update().get(pk=job_id)
+        if job.status == ArchivalJob.Status.done:
+            return job
+
+        if not job.last_id and not job.archived:
+            job.total = _job_goals(job).count()
+        ids: list[int] = list(
+            _job_goals(job).filter(id__gt=job.last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            now = timezone.now()
+            Goal.objects.filter(id__in=ids).update(status=Goal.Status.archived, board=None, archived_at=now,
+                                                   updated=now)
+            GoalComment.objects.filter(goal_id__in=ids).update(board=None, updated=now)
+            job.last_id = ids[-1]
+            job.archived += len(ids)
+            job.status = ArchivalJob.Status.running
+        else:
+            job.status = ArchivalJob.Status.done
+            job.finished = timezone.now()
+        job.error = ''
+        job.save()
+
+    if job.category_id is not None:
+        dashboard_cache.invalidate_categories(job.category_id)
+    else:
+        dashboard_cache.invalidate_boards(job.board_id)
+    bump_board_versions(job.board_id)
+    return job
+
+
+def run_job(job_id: int, batch_size: int | None = None, pause: float | None = None) -> ArchivalJob:
+    """Runs the job's batches until it is done, a failure is saved on the job, which stays resumable"""
+    batch_size = batch_size or settings.GOALS_ARCHIVAL_BATCH_SIZE
+    pause = settings.GOALS_ARCHIVAL_BATCH_PAUSE if pause is None else pause
+    try:
+        while True:
+            job: ArchivalJob = run_batch(job_id, batch_size)
+            if job.status == ArchivalJob.Status.done:
+                return job
+            time.sleep(pause)
+    except Exception as e:
+        logger.exception('archival job %s failed', job_id)
+        ArchivalJob.objects.filter(pk=job_id).update(status=ArchivalJob.Status.failed, error=str(e)[:1000],
+                                                     updated=timezone.now())
+        return ArchivalJob.objects.get(pk=job_id)
+
+
+def _run_in_thread(job_id: int) -> None:
+    try:
+        run_job(job_id)
+    finally:
+        connection.close()
+
+
+def start_job(job_id: int) -> None:
+    threading.Thread(target=_run_in_thread, args=(job_id,), name=f'archival-{job_id}', daemon=True).start()
+
+
+def resume_jobs(batch_size: int | None = None) -> list[ArchivalJob]:
+    """Runs unfinished jobs, e.g. the ones a crash or restart interrupted, oldest first"""
+    job_ids = list(ArchivalJob.objects.filter(status__in=UNFINISHED).order_by('id').values_list('id', flat=True))
+    return [run_job(job_id, batch_size) for job_id in job_ids]
@@ -0,0 +1,164 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from goals.dashboard import dashboard_cache
+from goals.models import Goal, GoalCategory, GoalComment
+from goals.response_cache import bump_board_versions
+from goals.roles import WRITE_ROLES, get_board_role
+from goals.serializers import GoalBatchCreateSerializer, GoalBatchUpdateSerializer, GoalCommentBatchCreateSerializer
+
+NO_WRITE_PERMISSION: dict = {'non_field_errors': ['No write permission']}
+TITLE_TAKEN: dict = {'title': ['Goal with this title already exists.']}
+
+
+def _error(index: int, errors) -> dict:
+    return {'index': index, 'status': 'error', 'errors': errors}
+
+
+def _validate_items(items: list[dict], serializer_class: type[serializers.Serializer],
+                    results: list[dict | None]) -> dict[int, dict]:
+    """Validates every item on its own, puts errors to results and returns {index: validated_data}"""
+    valid: dict[int, dict] = {}
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            results[index] = _error(index, serializer.errors)
+    return valid
+
+
+def _taken_titles(titles: set[str]) -> set[str]:
+    return set(Goal.objects.filter(title__in=titles).values_list('title', flat=True))
+
+
+def _create_one_by_one(to_create: dict[int, Goal], results: list[dict | None]) -> dict[int, Goal]:
+    """Inserts goals with a savepoint each, like services.create_goal, goals whose title is taken by now
+    get an error result. Returns the created goals"""
+    created: dict[int, Goal] = {}
+    for index, goal in to_create.items():
+        goal.pk = None
+        try:
+            with transaction.atomic():
+                Goal.objects.bulk_create([goal])
+        except IntegrityError:
+            if goal.title not in _taken_titles({goal.title}):
+                raise
+            results[index] = _error(index, TITLE_TAKEN)
+        else:
+            created[index] = goal
+    return created
+
+
+def create_goals(request, items: list[dict]) -> list[dict]:
+    """Creates goals with one category query, one title query and one bulk insert"""
+    results: list[dict | None] = [None] * len(items)
+    valid = _validate_items(items, GoalBatchCreateSerializer, results)
+
+    category_boards: dict[int, int] = dict(
+        GoalCategory.objects.filter(id__in={data['category'] for data in valid.values()}, is_deleted=False)
+        .values_list('id', 'board_id')
+    )
+    taken_titles: set[str] = _taken_titles({data['title'] for data in valid.values()})
+
+    to_create: dict[int, Goal] = {}
+    for index, data in valid.items():
+        board_id = category_boards.get(data['category'])
+        if board_id is None:
+            results[index] = _error(index, {'category': [f'Invalid pk "{data["category"]}" - '
+                                                         f'object does not exist.']})
+        elif get_board_role(request, board_id) not in WRITE_ROLES:
+            results[index] = _error(index, NO_WRITE_PERMISSION)
+        elif data['title'] in taken_titles:
+            results[index] = _error(index, TITLE_TAKEN)
+        else:
+            taken_titles.add(data['title'])
+            fields: dict = dict(data)
+            category_id: int = fields.pop('category')
+            goal = Goal(**fields, category_id=category_id, board_id=board_id, user=request.user)
+            # bulk_create skips Goal.save
+            goal.stamp_archived()
+            to_create[index] = goal
+
+    try:
+        with transaction.atomic():
+            Goal.objects.bulk_create(to_create.values())
+    except IntegrityError:
+        # a concurrent request took a title after the check
+        to_create = _create_one_by_one(to_create, results)
+    # bulk_create sends no post_save
+    dashboard_cache.invalidate_categories(*{goal.category_id for goal in to_create.values()})
+    bump_board_versions(*{category_boards[goal.category_id] for goal in to_create.values()})
+
+    for index, goal in to_create.items():
+        results[index] = {'index': index, 'status': 'created', 'id': goal.id}
+    return results
+
+
+def update_goals(request, items: list[dict]) -> list[dict]:
+    """Changes status and priority of visible goals with one select and one bulk update"""
+    results: list[dict | None] = [None] * len(items)
+    valid = _validate_items(items, GoalBatchUpdateSerializer, results)
+
+    goals: dict[int, Goal] = Goal.objects.visible_to(request.user).in_bulk(
+        {data['id'] for data in valid.values()}
+    )
+    now = timezone.now()
+
+    to_update: dict[int, Goal] = {}
+    for index, data in valid.items():
+        goal = goals.get(data['id'])
+        if goal is None:
+            results[index] = _error(index, {'id': ['Not found.']})
+        elif get_board_role(request, goal.board_id) not in WRITE_ROLES:
+            results[index] = _error(index, NO_WRITE_PERMISSION)
+        else:
+            goal.status = data.get('status', goal.status)
+            goal.priority = data.get('priority', goal.priority)
+            goal.updated = now
+            goal.stamp_archived()
+            to_update[index] = goal
+
+    with transaction.atomic():
+        Goal.objects.bulk_update(set(to_update.values()), ['status', 'priority', 'archived_at', 'updated'])
+    dashboard_cache.invalidate_categories(*{goal.category_id for goal in to_update.values()})
+    bump_board_versions(*{goal.board_id for goal in to_update.values()})
+
+    for index, goal in to_update.items():
+        results[index] = {'index': index, 'status': 'updated', 'id': goal.id}
+    return results
+
+
+def create_comments(request, items: list[dict]) -> list[dict]:
+    """Creates comments with one goal query and one bulk insert"""
+    results: list[dict | None] = [None] * len(items)
+    valid = _validate_items(items, GoalCommentBatchCreateSerializer, results)
+
+    goals: dict[int, tuple[int, int]] = {
+        goal_id: (status, board_id)
+        for goal_id, status, board_id in Goal.objects.filter(id__in={data['goal'] for data in valid.values()},
+                                                             category__is_deleted=False)
+        .values_list('id', 'status', 'board_id')
+    }
+
+    to_create: dict[int, GoalComment] = {}
+    for index, data in valid.items():
+        status, board_id = goals.get(data['goal'], (None, None))
+        if status is None:
+            results[index] = _error(index, {'goal': [f'Invalid pk "{data["goal"]}" - object does not exist.']})
+        elif status == Goal.Status.archived:
+            results[index] = _error(index, {'goal': ['No operations allowed in archived goal']})
+        elif get_board_role(request, board_id) not in WRITE_ROLES:
+            results[index] = _error(index, NO_WRITE_PERMISSION)
+        else:
+            to_create[index] = GoalComment(goal_id=data['goal'], board_id=board_id, text=data['text'],
+                                           user=request.user)
+
+    with transaction.atomic():
+        GoalComment.objects.bulk_create(to_create.values())
+    bump_board_versions(*{goals[comment.goal_id][1] for comment in to_create.values()})
+
+    for index, comment in to_create.items():
+        results[index] = {'index': index, 'status': 'created', 'id': comment.id}
+    return results
@@ -0,0 +1,156 @@
+import datetime
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.models import User
+from goals.models import Board, Goal
+
+ACTIVE_STATUSES = (Goal.Status.to_do, Goal.Status.in_progress, Goal.Status.done)
+OPEN_STATUSES = (Goal.Status.to_do, Goal.Status.in_progress)
+
+
+class DashboardEntry:
+    __slots__ = ('expires', 'date', 'board_ids', 'category_ids', 'data')
+
+    def __init__(self, expires: float, date: datetime.date, board_ids: set[int], category_ids: set[int], data: dict):
+        self.expires = expires
+        self.date = date
+        self.board_ids = board_ids
+        self.category_ids = category_ids
+        self.data = data
+
+
+class DashboardCache:
+    """Process-level LRU of users' dashboards.
+    An entry remembers the boards and categories it counted, goals.signals drop the entries
+    touching a written goal, category or board. Entries expire after ttl seconds and when the date
+    changes, so overdue counts follow the calendar, maxsize=0 disables caching"""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: OrderedDict[int, DashboardEntry] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, user_id: int, date: datetime.date) -> dict | None:
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            if entry.expires <= self.clock() or entry.date != date:
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return entry.data
+
+    def set(self, user_id: int, date: datetime.date, board_ids: set[int], category_ids: set[int],
+            data: dict) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[user_id] = DashboardEntry(self.clock() + self.ttl, date, board_ids, category_ids, data)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate_users(self, *user_ids: int) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._data.pop(user_id, None)
+
+    def invalidate_boards(self, *board_ids: int) -> None:
+        board_ids = set(board_ids)
+        with self._lock:
+            for user_id in [user_id for user_id, entry in self._data.items() if entry.board_ids & board_ids]:
+                del self._data[user_id]
+
+    def invalidate_categories(self, *category_ids: int) -> None:
+        category_ids = set(category_ids)
+        with self._lock:
+            for user_id in [user_id for user_id, entry in self._data.items() if entry.category_ids & category_ids]:
+                del self._data[user_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+dashboard_cache = DashboardCache(settings.GOALS_DASHBOARD_CACHE_SIZE, settings.GOALS_DASHBOARD_CACHE_TTL)
+
+
+def _aggregates(today: datetime.date) -> dict[str, Count]:
+    goal = 'categories__goal'
+    aggregates: dict[str, Count] = {
+        f'status_{status}': Count(goal, filter=Q(categories__goal__status=status)) for status in ACTIVE_STATUSES
+    }
+    aggregates.update({
+        f'priority_{priority}': Count(goal, filter=Q(categories__goal__priority=priority,
+                                                     categories__goal__status__in=ACTIVE_STATUSES))
+        for priority in Goal.Priority.values
+    })
+    aggregates['overdue'] = Count(goal, filter=Q(categories__goal__due_date__lt=today,
+                                                 categories__goal__status__in=OPEN_STATUSES))
+    return aggregates
+
+
+def _empty_counts() -> dict:
+    return {
+        'total': 0,
+        'status': {status: 0 for status in ACTIVE_STATUSES},
+        'priority': {priority: 0 for priority in Goal.Priority.values},
+        'overdue': 0,
+    }
+
+
+def _add_counts(counts: dict, row: dict) -> None:
+    for status in ACTIVE_STATUSES:
+        counts['status'][status] += row[f'status_{status}']
+        counts['total'] += row[f'status_{status}']
+    for priority in Goal.Priority.values:
+        counts['priority'][priority] += row[f'priority_{priority}']
+    counts['overdue'] += row['overdue']
+
+
+def build_dashboard(user: User, today: datetime.date) -> tuple[dict, set[int], set[int]]:
+    """Counts not archived goals of every board the user participates in by category, status and priority
+    with one grouped query. Returns the dashboard and the ids of the boards and categories it counted"""
+    rows = (
+        Board.objects.visible_to(user)
+        .values('id', 'title', 'categories__id', 'categories__title', 'categories__is_deleted')
+        .annotate(**_aggregates(today))
+        .order_by('title', 'id', 'categories__title')
+    )
+
+    boards: dict[int, dict] = {}
+    category_ids: set[int] = set()
+    for row in rows:
+        board = boards.get(row['id'])
+        if board is None:
+            board = boards[row['id']] = {'id': row['id'], 'title': row['title'], **_empty_counts(),
+                                         'categories': []}
+        if row['categories__id'] is None or row['categories__is_deleted']:
+            continue
+        category_ids.add(row['categories__id'])
+        category = {'id': row['categories__id'], 'title': row['categories__title'], **_empty_counts()}
+        _add_counts(category, row)
+        _add_counts(board, row)
+        board['categories'].append(category)
+
+    return {'date': today, 'boards': list(boards.values())}, set(boards), category_ids
+
+
+def get_dashboard(user: User) -> dict:
+    """Returns user's dashboard from the cache or builds it"""
+    today: datetime.date = timezone.localdate()
+    data = dashboard_cache.get(user.pk, today)
+    if data is None:
+        data, board_ids, category_ids = build_dashboard(user, today)
+        dashboard_cache.set(user.pk, today, board_ids, category_ids, data)
+    return data
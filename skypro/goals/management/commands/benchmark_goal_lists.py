@@ -0,0 +1,139 @@
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import User
+from goals import views
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment
+
+INDEXED_MODELS = (Board, BoardParticipant, GoalCategory, Goal, GoalComment)
+
+
+class Command(BaseCommand):
+    """Seeds a board with goals and reports list endpoints latency without and with Meta.indexes.
+    It drops and re-adds the indexes of live tables, so it only runs against a throwaway database.
+    Seeded rows are deleted afterwards, even when the run fails"""
+    help = 'Seeds goals and reports list latency before and after hot path indexes, on a throwaway database only'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--goals', type=int, default=1_000_000)
+        parser.add_argument('--categories', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--throwaway-database', action='store_true',
+                            help='confirm DATABASE_URL points at a database the benchmark may reindex')
+
+    def seed(self, prefix: str, goals: int, categories: int, batch_size: int) -> User:
+        """Creates user, board, categories, goals and a comment per each 100 goals"""
+        user = User.objects.create_user(username=f'bench-{prefix}', email=f'bench-{prefix}@example.com')
+        board = Board.objects.create(title=f'bench-{prefix}')
+        BoardParticipant.objects.create(board=board, user=user, role=BoardParticipant.Role.owner)
+        category_ids: list[int] = [
+            category.id for category in GoalCategory.objects.bulk_create(
+                GoalCategory(title=f'bench-{prefix}-{i}', user=user, board=board) for i in range(categories)
+            )
+        ]
+
+        today = date.today()
+        for start in range(0, goals, batch_size):
+            with transaction.atomic():
+                batch = Goal.objects.bulk_create(
+                    Goal(
+                        title=f'bench-{prefix}-{i}',
+                        category_id=category_ids[i % categories],
+                        board=board,
+                        user=user,
+                        status=i % 4 + 1,
+                        priority=i % 4 + 1,
+                        due_date=today + timedelta(days=i % 365),
+                    ) for i in range(start, min(start + batch_size, goals))
+                )
+                GoalComment.objects.bulk_create(
+                    GoalComment(goal_id=goal.id, board=board, user=user, text='bench') for goal in batch[::100]
+                )
+            self.stdout.write(f'seeded {min(start + batch_size, goals)}/{goals} goals')
+
+        return user
+
+    def cleanup(self, prefix: str, batch_size: int) -> None:
+        """Deletes whatever seed created, dependents first"""
+        boards = Board.objects.filter(title=f'bench-{prefix}')
+        for queryset in (
+            GoalComment.objects.filter(goal__category__board__in=boards),
+            Goal.objects.filter(category__board__in=boards),
+            GoalCategory.objects.filter(board__in=boards),
+            BoardParticipant.objects.filter(board__in=boards),
+            boards,
+            User.objects.filter(username=f'bench-{prefix}'),
+        ):
+            while ids := list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size]):
+                queryset.model.objects.filter(pk__in=ids).delete()
+        self.stdout.write(f'deleted bench-{prefix} rows')
+
+    @staticmethod
+    def endpoints(user: User) -> dict[str, tuple]:
+        category: GoalCategory = GoalCategory.objects.filter(user=user).first()
+        goal: Goal = Goal.objects.filter(category=category).first()
+        return {
+            'goal list': (views.GoalListView, {'limit': 100}),
+            'goal list, offset 10000': (views.GoalListView, {'limit': 100, 'offset': 10_000}),
+            'goal list, category + priority': (views.GoalListView, {'limit': 100, 'category': category.id,
+                                                                    'priority__in': '3,4'}),
+            'goal list, due_date range': (views.GoalListView, {'limit': 100, 'due_date__gte': date.today(),
+                                                               'due_date__lte': date.today() + timedelta(days=7)}),
+            'category list': (views.GoalCategoryListView, {'limit': 100}),
+            'comment list': (views.GoalCommentListView, {'limit': 100, 'goal': goal.id}),
+            'board list': (views.BoardListView, {}),
+        }
+
+    def measure(self, user: User, repeat: int) -> dict[str, float]:
+        """Returns median latency of every endpoint in ms"""
+        factory = APIRequestFactory()
+        results: dict[str, float] = {}
+        for name, (view_class, params) in self.endpoints(user).items():
+            view = view_class.as_view()
+            timings: list[float] = []
+            for _ in range(repeat):
+                request = factory.get('/', params)
+                force_authenticate(request, user=user)
+                started = time.perf_counter()
+                view(request).render()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+        return results
+
+    @staticmethod
+    def set_indexes(enabled: bool) -> None:
+        with connection.schema_editor() as schema_editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    if enabled:
+                        schema_editor.add_index(model, index)
+                    else:
+                        schema_editor.remove_index(model, index)
+
+    def handle(self, *args, **options) -> None:
+        if not options['throwaway_database']:
+            raise CommandError('benchmark_goal_lists seeds goals and drops indexes, run it with '
+                               '--throwaway-database against a database made for it')
+
+        prefix: str = uuid.uuid4().hex[:8]
+        try:
+            user = self.seed(prefix, options['goals'], options['categories'], options['batch_size'])
+            self.set_indexes(enabled=False)
+            try:
+                before = self.measure(user, options['repeat'])
+            finally:
+                self.set_indexes(enabled=True)
+            after = self.measure(user, options['repeat'])
+        finally:
+            self.cleanup(prefix, options['batch_size'])
+
+        self.stdout.write(f'{"endpoint":<35}{"before, ms":>12}{"after, ms":>12}')
+        for name in before:
+            self.stdout.write(f'{name:<35}{before[name]:>12.1f}{after[name]:>12.1f}')
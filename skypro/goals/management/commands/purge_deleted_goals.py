@@ -0,0 +1,46 @@
+import datetime
+import time
+from pathlib import Path
+
+from django.core.management import BaseCommand
+
+from goals.retention import purge
+
+
+class Command(BaseCommand):
+    """Retention job, run it from cron or leave it running with --every.
+    Dumps are restored with loaddata in reverse purge order: boards, participants, categories,
+    archival jobs, goals, comments"""
+    help = 'Hard-deletes boards and categories deleted and goals archived longer than the retention age ago'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help='retention age, GOALS_RETENTION_DAYS by default')
+        parser.add_argument('--batch-size', type=int, default=None, help='rows deleted per transaction')
+        parser.add_argument('--pause', type=float, default=None, help='seconds to pause between batches')
+        parser.add_argument('--dump-dir', type=Path, default=None,
+                            help='directory to append purged rows to as JSON lines before deleting them')
+        parser.add_argument('--dry-run', action='store_true', help='only count the rows to purge')
+        parser.add_argument('--every', type=int, default=None, help='repeat the purge every given seconds')
+
+    def handle(self, *args, **options) -> None:
+        older_than = None
+        if options['older_than_days'] is not None:
+            older_than = datetime.timedelta(days=options['older_than_days'])
+
+        while True:
+            results: dict[str, dict] = purge(older_than, options['batch_size'], options['pause'],
+                                             options['dump_dir'], options['dry_run'])
+            self.report(results, options['dry_run'])
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+
+    def report(self, results: dict[str, dict], dry_run: bool) -> None:
+        verb: str = 'to purge' if dry_run else 'purged'
+        for name, result in results.items():
+            size: str = 'unknown size' if result['bytes'] is None else f'~{result["bytes"]} bytes'
+            self.stdout.write(f'{name}: {result["rows"]} rows {verb}, {size}')
+        rows: int = sum(result['rows'] for result in results.values())
+        size: int = sum(result['bytes'] or 0 for result in results.values())
+        self.stdout.write(f'total: {rows} rows {verb}, ~{size} bytes')
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management import BaseCommand
+
+from goals.archival import resume_jobs
+
+
+class Command(BaseCommand):
+    """Archival worker, jobs start in a thread of the deleting process and are lost with it,
+    run this from cron or leave it running with --every"""
+    help = 'Runs archival jobs of deleted boards and categories left unfinished by a crash or restart'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--batch-size', type=int, default=None, help='goals archived per transaction')
+        parser.add_argument('--every', type=int, default=None, help='look for unfinished jobs every given seconds')
+
+    def handle(self, *args, **options) -> None:
+        while True:
+            for job in resume_jobs(options['batch_size']):
+                self.stdout.write(f'job {job.pk}: {job.get_status_display()}, {job.archived} of {job.total} goals')
+            if not options['every']:
+                return
+            time.sleep(options['every'])
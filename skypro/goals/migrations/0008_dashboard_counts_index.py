@@ -0,0 +1,21 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['category', 'status', 'priority', 'due_date'], name='goal_category_counts_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='goal',
+            name='goal_category_status_idx',
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from goals.search import install_search, uninstall_search
+
+
+def install(apps, schema_editor):
+    install_search(schema_editor)
+
+
+def uninstall(apps, schema_editor):
+    uninstall_search(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0008_dashboard_counts_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0009_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goal',
+            name='board',
+            field=models.ForeignKey(blank=True, db_column='board', editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='goals.board', verbose_name='Доска'),
+        ),
+        migrations.AddField(
+            model_name='goalcomment',
+            name='board',
+            field=models.ForeignKey(blank=True, db_column='board', editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='goals.board', verbose_name='Доска'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from collections import defaultdict
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+
+
+def _chunks(queryset, fields: tuple[str, ...]):
+    """Yields lists of values of rows ordered by id, BATCH_SIZE rows per list"""
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', *fields)[:BATCH_SIZE])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _update(model, using: str, ids_by_board: dict) -> None:
+    with transaction.atomic(using=using):
+        for board_id, ids in ids_by_board.items():
+            model.objects.using(using).filter(id__in=ids).update(board_id=board_id)
+
+
+def backfill_board(apps, schema_editor):
+    """Copies category's board to goals and goal's board to comments in committed chunks,
+    rows of deleted categories keep null"""
+    using = schema_editor.connection.alias
+    GoalCategory = apps.get_model('goals', 'GoalCategory')
+    Goal = apps.get_model('goals', 'Goal')
+    GoalComment = apps.get_model('goals', 'GoalComment')
+
+    category_boards = {
+        category_id: None if is_deleted else board_id
+        for category_id, board_id, is_deleted in
+        GoalCategory.objects.using(using).values_list('id', 'board_id', 'is_deleted')
+    }
+    for rows in _chunks(Goal.objects.using(using), ('category_id',)):
+        ids_by_board = defaultdict(list)
+        for goal_id, category_id in rows:
+            ids_by_board[category_boards[category_id]].append(goal_id)
+        _update(Goal, using, ids_by_board)
+
+    for rows in _chunks(GoalComment.objects.using(using), ('goal__board_id',)):
+        ids_by_board = defaultdict(list)
+        for comment_id, board_id in rows:
+            ids_by_board[board_id].append(comment_id)
+        _update(GoalComment, using, ids_by_board)
+
+
+class Migration(migrations.Migration):
+    # every chunk commits on its own, so big tables are not locked for the whole backfill
+    atomic = False
+
+    dependencies = [
+        ('goals', '0010_denormalised_board'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_board, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('goals', '0011_backfill_board'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivalJob',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата последнего обновления')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'Ожидает'), (2, 'Выполняется'), (3, 'Завершена'), (4, 'Ошибка')], default=1, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Целей к архивации')),
+                ('archived', models.PositiveIntegerField(default=0, verbose_name='Заархивировано целей')),
+                ('last_id', models.PositiveIntegerField(default=0, verbose_name='Последняя цель')),
+                ('error', models.CharField(blank=True, default='', max_length=1000, verbose_name='Ошибка')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Дата завершения')),
+                ('board', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archival_jobs', to='goals.board', verbose_name='Доска')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archival_jobs', to='goals.goalcategory', verbose_name='Категория')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Архивация',
+                'verbose_name_plural': 'Архивации',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+from goals.search import SEARCH_COLUMNS, install_search, raw_trgm_index, uninstall_search
+
+
+def install(apps, schema_editor):
+    """Replaces the raw column indexes, icontains filters on UPPER(column::text) never used them"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, columns in SEARCH_COLUMNS.items():
+        for column in columns:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {raw_trgm_index(table, column)}')
+    install_search(schema_editor)
+
+
+def uninstall(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    uninstall_search(schema_editor)
+    for table, columns in SEARCH_COLUMNS.items():
+        for column in columns:
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {raw_trgm_index(table, column)} ON {table} '
+                                  f'USING gin ({column} gin_trgm_ops)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0012_archivaljob'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
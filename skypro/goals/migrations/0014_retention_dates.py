@@ -0,0 +1,28 @@
+# Generated by Django 4.1.13 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0013_search_upper_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата удаления'),
+        ),
+        migrations.AddField(
+            model_name='goal',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата архивации'),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата удаления'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, transaction
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def _stamp(queryset, field: str, now) -> None:
+    """Sets the field of the queryset's rows to now in committed chunks ordered by id"""
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+        if not ids:
+            return
+        with transaction.atomic(using=queryset.db):
+            queryset.filter(id__in=ids).update(**{field: now})
+        last_id = ids[-1]
+
+
+def backfill_retention_dates(apps, schema_editor):
+    """Rows archived or deleted before the columns existed get the migration's time.
+    Their updated may be far older or never set by the archiving code, so retention keeps
+    them a full period from the deploy instead of purging them on its first run"""
+    using = schema_editor.connection.alias
+    now = timezone.now()
+    Board = apps.get_model('goals', 'Board')
+    GoalCategory = apps.get_model('goals', 'GoalCategory')
+    Goal = apps.get_model('goals', 'Goal')
+
+    _stamp(Board.objects.using(using).filter(is_deleted=True, deleted_at=None), 'deleted_at', now)
+    _stamp(GoalCategory.objects.using(using).filter(is_deleted=True, deleted_at=None), 'deleted_at', now)
+    _stamp(Goal.objects.using(using).filter(status=4, archived_at=None), 'archived_at', now)
+
+
+class Migration(migrations.Migration):
+    # every chunk commits on its own, so big tables are not locked for the whole backfill
+    atomic = False
+
+    dependencies = [
+        ('goals', '0014_retention_dates'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_retention_dates, migrations.RunPython.noop),
+    ]
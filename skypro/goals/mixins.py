@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.db.models import Prefetch, QuerySet
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+from goals.response_cache import get_board_versions, get_cached_response, get_user_boards, response_key, \
+    set_cached_response
+
+
+def get_related_lookups(serializer: serializers.BaseSerializer, prefix: str = '') -> tuple[list[str], list]:
+    """Returns select_related and prefetch_related lookups the serializer's readable fields traverse"""
+    select: list[str] = []
+    prefetch: list = []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        path = prefix + field.source
+
+        if isinstance(field, serializers.ListSerializer):
+            child_select, child_prefetch = get_related_lookups(field.child)
+            queryset = field.child.Meta.model.objects.select_related(*child_select).prefetch_related(*child_prefetch)
+            prefetch.append(Prefetch(path, queryset=queryset))
+        elif isinstance(field, serializers.BaseSerializer):
+            select.append(path)
+            child_select, child_prefetch = get_related_lookups(field, prefix=path + '__')
+            select.extend(child_select)
+            prefetch.extend(child_prefetch)
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch.append(path)
+        elif isinstance(field, serializers.RelatedField) and not field.use_pk_only_optimization():
+            select.append(path)
+
+    return select, prefetch
+
+
+class QuerySetOptimizerMixin:
+    """Joins and prefetches relations the serializer renders, so pages cost a fixed number of queries"""
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        queryset = super().filter_queryset(queryset)
+        select, prefetch = get_related_lookups(self.get_serializer())
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+class BoardVersionedCacheMixin:
+    """Caches list responses in Django's cache by user, query params and versions of the user's boards.
+    goals.signals bump a board's version on any write to it and reload a user's board ids when
+    their participations change, so the key costs no query and a hit needs no joins and no serialization"""
+
+    def list(self, request, *args, **kwargs) -> Response:
+        if not settings.GOALS_RESPONSE_CACHE_TIMEOUT:
+            return super().list(request, *args, **kwargs)
+
+        view_name: str = type(self).__name__
+        boards_version, board_ids = get_user_boards(request.user.pk)
+        key: str = response_key(view_name, request.user.pk, request.query_params,
+                                get_board_versions(board_ids), boards_version)
+        data = get_cached_response(view_name, key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response: Response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            set_cached_response(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 from core.models import User
@@ -15,23 +15,86 @@ class BaseModelMixin(models.Model):
     updated = models.DateTimeField(verbose_name="Дата последнего обновления", auto_now=timezone.now())
 
 
+class BoardQuerySet(models.QuerySet):
+    def visible_to(self, user: User) -> 'BoardQuerySet':
+        """Not deleted boards the user participates in"""
+        return self.filter(participants__user=user, is_deleted=False)
+
+    def with_board_role(self) -> 'BoardQuerySet':
+        """Adds the visible_to user's role as board_role, read from the participant row visible_to joined"""
+        return self.annotate(board_role=models.F('participants__role'))
+
+
+class GoalCategoryQuerySet(models.QuerySet):
+    def visible_to(self, user: User) -> 'GoalCategoryQuerySet':
+        """Not deleted categories of the boards the user participates in"""
+        return self.filter(board__participants__user=user, is_deleted=False)
+
+    def with_board_role(self) -> 'GoalCategoryQuerySet':
+        """Adds the visible_to user's role on the board as board_role, read from the join visible_to made"""
+        return self.annotate(board_role=models.F('board__participants__role'))
+
+    def writable_by(self, user: User) -> 'GoalCategoryQuerySet':
+        """Not deleted categories of the boards the user owns or writes to"""
+        return self.filter(
+            board__participants__user=user,
+            board__participants__role__in=(BoardParticipant.Role.owner, BoardParticipant.Role.writer),
+            is_deleted=False,
+        )
+
+
+class GoalQuerySet(models.QuerySet):
+    def visible_to(self, user: User) -> 'GoalQuerySet':
+        """Not archived goals of visible categories.
+        Membership is resolved through the denormalised board, which is null in deleted categories,
+        (board, user) is unique, so the result needs neither a subquery nor DISTINCT.
+        The board and category are checked too, so goals of a deleted one are hidden before they are archived"""
+        return self.filter(board__participants__user=user, board__is_deleted=False,
+                           category__is_deleted=False).exclude(status=Goal.Status.archived)
+
+    def with_board_role(self) -> 'GoalQuerySet':
+        """Adds the visible_to user's role on the board as board_role, read from the join visible_to made"""
+        return self.annotate(board_role=models.F('board__participants__role'))
+
+
+class GoalCommentQuerySet(models.QuerySet):
+    def visible_to(self, user: User) -> 'GoalCommentQuerySet':
+        """Comments of the goals in visible categories"""
+        return self.filter(board__participants__user=user, board__is_deleted=False,
+                           goal__category__is_deleted=False)
+
+
 class Board(BaseModelMixin):
     class Meta:
         verbose_name = 'Доска'
         verbose_name_plural = 'Доски'
+        indexes = [
+            models.Index(fields=['title'], name='board_active_title_idx', condition=models.Q(is_deleted=False)),
+        ]
 
     title = models.CharField(verbose_name='Название', max_length=255)
     is_deleted = models.BooleanField(verbose_name='Удалена', default=False)
+    # goals.retention purges the board that long after, updated moves with any later write
+    deleted_at = models.DateTimeField(verbose_name='Дата удаления', null=True, blank=True, editable=False)
+
+    objects = BoardQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.deleted_at = (self.deleted_at or timezone.now()) if self.is_deleted else None
+        super().save(*args, **kwargs)
+
 
 class BoardParticipant(BaseModelMixin):
     class Meta:
         unique_together = ('board', 'user')
         verbose_name = 'Участник'
         verbose_name_plural = 'Участники'
+        indexes = [
+            models.Index(fields=['user', 'board', 'role'], name='participant_user_board_idx'),
+        ]
 
     class Role(models.IntegerChoices):
         owner = 1, 'Owner'
@@ -50,21 +113,61 @@ class GoalCategory(BaseModelMixin):
     class Meta:
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
+        indexes = [
+            models.Index(fields=['board', 'title'], name='category_active_board_idx',
+                         condition=models.Q(is_deleted=False)),
+        ]
 
     title = models.CharField(verbose_name="Название", max_length=255, unique=True)
     user = models.ForeignKey(User, verbose_name="Автор", on_delete=models.PROTECT)
     is_deleted = models.BooleanField(verbose_name="Удалена", default=False)
+    deleted_at = models.DateTimeField(verbose_name="Дата удаления", null=True, blank=True, editable=False)
     board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="categories",
                               db_column="board")
 
+    objects = GoalCategoryQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'board_id' in instance.__dict__ and 'is_deleted' in instance.__dict__:
+            instance._loaded_visible_board_id = instance.visible_board_id
+        return instance
+
+    @property
+    def visible_board_id(self) -> int | None:
+        """Board stored on the category's goals and comments, None while the category is deleted"""
+        return None if self.is_deleted else self.board_id
+
+    def save(self, *args, **kwargs):
+        """Moves the board of goals and comments along when the category moves or is (un)deleted"""
+        self.deleted_at = (self.deleted_at or timezone.now()) if self.is_deleted else None
+        if self._state.adding or getattr(self, '_loaded_visible_board_id', -1) == self.visible_board_id:
+            super().save(*args, **kwargs)
+        else:
+            with transaction.atomic(using=kwargs.get('using')):
+                super().save(*args, **kwargs)
+                Goal.objects.filter(category=self).update(board_id=self.visible_board_id)
+                GoalComment.objects.filter(goal__category=self).update(board_id=self.visible_board_id)
+        self._loaded_visible_board_id = self.visible_board_id
+
 
 class Goal(BaseModelMixin):
     class Meta:
         verbose_name = "Цель"
         verbose_name_plural = "Цели"
+        indexes = [
+            # covers the dashboard counts, its (category, status) prefix serves status filters
+            models.Index(fields=['category', 'status', 'priority', 'due_date'],
+                         name='goal_category_counts_idx'),
+            models.Index(fields=['category', 'due_date'], name='goal_active_due_date_idx',
+                         condition=~models.Q(status=4)),
+            models.Index(fields=['category', 'priority'], name='goal_active_priority_idx',
+                         condition=~models.Q(status=4)),
+        ]
 
     class Status(models.IntegerChoices):
         to_do = 1, "К выполнению"
@@ -85,17 +188,100 @@ class Goal(BaseModelMixin):
     status = models.PositiveSmallIntegerField(verbose_name="Статус", choices=Status.choices, default=Status.to_do)
     priority = models.PositiveSmallIntegerField(verbose_name="Приоритет", choices=Priority.choices,
                                                 default=Priority.medium)
+    # goals.retention purges the goal that long after it was archived
+    archived_at = models.DateTimeField(verbose_name="Дата архивации", null=True, blank=True, editable=False)
     user = models.ForeignKey(User, on_delete=models.PROTECT, verbose_name="Автор", db_column="user")
+    # category's board, denormalised for visibility and permission checks, see GoalCategory.visible_board_id
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.PROTECT, null=True, blank=True,
+                              editable=False, related_name="+", db_column="board")
+
+    objects = GoalQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
+
+    def _category_board_id(self) -> int | None:
+        if Goal.category.is_cached(self):
+            return self.category.visible_board_id
+        board_id, is_deleted = GoalCategory.objects.values_list('board_id', 'is_deleted').get(pk=self.category_id)
+        return None if is_deleted else board_id
+
+    def stamp_archived(self) -> None:
+        """Sets archived_at when the goal is archived and clears it when it is restored"""
+        self.archived_at = (self.archived_at or timezone.now()) if self.status == Goal.Status.archived else None
+
+    def save(self, *args, **kwargs):
+        """Takes the board from the category when the goal is created or changes category,
+        a loaded category is used without a query. Comments follow the goal to another board"""
+        self.stamp_archived()
+        old_board_id: int | None = self.board_id
+        if self._state.adding or getattr(self, '_loaded_category_id', None) != self.category_id:
+            self.board_id = self._category_board_id()
+
+        if self._state.adding or old_board_id == self.board_id:
+            super().save(*args, **kwargs)
+        else:
+            with transaction.atomic(using=kwargs.get('using')):
+                super().save(*args, **kwargs)
+                GoalComment.objects.filter(goal=self).update(board_id=self.board_id)
+        self._loaded_category_id = self.category_id
+
 
 class GoalComment(BaseModelMixin):
     class Meta:
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(fields=['goal', '-created'], name='comment_goal_created_idx'),
+        ]
 
     user = models.ForeignKey(User, verbose_name="Автор", on_delete=models.PROTECT)
     text = models.CharField(verbose_name="Текст", max_length=4000)
     goal = models.ForeignKey(Goal, verbose_name="Цель", on_delete=models.CASCADE, db_column="goal")
+    # goal's board, kept in step by Goal.save and GoalCategory.save
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.PROTECT, null=True, blank=True,
+                              editable=False, related_name="+", db_column="board")
+
+    objects = GoalCommentQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        """Takes the board from the goal on create, a loaded goal is used without a query"""
+        if self._state.adding:
+            if GoalComment.goal.is_cached(self):
+                self.board_id = self.goal.board_id
+            else:
+                self.board_id = Goal.objects.values_list('board_id', flat=True).get(pk=self.goal_id)
+        super().save(*args, **kwargs)
+
+
+class ArchivalJob(BaseModelMixin):
+    """Archives goals of a deleted board or category in batches, see goals.archival.
+    last_id is the id of the last archived goal, a job resumes after it"""
+
+    class Meta:
+        verbose_name = "Архивация"
+        verbose_name_plural = "Архивации"
+
+    class Status(models.IntegerChoices):
+        pending = 1, "Ожидает"
+        running = 2, "Выполняется"
+        done = 3, "Завершена"
+        failed = 4, "Ошибка"
+
+    user = models.ForeignKey(User, verbose_name="Автор", on_delete=models.PROTECT)
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.PROTECT, null=True, blank=True,
+                              related_name="archival_jobs")
+    category = models.ForeignKey(GoalCategory, verbose_name="Категория", on_delete=models.PROTECT, null=True,
+                                 blank=True, related_name="archival_jobs")
+    status = models.PositiveSmallIntegerField(verbose_name="Статус", choices=Status.choices, default=Status.pending)
+    total = models.PositiveIntegerField(verbose_name="Целей к архивации", default=0)
+    archived = models.PositiveIntegerField(verbose_name="Заархивировано целей", default=0)
+    last_id = models.PositiveIntegerField(verbose_name="Последняя цель", default=0)
+    error = models.CharField(verbose_name="Ошибка", max_length=1000, blank=True, default="")
+    finished = models.DateTimeField(verbose_name="Дата завершения", null=True, blank=True)
@@ -0,0 +1,31 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class GoalsCursorPagination(CursorPagination):
+    """Keyset pagination over the view's ordering (OrderingFilter choices included)"""
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+
+
+class GoalsPagination(LimitOffsetPagination):
+    """Limit/offset pagination with opt-in cursor mode: ?pagination=cursor.
+    Cursor mode doesn't run COUNT(*) and doesn't scan skipped rows"""
+    mode_query_param = 'pagination'
+    cursor_pagination_class = GoalsCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator: GoalsCursorPagination | None = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+
+        return super().get_paginated_response(data)
@@ -1,6 +1,7 @@
 from rest_framework import permissions
 
 from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment
+from goals.roles import WRITE_ROLES, get_object_board_role
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -12,29 +13,29 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
 
 class BoardPermissions(permissions.IsAuthenticated):
     def has_object_permission(self, request, view, obj: Board) -> bool:
-        check: dict = {'user': request.user, 'board': obj}
-        if request.method not in permissions.SAFE_METHODS:
-            check['role'] = BoardParticipant.Role.owner
+        role = get_object_board_role(request, obj, obj.pk)
+        if request.method in permissions.SAFE_METHODS:
+            return role is not None
 
-        return BoardParticipant.objects.filter(**check).exists()
+        return role == BoardParticipant.Role.owner
 
 
 class CategoryPermissions(permissions.IsAuthenticated):
     def has_object_permission(self, request, view, obj: GoalCategory) -> bool:
-        check: dict = {'user': request.user, 'board': obj.board}
-        if request.method not in permissions.SAFE_METHODS:
-            check['role__in'] = [BoardParticipant.Role.owner, BoardParticipant.Role.writer]
+        role = get_object_board_role(request, obj, obj.board_id)
+        if request.method in permissions.SAFE_METHODS:
+            return role is not None
 
-        return BoardParticipant.objects.filter(**check).exists()
+        return role in WRITE_ROLES
 
 
 class GoalPermissions(permissions.IsAuthenticated):
     def has_object_permission(self, request, view, obj: Goal) -> bool:
-        check: dict = {'user': request.user, 'board': obj.category.board}
-        if request.method not in permissions.SAFE_METHODS:
-            check['role__in'] = [BoardParticipant.Role.owner, BoardParticipant.Role.writer]
+        role = get_object_board_role(request, obj, obj.board_id)
+        if request.method in permissions.SAFE_METHODS:
+            return role is not None
 
-        return BoardParticipant.objects.filter(**check).exists()
+        return role in WRITE_ROLES
 
 
 class CommentPermissions(permissions.IsAuthenticated):
@@ -0,0 +1,145 @@
+import hashlib
+import uuid
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from goals.models import BoardParticipant
+
+VERSION_KEY = 'goals:board_version:{}'
+BOARDS_VERSION_KEY = 'goals:user_boards_version:{}'
+BOARDS_KEY = 'goals:user_boards:{}:{}'
+RESPONSE_KEY = 'goals:response:{}'
+
+
+def _version_keys(board_ids) -> dict[str, int]:
+    return {VERSION_KEY.format(board_id): board_id for board_id in board_ids}
+
+
+def _set_new_versions(board_ids) -> None:
+    # versions are random tokens, not counters: a token evicted from the cache comes back as
+    # a new one, so responses cached under the lost token are never served again
+    cache.set_many({key: uuid.uuid4().hex for key in _version_keys(board_ids)}, timeout=None)
+
+
+def bump_board_versions(*board_ids: int) -> None:
+    """Makes every cached response covering the boards stale.
+    Inside a transaction the versions are bumped again on commit, so a response cached
+    from a concurrent read of the old rows is dropped too"""
+    board_ids = {board_id for board_id in board_ids if board_id is not None}
+    if not board_ids:
+        return
+    _set_new_versions(board_ids)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _set_new_versions(board_ids))
+
+
+def get_board_versions(board_ids) -> list[tuple[int, str]]:
+    """Returns sorted (board_id, version) pairs, boards without a version get one"""
+    keys: dict[str, int] = _version_keys(board_ids)
+    versions: dict[str, str] = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        # a version evicted right away only costs a miss
+        versions[key] = cache.get(key) or uuid.uuid4().hex
+    return sorted((board_id, versions[key]) for key, board_id in keys.items())
+
+
+def _set_user_boards(user_ids, versions: dict[int, str]) -> dict[int, list[int]]:
+    boards: dict[int, list[int]] = {user_id: [] for user_id in user_ids}
+    for user_id, board_id in BoardParticipant.objects.filter(user_id__in=boards).values_list('user_id', 'board_id'):
+        boards[user_id].append(board_id)
+    for board_ids in boards.values():
+        board_ids.sort()
+    cache.set_many({BOARDS_KEY.format(user_id, versions[user_id]): board_ids
+                    for user_id, board_ids in boards.items()}, timeout=None)
+    return boards
+
+
+def _set_new_user_boards(user_ids) -> None:
+    # board ids are stored under a new version after it is set, so ids a concurrent read
+    # loaded before the change land under the old version and are never read again
+    versions: dict[int, str] = {user_id: uuid.uuid4().hex for user_id in user_ids}
+    cache.set_many({BOARDS_VERSION_KEY.format(user_id): version for user_id, version in versions.items()},
+                   timeout=None)
+    _set_user_boards(user_ids, versions)
+
+
+def bump_user_boards(*user_ids: int) -> None:
+    """Reloads the cached board ids of users whose participations changed, with one query.
+    Inside a transaction they are reloaded again on commit, like board versions"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    _set_new_user_boards(user_ids)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _set_new_user_boards(user_ids))
+
+
+def get_user_boards(user_id: int) -> tuple[str, list[int]]:
+    """Returns the version and sorted ids of the user's boards, from the cache unless they were evicted"""
+    key: str = BOARDS_VERSION_KEY.format(user_id)
+    version: str | None = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key) or uuid.uuid4().hex
+    board_ids: list[int] | None = cache.get(BOARDS_KEY.format(user_id, version))
+    if board_ids is None:
+        board_ids = _set_user_boards([user_id], {user_id: version})[user_id]
+    return version, board_ids
+
+
+def response_key(view_name: str, user_id: int, query_params, board_versions: list[tuple[int, str]],
+                 boards_version: str = '') -> str:
+    """Same user, view, query params in any order, version of the user's boards
+    and board versions give the same key"""
+    params = sorted((name, sorted(values)) for name, values in query_params.lists())
+    raw = repr((view_name, user_id, params, boards_version, board_versions))
+    return RESPONSE_KEY.format(hashlib.sha256(raw.encode()).hexdigest())
+
+
+class ResponseCacheStats:
+    """Per process hits and misses by view"""
+
+    def __init__(self):
+        self._counts: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        self._lock = Lock()
+
+    def hit(self, view_name: str) -> None:
+        with self._lock:
+            self._counts[view_name][0] += 1
+
+    def miss(self, view_name: str) -> None:
+        with self._lock:
+            self._counts[view_name][1] += 1
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            counts = {name: tuple(value) for name, value in self._counts.items()}
+        return {
+            name: {'hits': hits, 'misses': misses, 'hit_ratio': hits / (hits + misses) if hits + misses else 0}
+            for name, (hits, misses) in counts.items()
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+response_cache_stats = ResponseCacheStats()
+
+
+def get_cached_response(view_name: str, key: str):
+    data = cache.get(key)
+    if data is None:
+        response_cache_stats.miss(view_name)
+    else:
+        response_cache_stats.hit(view_name)
+    return data
+
+
+def set_cached_response(key: str, data) -> None:
+    cache.set(key, data, timeout=settings.GOALS_RESPONSE_CACHE_TIMEOUT)
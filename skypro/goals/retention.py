@@ -0,0 +1,154 @@
+import datetime
+import logging
+import time
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+from django.core import serializers
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Exists, Model, OuterRef, Q, QuerySet
+from django.utils import timezone
+
+from goals.models import ArchivalJob, Board, BoardParticipant, Goal, GoalCategory, GoalComment
+
+logger = logging.getLogger(__name__)
+
+
+def _goals_q(cutoff: datetime.datetime, prefix: str = '') -> Q:
+    """Goals archived before the cutoff"""
+    return Q(**{f'{prefix}status': Goal.Status.archived, f'{prefix}archived_at__lt': cutoff})
+
+
+def _jobs_q(cutoff: datetime.datetime) -> Q:
+    """Finished jobs, unfinished ones are resumed and keep their board and category"""
+    return Q(status=ArchivalJob.Status.done, finished__lt=cutoff)
+
+
+def purgeable_comments(cutoff: datetime.datetime) -> QuerySet:
+    return GoalComment.objects.filter(_goals_q(cutoff, 'goal__'))
+
+
+def purgeable_goals(cutoff: datetime.datetime) -> QuerySet:
+    return Goal.objects.filter(_goals_q(cutoff))
+
+
+def purgeable_jobs(cutoff: datetime.datetime) -> QuerySet:
+    return ArchivalJob.objects.filter(_jobs_q(cutoff))
+
+
+def purgeable_categories(cutoff: datetime.datetime) -> QuerySet:
+    """Categories deleted before the cutoff whose goals and jobs are purgeable too"""
+    return GoalCategory.objects.filter(is_deleted=True, deleted_at__lt=cutoff).exclude(
+        Exists(Goal.objects.filter(category=OuterRef('pk')).exclude(_goals_q(cutoff)))
+    ).exclude(
+        Exists(ArchivalJob.objects.filter(category=OuterRef('pk')).exclude(_jobs_q(cutoff)))
+    )
+
+
+def purgeable_boards(cutoff: datetime.datetime) -> QuerySet:
+    """Boards deleted before the cutoff with nothing left on them but purgeable rows"""
+    return Board.objects.filter(is_deleted=True, deleted_at__lt=cutoff).exclude(
+        Exists(GoalCategory.objects.filter(board=OuterRef('pk')).exclude(pk__in=purgeable_categories(cutoff)))
+    ).exclude(
+        Exists(ArchivalJob.objects.filter(board=OuterRef('pk')).exclude(_jobs_q(cutoff)))
+    ).exclude(
+        Exists(Goal.objects.filter(board=OuterRef('pk')).exclude(_goals_q(cutoff)))
+    ).exclude(
+        Exists(GoalComment.objects.filter(board=OuterRef('pk')).exclude(_goals_q(cutoff, 'goal__')))
+    )
+
+
+def purgeable_participants(cutoff: datetime.datetime) -> QuerySet:
+    return BoardParticipant.objects.filter(board__in=purgeable_boards(cutoff))
+
+
+# dependency order, a phase only deletes rows nothing left after the earlier phases refers to,
+# so each phase's querysets give the same rows before and after the earlier phases ran
+PHASES: list[tuple[str, Callable[[datetime.datetime], QuerySet]]] = [
+    ('comments', purgeable_comments),
+    ('goals', purgeable_goals),
+    ('archival jobs', purgeable_jobs),
+    ('categories', purgeable_categories),
+    ('participants', purgeable_participants),
+    ('boards', purgeable_boards),
+]
+
+
+def row_size(model: type[Model]) -> float | None:
+    """Average bytes a row of the model's table takes with its indexes, None when the database can't tell"""
+    table: str = model._meta.db_table
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_total_relation_size(oid), reltuples FROM pg_class '
+                               'WHERE oid = %s::regclass', [table])
+                size, rows = cursor.fetchone()
+            elif connection.vendor == 'sqlite':
+                # dbstat is compiled into most SQLite builds, not all of them
+                cursor.execute('SELECT SUM(pgsize) FROM dbstat WHERE name IN '
+                               '(SELECT name FROM sqlite_master WHERE tbl_name = %s)', [table])
+                size, rows = cursor.fetchone()[0], model.objects.count()
+            else:
+                return None
+    except DatabaseError:
+        return None
+    return size / rows if size and rows and rows > 0 else None
+
+
+def _dump(rows: list[Model], dump_dir: Path) -> None:
+    """Appends rows to <app>.<model>.jsonl, the files load back with loaddata"""
+    path: Path = dump_dir / f'{rows[0]._meta.label_lower}.jsonl'
+    with path.open('a', encoding='utf-8') as stream:
+        serializers.serialize('jsonl', rows, stream=stream)
+
+
+def purge_batches(queryset: QuerySet, batch_size: int, pause: float, dump_dir: Path | None = None) -> int:
+    """Deletes the queryset's rows in batches of short transactions, oldest ids first.
+    A batch is re-checked and locked in its transaction, so a row changed meanwhile is kept.
+    Returns the number of deleted rows"""
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids: list[int] = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            rows: list[Model] = list(queryset.filter(pk__in=ids).order_by('pk').select_for_update(of=('self',)))
+            if dump_dir is not None and rows:
+                _dump(rows, dump_dir)
+            queryset.model.objects.filter(pk__in=[row.pk for row in rows]).delete()
+        deleted += len(rows)
+        if not rows:
+            return deleted
+        time.sleep(pause)
+
+
+def purge(older_than: datetime.timedelta | None = None, batch_size: int | None = None,
+          pause: float | None = None, dump_dir: Path | None = None, dry_run: bool = False) -> dict[str, dict]:
+    """Hard-deletes soft-deleted boards and categories and archived goals older than older_than,
+    GOALS_RETENTION_DAYS by default, phase by phase in dependency order. With dump_dir the rows are
+    written there first. Idempotent, a run stopped halfway is finished by the next one.
+    Returns rows and estimated bytes by phase, a dry run only counts them"""
+    older_than = older_than or datetime.timedelta(days=settings.GOALS_RETENTION_DAYS)
+    batch_size = batch_size or settings.GOALS_PURGE_BATCH_SIZE
+    pause = settings.GOALS_PURGE_BATCH_PAUSE if pause is None else pause
+    cutoff: datetime.datetime = timezone.now() - older_than
+    if dump_dir is not None:
+        dump_dir.mkdir(parents=True, exist_ok=True)
+
+    results: dict[str, dict] = {}
+    for name, get_queryset in PHASES:
+        queryset: QuerySet = get_queryset(cutoff)
+        # measured before the phase, the table's average row is what its deletion frees
+        size: float | None = row_size(queryset.model)
+        if dry_run:
+            rows = queryset.count()
+        else:
+            rows = purge_batches(queryset, batch_size, pause, dump_dir)
+            logger.info('purged %s %s older than %s', rows, name, cutoff)
+        if not rows:
+            reclaimed: int | None = 0
+        else:
+            reclaimed = round(rows * size) if size is not None else None
+        results[name] = {'rows': rows, 'bytes': reclaimed}
+    return results
@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from goals.models import BoardParticipant
+
+WRITE_ROLES = (BoardParticipant.Role.owner, BoardParticipant.Role.writer)
+
+
+class BoardRolesCache:
+    """Process-level LRU of users' {board_id: role} maps.
+    Entries are dropped by goals.signals when a BoardParticipant is saved or deleted in this process,
+    other processes see the change after ttl seconds, maxsize=0 disables caching"""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: OrderedDict[int, tuple[float, dict[int, int]]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, user_id: int) -> dict[int, int] | None:
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            expires, roles = entry
+            if expires <= self.clock():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return roles
+
+    def set(self, user_id: int, roles: dict[int, int]) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[user_id] = (self.clock() + self.ttl, roles)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, *user_ids: int) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._data.pop(user_id, None)
+
+    def invalidate_on_commit(self, *user_ids: int) -> None:
+        """Drops the users' entries now and, inside a transaction, again on commit,
+        so roles a concurrent request cached from the old rows are dropped too"""
+        self.invalidate(*user_ids)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self.invalidate(*user_ids))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+roles_cache = BoardRolesCache(settings.BOARD_ROLES_CACHE_SIZE, settings.BOARD_ROLES_CACHE_TTL)
+
+
+def load_board_roles(user) -> dict[int, int]:
+    """Returns user's {board_id: role} map"""
+    roles = roles_cache.get(user.pk)
+    if roles is None:
+        roles = dict(BoardParticipant.objects.filter(user=user).values_list('board_id', 'role'))
+        roles_cache.set(user.pk, roles)
+    return roles
+
+
+def get_board_roles(request) -> dict[int, int]:
+    """Returns {board_id: role} map of the request's user, loaded once per request"""
+    roles = getattr(request, '_board_roles', None)
+    if roles is None:
+        roles = request._board_roles = load_board_roles(request.user)
+    return roles
+
+
+def get_board_role(request, board_id) -> int | None:
+    """Returns user's role on the board or None if user is not a participant"""
+    try:
+        board_id = int(board_id)
+    except (TypeError, ValueError):
+        return None
+    return get_board_roles(request).get(board_id)
+
+
+def get_object_board_role(request, obj, board_id) -> int | None:
+    """Returns the role a with_board_role() queryset loaded with the object, else user's role on the board"""
+    role = getattr(obj, 'board_role', None)
+    return role if role is not None else get_board_role(request, board_id)
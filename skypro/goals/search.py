@@ -0,0 +1,154 @@
+from django.db import connections
+from django.db.models import F, FloatField, Q, QuerySet
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+# indexed text columns by table, search_fields of a view must be a subset of its model's columns
+SEARCH_COLUMNS: dict[str, tuple[str, ...]] = {
+    'goals_goal': ('title', 'description'),
+    'goals_goalcategory': ('title',),
+}
+# FTS5 trigram tokenizer matches substrings like ILIKE does, but only of 3 chars or more
+SQLITE_TRIGRAM_VERSION = (3, 34, 0)
+MIN_TRIGRAM_TERM = 3
+
+
+def fts_table(table: str) -> str:
+    return f'{table}_fts'
+
+
+def has_fts(connection) -> bool:
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= SQLITE_TRIGRAM_VERSION
+
+
+def _sqlite_statements(table: str, columns: tuple[str, ...]) -> list[str]:
+    """External content FTS5 table kept in sync with the table by triggers"""
+    fts = fts_table(table)
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    delete = f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    insert = f'INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new});'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', content_rowid='id', "
+        f"tokenize='trigram')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN {delete} {insert} END',
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+def trgm_index(table: str, column: str) -> str:
+    return f'{table}_{column}_upper_trgm_idx'
+
+
+def raw_trgm_index(table: str, column: str) -> str:
+    """Index on the raw column migration 0009 made before 0013 replaced it"""
+    return f'{table}_{column}_trgm_idx'
+
+
+def _postgresql_statements(table: str, columns: tuple[str, ...]) -> list[str]:
+    """icontains compiles to UPPER(column::text) LIKE UPPER(%s), the index is on that expression
+    or the planner never uses it"""
+    return [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        *(f'CREATE INDEX IF NOT EXISTS {trgm_index(table, column)} ON {table} '
+          f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+          for column in columns),
+    ]
+
+
+def install_search(schema_editor, tables: dict[str, tuple[str, ...]] = SEARCH_COLUMNS) -> None:
+    """Creates trigram indexes on PostgreSQL and FTS5 tables with triggers on SQLite, other
+    databases keep ILIKE scans. Idempotent, so it also restores triggers of a remade table"""
+    connection = schema_editor.connection
+    for table, columns in tables.items():
+        if connection.vendor == 'postgresql':
+            statements = _postgresql_statements(table, columns)
+        elif has_fts(connection):
+            statements = _sqlite_statements(table, columns)
+        else:
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+
+def uninstall_search(schema_editor, tables: dict[str, tuple[str, ...]] = SEARCH_COLUMNS) -> None:
+    connection = schema_editor.connection
+    for table, columns in tables.items():
+        if connection.vendor == 'postgresql':
+            for column in columns:
+                schema_editor.execute(f'DROP INDEX IF EXISTS {trgm_index(table, column)}')
+                schema_editor.execute(f'DROP INDEX IF EXISTS {raw_trgm_index(table, column)}')
+        elif has_fts(connection):
+            fts = fts_table(table)
+            for suffix in ('ai', 'ad', 'au'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+def fts_query(terms: list[str]) -> str:
+    """FTS5 query matching rows containing every term, terms are quoted so operators are plain text"""
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    """SearchFilter served by the indexes of goals.search, keeps ?search= and its substring semantics.
+    Results are ordered by relevance unless ?ordering= is given"""
+
+    def filter_queryset(self, request, queryset: QuerySet, view) -> QuerySet:
+        search_fields: list[str] | None = self.get_search_fields(view, request)
+        terms: list[str] = self.get_search_terms(request)
+        table: str = queryset.model._meta.db_table
+        if not search_fields or not terms or not set(search_fields) <= set(SEARCH_COLUMNS.get(table, ())):
+            return super().filter_queryset(request, queryset, view)
+
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            queryset = self._postgresql_rank(super().filter_queryset(request, queryset, view), search_fields, terms)
+        elif has_fts(connection):
+            queryset = self._sqlite_search(queryset, table, search_fields, terms)
+        else:
+            return super().filter_queryset(request, queryset, view)
+
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by(F('search_rank').desc(), *queryset.query.order_by)
+
+    def _postgresql_rank(self, queryset: QuerySet, search_fields: list[str], terms: list[str]) -> QuerySet:
+        """ILIKE filters are served by the trigram indexes, similarity gives the rank"""
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        from django.db.models.functions import Coalesce, Greatest
+
+        similarities = [
+            Greatest(*(Coalesce(TrigramWordSimilarity(term, field), 0.0) for field in search_fields))
+            if len(search_fields) > 1 else Coalesce(TrigramWordSimilarity(term, search_fields[0]), 0.0)
+            for term in terms
+        ]
+        rank = similarities[0]
+        for similarity in similarities[1:]:
+            rank = rank + similarity
+        return queryset.annotate(search_rank=rank)
+
+    def _sqlite_search(self, queryset: QuerySet, table: str, search_fields: list[str],
+                       terms: list[str]) -> QuerySet:
+        """Terms of 3 chars or more go to the FTS5 table, shorter ones the trigram index can't serve
+        are matched with icontains. bm25 is negated, so better matches rank higher"""
+        fts = fts_table(table)
+        long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_TERM]
+        for term in terms:
+            if len(term) < MIN_TRIGRAM_TERM:
+                queryset = queryset.filter(
+                    Q(*(Q(**{f'{field}__icontains': term}) for field in search_fields), _connector=Q.OR))
+        if not long_terms:
+            return queryset.annotate(search_rank=RawSQL('0.0', [], output_field=FloatField()))
+
+        query = '{' + ' '.join(search_fields) + '}: (' + fts_query(long_terms) + ')'
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [query]),
+        ).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({fts}) FROM {fts} WHERE {fts} MATCH %s AND {fts}.rowid = {table}.id',
+            [query], output_field=FloatField(),
+        ))
@@ -1,11 +1,17 @@
-from django.db import transaction
+from django.conf import settings
+from django.db import models, transaction
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
 
 from core.models import User
 from core.serializers import ProfileSerializer
-from goals.models import Goal, GoalCategory, GoalComment, Board, BoardParticipant
+from goals.dashboard import dashboard_cache
+from goals.models import ArchivalJob, Goal, GoalCategory, GoalComment, Board, BoardParticipant
+from goals.response_cache import bump_user_boards
+from goals.roles import WRITE_ROLES, get_board_role, roles_cache
+from goals.services import CategoryNotFound, DuplicateGoalTitle, NoWritePermission, create_goal
 
 
 class GoalCategoryCreateSerializer(serializers.ModelSerializer):
@@ -14,16 +20,16 @@ class GoalCategoryCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = GoalCategory
         read_only_fields = ("id", "created", "updated", "user", "board")
-        fields = "__all__"
+        exclude = ("deleted_at",)
 
     def create(self, validated_data):
         board_id = self.initial_data.pop('board', None)
-        board = get_object_or_404(Board, pk=board_id)
 
-        if not board.participants.filter(user=self.context["request"].user.pk, role__in=[1, 2]).exists():
+        if get_board_role(self.context["request"], board_id) not in WRITE_ROLES:
+            get_object_or_404(Board, pk=board_id)
             raise PermissionDenied({'non_field_errors': ["No write permission"]})
 
-        category = GoalCategory.objects.create(**validated_data, board=board)
+        category = GoalCategory.objects.create(**validated_data, board_id=int(board_id))
         return category
 
 
@@ -32,7 +38,7 @@ class GoalCategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = GoalCategory
-        fields = "__all__"
+        exclude = ("deleted_at",)
         read_only_fields = ("id", "created", "updated", "user")
         extra_kwargs = {
             'is_deleted': {'write_only': True}
@@ -40,45 +46,52 @@ class GoalCategorySerializer(serializers.ModelSerializer):
 
 
 class GoalCreateSerializer(serializers.ModelSerializer):
-    category = serializers.PrimaryKeyRelatedField(queryset=GoalCategory.objects.filter(is_deleted=False))
+    category = serializers.IntegerField(source='category_id')
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
     class Meta:
         model = Goal
         read_only_fields = ("id", "created", "updated", "user")
-        fields = "__all__"
-
-    def validate_category(self, value: GoalCategory):
-        if value.is_deleted:
-            raise serializers.ValidationError('No operations allowed on deleted category')
+        exclude = ("board", "archived_at")
+        extra_kwargs = {
+            'title': {'validators': []}
+        }
 
-        if not value.board.participants.filter(user=self.context["request"].user.pk, role__in=[1, 2]):
+    def create(self, validated_data: dict) -> Goal:
+        """Permission and title uniqueness are checked by the insert path of goals.services"""
+        try:
+            return create_goal(**validated_data)
+        except CategoryNotFound as error:
+            raise serializers.ValidationError({'category': [f'Invalid pk "{error}" - object does not exist.']})
+        except NoWritePermission:
             raise PermissionDenied({'non_field_errors': ["No write permission"]})
-
-        return value
+        except DuplicateGoalTitle:
+            raise serializers.ValidationError({'title': ['Goal with this title already exists.']})
 
 
 class GoalSerializer(serializers.ModelSerializer):
     class Meta:
         model = Goal
         read_only_fields = ("id", "created", "updated", "user")
-        fields = "__all__"
+        exclude = ("board", "archived_at")
 
 
 class GoalCommentCreateSerializer(serializers.ModelSerializer):
+    # goals of a deleted category are hidden until archival reaches them
+    goal = serializers.PrimaryKeyRelatedField(queryset=Goal.objects.filter(category__is_deleted=False))
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
     text = serializers.CharField(min_length=1, max_length=4000, allow_blank=False)
 
     class Meta:
         model = GoalComment
         read_only_fields = ("id", "created", "updated", "user")
-        fields = "__all__"
+        exclude = ("board",)
 
     def validate_goal(self, value: Goal):
         if value.status == 4:
             raise serializers.ValidationError('No operations allowed in archived goal')
 
-        if not value.category.board.participants.filter(user=self.context["request"].user.pk, role__in=[1, 2]):
+        if get_board_role(self.context["request"], value.board_id) not in WRITE_ROLES:
             raise PermissionDenied({'non_field_errors': ["No write permission"]})
 
         return value
@@ -90,7 +103,7 @@ class GoalCommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = GoalComment
         read_only_fields = ("id", "created", "updated", "user", "goal")
-        fields = "__all__"
+        exclude = ("board",)
 
 
 class BoardCreateSerializer(serializers.ModelSerializer):
@@ -98,7 +111,7 @@ class BoardCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Board
-        fields = '__all__'
+        exclude = ('deleted_at',)
         read_only_fields = ('id', 'created', 'updated')
 
     def create(self, validated_data: dict):
@@ -108,9 +121,45 @@ class BoardCreateSerializer(serializers.ModelSerializer):
         return board
 
 
+class UsernameField(serializers.SlugRelatedField):
+    """Username of a participant, users are resolved at once by BoardParticipantListSerializer"""
+
+    def to_internal_value(self, data) -> str:
+        if not isinstance(data, str):
+            self.fail('invalid')
+        return data
+
+
+class BoardParticipantListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data) -> list[dict]:
+        participants: list[dict] = super().to_internal_value(data)
+        users: dict[str, User] = {
+            user.username: user
+            for user in User.objects.filter(username__in={part['user'] for part in participants})
+        }
+
+        errors: list[dict] = [
+            {} if part['user'] in users else {'user': [f"Object with username={part['user']} does not exist."]}
+            for part in participants
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        for part in participants:
+            part['user'] = users[part['user']]
+        return participants
+
+    def to_representation(self, data) -> list:
+        if isinstance(data, models.Manager):
+            data = data.all()
+            if data._result_cache is None:
+                data = data.select_related('user')
+        return super().to_representation(data)
+
+
 class BoardParticipantSerializer(serializers.ModelSerializer):
     role = serializers.ChoiceField(required=True, choices=BoardParticipant.Role.choices)
-    user = serializers.SlugRelatedField(
+    user = UsernameField(
         slug_field='username',
         queryset=User.objects.all()
     )
@@ -119,6 +168,7 @@ class BoardParticipantSerializer(serializers.ModelSerializer):
         model = BoardParticipant
         fields = '__all__'
         read_only_fields = ('id', 'created', 'updated', 'board')
+        list_serializer_class = BoardParticipantListSerializer
 
 
 class BoardSerializer(serializers.ModelSerializer):
@@ -128,38 +178,52 @@ class BoardSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Board
-        fields = '__all__'
+        exclude = ('deleted_at',)
         read_only_fields = ('id', 'created', 'updated')
 
+    @staticmethod
+    def sync_participants(instance: Board, owner: User, new_participants: list[dict]) -> None:
+        """Applies participants diff with one delete, one bulk_update and one bulk_create"""
+        new_by_id: dict[int, dict] = {part['user'].id: part for part in new_participants if part['user'] != owner}
+        old_by_id: dict[int, BoardParticipant] = {
+            part.user_id: part for part in instance.participants.exclude(user=owner)
+        }
+        now = timezone.now()
+
+        to_update: list[BoardParticipant] = []
+        for user_id, old_participant in old_by_id.items():
+            if user_id in new_by_id and old_participant.role != new_by_id[user_id]['role']:
+                old_participant.role = new_by_id[user_id]['role']
+                old_participant.updated = now
+                to_update.append(old_participant)
+        to_delete: list[int] = [user_id for user_id in old_by_id if user_id not in new_by_id]
+        to_create: list[BoardParticipant] = [
+            BoardParticipant(board=instance, user=part['user'], role=part['role'])
+            for user_id, part in new_by_id.items() if user_id not in old_by_id
+        ]
+
+        if to_delete:
+            instance.participants.filter(user_id__in=to_delete).delete()
+        if to_update:
+            BoardParticipant.objects.bulk_update(to_update, ['role', 'updated'])
+        if to_create:
+            BoardParticipant.objects.bulk_create(to_create)
+
+        # bulk operations don't send signals
+        changed_user_ids: list[int] = [*to_delete, *(part.user_id for part in to_update + to_create)]
+        roles_cache.invalidate_on_commit(*changed_user_ids)
+        dashboard_cache.invalidate_users(*changed_user_ids)
+        bump_user_boards(*(part.user_id for part in to_create))
+
     def update(self, instance, validated_data: dict):
         owner = validated_data.pop('user')
         if 'title' in validated_data:
             instance.title = validated_data['title']
-        if 'participants' in validated_data:
-            new_participants = validated_data.pop('participants')
-            new_by_id = {part['user'].id: part for part in new_participants}
-
-            old_participants = instance.participants.exclude(user=owner)
-            with transaction.atomic():
-                for old_participant in old_participants:
-                    if old_participant.user_id not in new_by_id:
-                        old_participant.delete()
-                    else:
-                        if (
-                                old_participant.role
-                                != new_by_id[old_participant.user_id]['role']
-                        ):
-                            old_participant.role = new_by_id[old_participant.user_id][
-                                'role'
-                            ]
-                            old_participant.save()
-                        new_by_id.pop(old_participant.user_id)
-                for new_part in new_by_id.values():
-                    BoardParticipant.objects.create(
-                        board=instance, user=new_part['user'], role=new_part['role']
-                    )
-
-        instance.save()
+
+        with transaction.atomic():
+            if 'participants' in validated_data:
+                self.sync_participants(instance, owner, validated_data.pop('participants'))
+            instance.save()
 
         return instance
 
@@ -167,4 +231,49 @@ class BoardSerializer(serializers.ModelSerializer):
 class BoardListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Board
-        fields = '__all__'
+        exclude = ('deleted_at',)
+
+
+class BatchField(serializers.ListField):
+    """Request body of batch endpoints: a list of objects, each item is validated on its own"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('child', serializers.DictField())
+        kwargs.setdefault('allow_empty', False)
+        kwargs.setdefault('max_length', settings.GOALS_BATCH_MAX_SIZE)
+        super().__init__(**kwargs)
+
+
+class GoalBatchCreateSerializer(serializers.ModelSerializer):
+    category = serializers.IntegerField()
+
+    class Meta:
+        model = Goal
+        fields = ('title', 'description', 'due_date', 'status', 'priority', 'category')
+        extra_kwargs = {
+            'title': {'validators': []}
+        }
+
+
+class GoalBatchUpdateSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Goal.Status.choices, required=False)
+    priority = serializers.ChoiceField(choices=Goal.Priority.choices, required=False)
+
+    def validate(self, attrs: dict) -> dict:
+        if 'status' not in attrs and 'priority' not in attrs:
+            raise serializers.ValidationError('Nothing to update')
+        return attrs
+
+
+class GoalCommentBatchCreateSerializer(serializers.Serializer):
+    goal = serializers.IntegerField()
+    text = serializers.CharField(min_length=1, max_length=4000, allow_blank=False)
+
+
+class ArchivalJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivalJob
+        exclude = ('user',)
+        read_only_fields = ('id', 'created', 'updated', 'board', 'category', 'status', 'total', 'archived',
+                            'last_id', 'error', 'finished')
@@ -0,0 +1,41 @@
+from django.db import IntegrityError, transaction
+
+from core.models import User
+from goals.models import Goal, GoalCategory
+
+
+class GoalCreateError(Exception):
+    pass
+
+
+class CategoryNotFound(GoalCreateError):
+    pass
+
+
+class NoWritePermission(GoalCreateError):
+    pass
+
+
+class DuplicateGoalTitle(GoalCreateError):
+    pass
+
+
+def create_goal(user: User, category_id: int, **fields) -> Goal:
+    """Creates a goal in a category the user may write to with one permission query and one insert.
+    Title uniqueness is left to the database, a duplicate raises DuplicateGoalTitle"""
+    category: GoalCategory | None = GoalCategory.objects.writable_by(user).only('id', 'board', 'is_deleted').filter(
+        id=category_id).first()
+    if category is None:
+        if GoalCategory.objects.filter(id=category_id, is_deleted=False).exists():
+            raise NoWritePermission(category_id)
+        raise CategoryNotFound(category_id)
+
+    goal = Goal(user=user, category=category, **fields)
+    try:
+        with transaction.atomic():
+            goal.save(force_insert=True)
+    except IntegrityError:
+        if Goal.objects.filter(title=goal.title).exists():
+            raise DuplicateGoalTitle(goal.title)
+        raise
+    return goal
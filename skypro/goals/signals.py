@@ -0,0 +1,40 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from goals.dashboard import dashboard_cache
+from goals.models import Board, BoardParticipant, Goal, GoalCategory, GoalComment
+from goals.response_cache import bump_board_versions, bump_user_boards
+from goals.roles import roles_cache
+
+
+@receiver([post_save, post_delete], sender=BoardParticipant)
+def invalidate_board_roles(sender, instance: BoardParticipant, **kwargs) -> None:
+    roles_cache.invalidate_on_commit(instance.user_id)
+    dashboard_cache.invalidate_users(instance.user_id)
+    bump_board_versions(instance.board_id)
+    bump_user_boards(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Board)
+def invalidate_board_dashboards(sender, instance: Board, **kwargs) -> None:
+    dashboard_cache.invalidate_boards(instance.pk)
+    bump_board_versions(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=GoalCategory)
+def invalidate_category_dashboards(sender, instance: GoalCategory, **kwargs) -> None:
+    """The category may have moved to another board, so both its old and new dashboards go"""
+    dashboard_cache.invalidate_categories(instance.pk)
+    dashboard_cache.invalidate_boards(instance.board_id)
+    bump_board_versions(instance.board_id)
+
+
+@receiver([post_save, post_delete], sender=Goal)
+def invalidate_goal_dashboards(sender, instance: Goal, **kwargs) -> None:
+    dashboard_cache.invalidate_categories(instance.category_id)
+    bump_board_versions(instance.board_id)
+
+
+@receiver([post_save, post_delete], sender=GoalComment)
+def invalidate_comment_responses(sender, instance: GoalComment, **kwargs) -> None:
+    bump_board_versions(instance.board_id)
@@ -8,11 +8,18 @@ urlpatterns = [
     path("goal_category/<pk>", views.GoalCategoryView.as_view()),
     path("goal/create", views.GoalCreateView.as_view()),
     path("goal/list", views.GoalListView.as_view()),
+    path("goal/batch_create", views.GoalBatchCreateView.as_view()),
+    path("goal/batch_update", views.GoalBatchUpdateView.as_view()),
+    path("goal/dashboard", views.GoalDashboardView.as_view()),
     path("goal/<pk>", views.GoalView.as_view()),
     path("goal_comment/create", views.GoalCommentCreateView.as_view()),
     path("goal_comment/list", views.GoalCommentListView.as_view()),
+    path("goal_comment/batch_create", views.GoalCommentBatchCreateView.as_view()),
     path("goal_comment/<pk>", views.GoalCommentView.as_view()),
     path('board/create', views.BoardCreateView.as_view()),
+    path('response_cache/stats', views.ResponseCacheStatsView.as_view()),
     path('board/list', views.BoardListView.as_view()),
     path('board/<int:pk>', views.BoardView.as_view()),
+    path('archival_job/list', views.ArchivalJobListView.as_view()),
+    path('archival_job/<int:pk>', views.ArchivalJobView.as_view()),
 ]
@@ -1,16 +1,29 @@
-from django.db import transaction
-from django.db.models import Q, QuerySet
+from django.db.models import QuerySet
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import permissions, filters
-from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework import permissions, filters, status
+from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from goals import archival, batch
+from goals.dashboard import dashboard_cache, get_dashboard
 
 from goals.filters import GoalDateFilter, CommentGoalFilter, CategoryBoardFilter
-from goals.models import Goal, GoalCategory, GoalComment, Board
+from goals.mixins import BoardVersionedCacheMixin, QuerySetOptimizerMixin
+from goals.models import ArchivalJob, Goal, GoalCategory, GoalComment, Board
+from goals.pagination import GoalsPagination
 from goals.permissions import BoardPermissions, CategoryPermissions, GoalPermissions, \
     CommentPermissions
+from goals.response_cache import bump_board_versions, response_cache_stats
+from goals.search import RankedSearchFilter
 from goals.serializers import GoalCreateSerializer, GoalSerializer, GoalCategoryCreateSerializer, \
     GoalCategorySerializer, GoalCommentCreateSerializer, GoalCommentSerializer, BoardCreateSerializer, BoardSerializer, \
-    BoardListSerializer
+    BoardListSerializer, BatchField, ArchivalJobSerializer
+
+
+def archival_response(job: ArchivalJob) -> Response:
+    """Deletion answers at once, goals are archived by the job the Location header points to"""
+    return Response(status=status.HTTP_204_NO_CONTENT, headers={'Location': f'/goals/archival_job/{job.pk}'})
 
 
 class GoalCategoryCreateView(CreateAPIView):
@@ -19,14 +32,15 @@ class GoalCategoryCreateView(CreateAPIView):
     serializer_class = GoalCategoryCreateSerializer
 
 
-class GoalCategoryListView(ListAPIView):
+class GoalCategoryListView(BoardVersionedCacheMixin, QuerySetOptimizerMixin, ListAPIView):
     model = GoalCategory
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GoalCategorySerializer
+    pagination_class = GoalsPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
-        filters.SearchFilter,
+        RankedSearchFilter,
     ]
     filterset_class = CategoryBoardFilter
     ordering_fields = ["title", "created"]
@@ -34,22 +48,29 @@ class GoalCategoryListView(ListAPIView):
     search_fields = ["title"]
 
     def get_queryset(self) -> QuerySet:
-        return GoalCategory.objects.filter(board__participants__user=self.request.user, is_deleted=False)
+        return GoalCategory.objects.visible_to(self.request.user)
 
 
-class GoalCategoryView(RetrieveUpdateDestroyAPIView):
+class GoalCategoryView(QuerySetOptimizerMixin, RetrieveUpdateDestroyAPIView):
     model = GoalCategory
     serializer_class = GoalCategorySerializer
     permission_classes = [CategoryPermissions]
 
     def get_queryset(self) -> QuerySet:
-        return GoalCategory.objects.filter(board__participants__user=self.request.user, is_deleted=False)
+        return GoalCategory.objects.visible_to(self.request.user).with_board_role()
+
+    def perform_update(self, serializer):
+        # the category's old board is not known to the post_save signal
+        old_board_id: int = serializer.instance.board_id
+        super().perform_update(serializer)
+        bump_board_versions(old_board_id)
 
     def perform_destroy(self, instance):
-        instance.is_deleted = True
-        instance.save()
-        Goal.objects.filter(category=instance.id).update(status=4)
-        return instance
+        return archival.delete_category(instance, self.request.user)
+
+    def destroy(self, request, *args, **kwargs) -> Response:
+        job: ArchivalJob = self.perform_destroy(self.get_object())
+        return archival_response(job)
 
 
 class GoalCreateView(CreateAPIView):
@@ -58,14 +79,15 @@ class GoalCreateView(CreateAPIView):
     serializer_class = GoalCreateSerializer
 
 
-class GoalListView(ListAPIView):
+class GoalListView(BoardVersionedCacheMixin, QuerySetOptimizerMixin, ListAPIView):
     model = Goal
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GoalSerializer
+    pagination_class = GoalsPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
-        filters.SearchFilter,
+        RankedSearchFilter,
     ]
     filterset_class = GoalDateFilter
     ordering_fields = ["title", "created"]
@@ -73,24 +95,24 @@ class GoalListView(ListAPIView):
     search_fields = ["title", "description"]
 
     def get_queryset(self) -> QuerySet:
-        category_set: QuerySet = GoalCategory.objects.filter(board__participants__user=self.request.user,
-                                                             is_deleted=False)
+        return Goal.objects.visible_to(self.request.user)
 
-        return Goal.objects.filter(
-            Q(category__in=category_set) & ~Q(status=Goal.Status.archived) & Q(category__is_deleted=False))
 
-
-class GoalView(RetrieveUpdateDestroyAPIView):
+class GoalView(QuerySetOptimizerMixin, RetrieveUpdateDestroyAPIView):
     model = Goal
     permission_classes = [GoalPermissions]
     serializer_class = GoalSerializer
 
     def get_queryset(self) -> QuerySet:
-        category_set: QuerySet = GoalCategory.objects.filter(board__participants__user=self.request.user,
-                                                             is_deleted=False)
+        return Goal.objects.visible_to(self.request.user).with_board_role()
 
-        return Goal.objects.filter(
-            Q(category__in=category_set) & ~Q(status=Goal.Status.archived) & Q(category__is_deleted=False))
+    def perform_update(self, serializer):
+        # the goal's old category is not known to the post_save signal
+        old_category_id: int = serializer.instance.category_id
+        old_board_id: int = serializer.instance.board_id
+        super().perform_update(serializer)
+        dashboard_cache.invalidate_categories(old_category_id)
+        bump_board_versions(old_board_id)
 
     def perform_destroy(self, instance):
         instance.status = 4
@@ -98,16 +120,51 @@ class GoalView(RetrieveUpdateDestroyAPIView):
         return instance
 
 
+class BatchView(APIView):
+    """Takes a list of items and returns per-item results in the same order"""
+    permission_classes = [permissions.IsAuthenticated]
+    batch_handler = None
+
+    def post(self, request, *args, **kwargs) -> Response:
+        items: list[dict] = BatchField().run_validation(request.data)
+        return Response({'results': self.batch_handler(request, items)})
+
+
+class GoalBatchCreateView(BatchView):
+    batch_handler = staticmethod(batch.create_goals)
+
+
+class GoalBatchUpdateView(BatchView):
+    batch_handler = staticmethod(batch.update_goals)
+
+
+class GoalDashboardView(APIView):
+    """Goal counts by status, priority and overdue of every board and category visible to the user"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs) -> Response:
+        return Response(get_dashboard(request.user))
+
+
+class ResponseCacheStatsView(APIView):
+    """Hit ratio of the list response cache in this process by view"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs) -> Response:
+        return Response(response_cache_stats.stats())
+
+
 class GoalCommentCreateView(CreateAPIView):
     model = GoalComment
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GoalCommentCreateSerializer
 
 
-class GoalCommentListView(ListAPIView):
+class GoalCommentListView(QuerySetOptimizerMixin, ListAPIView):
     model = GoalComment
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GoalCommentSerializer
+    pagination_class = GoalsPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
@@ -119,22 +176,20 @@ class GoalCommentListView(ListAPIView):
     search_fields = ["goal"]
 
     def get_queryset(self) -> QuerySet:
-        category_set: QuerySet = GoalCategory.objects.filter(board__participants__user=self.request.user,
-                                                             is_deleted=False)
+        return GoalComment.objects.visible_to(self.request.user)
 
-        return GoalComment.objects.filter(goal__category__in=category_set)
 
-
-class GoalCommentView(RetrieveUpdateDestroyAPIView):
+class GoalCommentView(QuerySetOptimizerMixin, RetrieveUpdateDestroyAPIView):
     model = GoalComment
     permission_classes = [CommentPermissions]
     serializer_class = GoalCommentSerializer
 
     def get_queryset(self) -> QuerySet:
-        category_set: QuerySet = GoalCategory.objects.filter(board__participants__user=self.request.user,
-                                                             is_deleted=False)
+        return GoalComment.objects.visible_to(self.request.user)
+
 
-        return GoalComment.objects.filter(goal__category__in=category_set)
+class GoalCommentBatchCreateView(BatchView):
+    batch_handler = staticmethod(batch.create_comments)
 
 
 class BoardCreateView(CreateAPIView):
@@ -143,25 +198,23 @@ class BoardCreateView(CreateAPIView):
     serializer_class = BoardCreateSerializer
 
 
-class BoardView(RetrieveUpdateDestroyAPIView):
+class BoardView(QuerySetOptimizerMixin, RetrieveUpdateDestroyAPIView):
     model = Board
     permission_classes = [permissions.IsAuthenticated, BoardPermissions]
     serializer_class = BoardSerializer
 
     def get_queryset(self) -> QuerySet:
-        return Board.objects.filter(participants__user=self.request.user, is_deleted=False)
+        return Board.objects.visible_to(self.request.user).with_board_role()
 
     def perform_destroy(self, instance: Board):
-        with transaction.atomic():
-            instance.is_deleted = True
-            instance.save()
-            instance.categories.update(is_deleted=True)
-            Goal.objects.filter(category__board=instance).update(status=Goal.Status.archived)
+        return archival.delete_board(instance, self.request.user)
 
-        return instance
+    def destroy(self, request, *args, **kwargs) -> Response:
+        job: ArchivalJob = self.perform_destroy(self.get_object())
+        return archival_response(job)
 
 
-class BoardListView(ListAPIView):
+class BoardListView(BoardVersionedCacheMixin, QuerySetOptimizerMixin, ListAPIView):
     model = Board
     permission_classes = [permissions.IsAuthenticated, BoardPermissions]
     serializer_class = BoardListSerializer
@@ -171,4 +224,24 @@ class BoardListView(ListAPIView):
     ordering = ['-title']
 
     def get_queryset(self) -> QuerySet:
-        return Board.objects.filter(participants__user=self.request.user, is_deleted=False)
+        return Board.objects.visible_to(self.request.user)
+
+
+class ArchivalJobListView(ListAPIView):
+    model = ArchivalJob
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ArchivalJobSerializer
+    pagination_class = GoalsPagination
+    ordering = ['-created']
+
+    def get_queryset(self) -> QuerySet:
+        return ArchivalJob.objects.filter(user=self.request.user).order_by('-created')
+
+
+class ArchivalJobView(RetrieveAPIView):
+    model = ArchivalJob
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ArchivalJobSerializer
+
+    def get_queryset(self) -> QuerySet:
+        return ArchivalJob.objects.filter(user=self.request.user)
@@ -142,6 +142,44 @@ REST_FRAMEWORK = {
 
 AUTH_USER_MODEL = 'core.User'
 
+# e.g. CACHE_URL=redis://redis:6379/1 to share the cache between gunicorn workers and the bot
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# django-environ maps redis:// and rediscache:// to django-redis, Django's own backend runs on redis-py
+if CACHES['default']['BACKEND'] == 'django_redis.cache.RedisCache':
+    CACHES['default']['BACKEND'] = 'django.core.cache.backends.redis.RedisCache'
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+# Seconds goal, category and board list responses stay in the cache, 0 disables it.
+# Writes replace board versions in the cache, a process-local one leaves other gunicorn workers
+# serving stale lists, so the cache is off unless CACHE_URL points to a shared backend
+GOALS_RESPONSE_CACHE_TIMEOUT = env.int(
+    'GOALS_RESPONSE_CACHE_TIMEOUT',
+    default=0 if CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES else 5 * 60,
+)
+
+# Process-level LRU of users' board roles, 0 disables it. Role changes drop entries of this process only,
+# other gunicorn workers keep a removed participant's role up to BOARD_ROLES_CACHE_TTL seconds
+BOARD_ROLES_CACHE_SIZE = env.int('BOARD_ROLES_CACHE_SIZE', default=0)
+BOARD_ROLES_CACHE_TTL = env.int('BOARD_ROLES_CACHE_TTL', default=30)
+# Max items per request of goals batch endpoints
+GOALS_BATCH_MAX_SIZE = env.int('GOALS_BATCH_MAX_SIZE', default=500)
+# Process-level LRU of users' goal dashboards. Writes in this process drop entries at once,
+# other processes see them after GOALS_DASHBOARD_CACHE_TTL seconds, 0 size disables it
+GOALS_DASHBOARD_CACHE_SIZE = env.int('GOALS_DASHBOARD_CACHE_SIZE', default=1000)
+GOALS_DASHBOARD_CACHE_TTL = env.int('GOALS_DASHBOARD_CACHE_TTL', default=60)
+# Goals archived per transaction after a board or category is deleted and seconds to pause between batches
+GOALS_ARCHIVAL_BATCH_SIZE = env.int('GOALS_ARCHIVAL_BATCH_SIZE', default=1000)
+GOALS_ARCHIVAL_BATCH_PAUSE = env.float('GOALS_ARCHIVAL_BATCH_PAUSE', default=0.05)
+# Soft-deleted boards and categories and archived goals older than GOALS_RETENTION_DAYS are purged
+# by the purge_deleted_goals command, rows deleted per transaction and seconds to pause between batches
+GOALS_RETENTION_DAYS = env.int('GOALS_RETENTION_DAYS', default=90)
+GOALS_PURGE_BATCH_SIZE = env.int('GOALS_PURGE_BATCH_SIZE', default=1000)
+GOALS_PURGE_BATCH_PAUSE = env.float('GOALS_PURGE_BATCH_PAUSE', default=0.1)
+
 SOCIAL_AUTH_JSONFIELD_ENABLED = True
 SOCIAL_AUTH_JSONFIELD_CUSTOM = 'django.db.models.JSONField'
 SOCIAL_AUTH_VK_OAUTH2_KEY = env.str('VK_OAUTH2_KEY')
@@ -164,3 +202,31 @@ SOCIAL_AUTH_USER_MODEL = 'core.User'
 # SESSION_COOKIE_SECURE = True
 
 TG_TOKEN = env.str('TG_TOKEN')
+TG_API_URL = env.str('TG_API_URL', default='https://api.telegram.org')
+TG_POOL_SIZE = env.int('TG_POOL_SIZE', default=10)
+TG_TIMEOUT = env.float('TG_TIMEOUT', default=10)
+TG_MAX_RETRIES = env.int('TG_MAX_RETRIES', default=3)
+# Webhook mode: /bot/webhook accepts updates with this X-Telegram-Bot-Api-Secret-Token only,
+# every web worker handles them, so BOT_STORAGE_BACKEND must be the DB or Redis storage
+TG_WEBHOOK_SECRET = env.str('TG_WEBHOOK_SECRET', default='')
+TG_WEBHOOK_WORKERS = env.int('TG_WEBHOOK_WORKERS', default=4)
+TG_WEBHOOK_QUEUE_SIZE = env.int('TG_WEBHOOK_QUEUE_SIZE', default=1000)
+# Outgoing messages per second for the whole bot and per chat, a chat may burst TG_CHAT_SEND_BURST messages
+TG_SEND_RATE = env.float('TG_SEND_RATE', default=30)
+TG_CHAT_SEND_RATE = env.float('TG_CHAT_SEND_RATE', default=1)
+TG_CHAT_SEND_BURST = env.float('TG_CHAT_SEND_BURST', default=3)
+# runbot serves Prometheus metrics on 127.0.0.1:BOT_METRICS_PORT/metrics, 0 disables it
+BOT_METRICS_PORT = env.int('BOT_METRICS_PORT', default=0)
+# Bot-side LRU of verified TgUsers by chat id, entries live TG_USER_CACHE_TTL seconds, 0 size disables it
+TG_USER_CACHE_SIZE = env.int('TG_USER_CACHE_SIZE', default=10000)
+TG_USER_CACHE_TTL = env.int('TG_USER_CACHE_TTL', default=5 * 60)
+# Verification codes live TG_VERIFICATION_CODE_TTL seconds, a chat gets at most
+# TG_VERIFICATION_CODE_LIMIT codes per TG_VERIFICATION_CODE_WINDOW seconds
+TG_VERIFICATION_CODE_TTL = env.int('TG_VERIFICATION_CODE_TTL', default=10 * 60)
+TG_VERIFICATION_CODE_LIMIT = env.int('TG_VERIFICATION_CODE_LIMIT', default=5)
+TG_VERIFICATION_CODE_WINDOW = env.int('TG_VERIFICATION_CODE_WINDOW', default=60 * 60)
+
+# bot.tg.data_storage.BotDataStorage, bot.tg.db_storage.DbDataStorage or bot.tg.redis_storage.RedisDataStorage
+BOT_STORAGE_BACKEND = env.str('BOT_STORAGE_BACKEND', default='bot.tg.data_storage.BotDataStorage')
+BOT_STORAGE_TTL = env.int('BOT_STORAGE_TTL', default=24 * 60 * 60)
+BOT_STORAGE_REDIS_URL = env.str('BOT_STORAGE_REDIS_URL', default='redis://localhost:6379/0')
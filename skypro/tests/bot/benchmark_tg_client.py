@@ -0,0 +1,56 @@
+"""Compares sendMessage latency of one-off requests and of the pooled TgClient session
+against a local stub Bot API. Run from the skypro directory: python -m tests.bot.benchmark_tg_client"""
+import argparse
+import os
+import statistics
+import time
+
+import django
+import requests
+
+
+def measure(send, messages: int) -> list[float]:
+    timings: list[float] = []
+    for i in range(messages):
+        started = time.perf_counter()
+        send(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    p95 = statistics.quantiles(timings, n=20)[-1]
+    print(f'{name:<20}{statistics.mean(timings):>10.3f}{statistics.median(timings):>10.3f}{p95:>10.3f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Reports per-message latency against a local stub Bot API')
+    parser.add_argument('--messages', type=int, default=1000)
+    messages: int = parser.parse_args().messages
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skypro.settings')
+    django.setup()
+    from bot.tg.client import TgClient
+    from bot.tg.dc import SendMessagesResponse
+    from tests.bot.stub_server import StubTelegramServer
+
+    with StubTelegramServer() as server:
+        client = TgClient('token', api_url=server.url)
+
+        def send_one_off(i: int) -> None:
+            response = requests.post(client.get_url('sendMessage'), json={'chat_id': 1, 'text': str(i)})
+            SendMessagesResponse(**response.json())
+
+        one_off = measure(send_one_off, messages)
+        connections = server.connections
+        pooled = measure(lambda i: client.send_message(1, str(i)), messages)
+        client.close()
+
+        print(f'{"ms per message":<20}{"mean":>10}{"p50":>10}{"p95":>10}')
+        report('one-off requests', one_off)
+        report('pooled session', pooled)
+        print(f'connections opened: {connections} one-off, {server.connections - connections} pooled')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def make_update(update_id: int, chat_id: int, text: str) -> dict:
+    """Builds a getUpdates item with a text message"""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'from': {'id': chat_id, 'first_name': 'user', 'username': f'user{chat_id}'},
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': text,
+        },
+    }
+
+
+class StubTelegramServer:
+    """Local stand-in for the Bot API: serves queued updates, records sent messages.
+    Used by bot tests and tests.bot.benchmark_tg_client, listens on 127.0.0.1 and a free port"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.updates: list[dict] = []
+        self.sent: list[dict] = []
+        self.errors: list[tuple[int, dict]] = []
+        self.connections: int = 0
+        self.lock = threading.Lock()
+        self.new_updates = threading.Condition(self.lock)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self) -> 'StubTelegramServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def push_updates(self, *updates: dict) -> None:
+        with self.new_updates:
+            self.updates.extend(updates)
+            self.new_updates.notify_all()
+
+    def fail_next(self, status: int, body: dict) -> None:
+        """Makes the next API call answer with the given status and body"""
+        with self.lock:
+            self.errors.append((status, body))
+
+    def get_updates(self, params: dict) -> dict:
+        offset = int(params.get('offset', 0))
+        timeout = min(float(params.get('timeout', 0)), 0.5)
+        with self.new_updates:
+            self.new_updates.wait_for(lambda: any(u['update_id'] >= offset for u in self.updates), timeout=timeout)
+            result = [update for update in self.updates if update['update_id'] >= offset][:100]
+        return {'ok': True, 'result': result}
+
+    def send_message(self, params: dict) -> dict:
+        with self.lock:
+            self.sent.append(params)
+            message_id = len(self.sent)
+        return {
+            'ok': True,
+            'result': {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'from': {'id': 0, 'first_name': 'bot', 'username': 'bot'},
+                'chat': {'id': params['chat_id'], 'type': 'private'},
+                'text': params['text'],
+            },
+        }
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                super().setup()
+                with server.lock:
+                    server.connections += 1
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _params(self) -> dict:
+                url = urlparse(self.path)
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if length := int(self.headers.get('Content-Length') or 0):
+                    params.update(json.loads(self.rfile.read(length)))
+                return params
+
+            def _reply(self, status: int, body: dict) -> None:
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _dispatch(self) -> None:
+                params = self._params()
+                if server.latency:
+                    time.sleep(server.latency)
+                with server.lock:
+                    error = server.errors.pop(0) if server.errors else None
+                if error:
+                    return self._reply(*error)
+
+                method = self.path.split('?')[0].rsplit('/', 1)[-1]
+                if method == 'getUpdates':
+                    return self._reply(200, server.get_updates(params))
+                if method == 'sendMessage':
+                    return self._reply(200, server.send_message(params))
+                return self._reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+
+            do_GET = _dispatch
+            do_POST = _dispatch
+
+        return Handler
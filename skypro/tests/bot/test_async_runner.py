@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+from bot.tg.async_runner import AsyncBotRunner
+from bot.tg.client import TgClient
+from bot.tg.updates import Message
+from tests.bot.stub_server import StubTelegramServer, make_update
+
+
+class RecordingHandler:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active: int = 0
+        self.max_active: int = 0
+        self.texts: dict[int, list[str]] = defaultdict(list)
+
+    def __call__(self, msg: Message) -> None:
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+            self.texts[msg.chat.id].append(msg.text)
+
+
+class TestAsyncBotRunner:
+
+    def test_load(self):
+        chats, per_chat, delay = 20, 10, 0.01
+        handler = RecordingHandler(delay=delay)
+
+        with StubTelegramServer() as server:
+            server.push_updates(*(
+                make_update(update_id=i, chat_id=i % chats + 1, text=str(i // chats))
+                for i in range(chats * per_chat)
+            ))
+            runner = AsyncBotRunner(TgClient('token', server.url), handler, workers=8, poll_timeout=1)
+            started = time.perf_counter()
+            asyncio.run(runner.run(max_updates=chats * per_chat))
+            elapsed = time.perf_counter() - started
+
+        assert runner.offset == chats * per_chat
+        assert handler.texts == {chat_id: [str(i) for i in range(per_chat)] for chat_id in range(1, chats + 1)}
+        assert 1 < handler.max_active <= 8
+        assert elapsed < chats * per_chat * delay
+
+    def test_chat_order_with_single_chat(self):
+        handler = RecordingHandler(delay=0.001)
+
+        with StubTelegramServer() as server:
+            server.push_updates(*(make_update(update_id=i, chat_id=1, text=str(i)) for i in range(30)))
+            asyncio.run(AsyncBotRunner(TgClient('token', server.url), handler, poll_timeout=1).run(max_updates=30))
+
+        assert handler.texts[1] == [str(i) for i in range(30)]
+        assert handler.max_active == 1
+
+    def test_handler_errors_do_not_stop_runner(self):
+        handled: list[str] = []
+
+        def handler(msg: Message) -> None:
+            if msg.text == 'fail':
+                raise ValueError(msg.text)
+            handled.append(msg.text)
+
+        with StubTelegramServer() as server:
+            server.push_updates(make_update(1, 1, 'fail'), make_update(2, 1, 'ok'))
+            asyncio.run(AsyncBotRunner(TgClient('token', server.url), handler, poll_timeout=1).run(max_updates=2))
+
+        assert handled == ['ok']
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+import requests
+
+from bot.tg.client import TgClient, get_tg_client
+from tests.bot.stub_server import StubTelegramServer, make_update
+
+
+@pytest.fixture()
+def server() -> StubTelegramServer:
+    with StubTelegramServer() as server:
+        yield server
+
+
+class TestTgClient:
+
+    def test_connection_is_reused(self, server: StubTelegramServer):
+        client = TgClient('token', api_url=server.url)
+        for i in range(5):
+            assert client.send_message(chat_id=1, text=str(i)).ok
+
+        assert server.connections == 1
+        assert [message['text'] for message in server.sent] == ['0', '1', '2', '3', '4']
+
+    def test_retry_after(self, server: StubTelegramServer):
+        server.fail_next(429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                               'parameters': {'retry_after': 0}})
+        client = TgClient('token', api_url=server.url)
+
+        response = client.send_message(chat_id=1, text='text')
+
+        assert response.ok
+        assert response.result.text == 'text'
+
+    def test_server_error_backoff(self, server: StubTelegramServer):
+        server.fail_next(502, {'ok': False})
+        server.push_updates(make_update(1, 1, 'text'))
+        client = TgClient('token', api_url=server.url, backoff=0)
+
+        assert [item.update_id for item in client.get_updates(timeout=0).result] == [1]
+
+    def test_retries_exhausted(self, server: StubTelegramServer):
+        for _ in range(2):
+            server.fail_next(429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                                   'parameters': {'retry_after': 0}})
+        client = TgClient('token', api_url=server.url, max_retries=1)
+
+        response = client.send_message(chat_id=1, text='text')
+
+        assert not response.ok
+        assert response.parameters.retry_after == 0
+        assert not server.sent
+
+    def test_connection_error(self):
+        client = TgClient('token', api_url='http://127.0.0.1:1', max_retries=1, backoff=0, timeout=1)
+
+        with pytest.raises(requests.ConnectionError):
+            client.send_message(chat_id=1, text='text')
+
+    def test_read_timeout_of_post_is_not_retried(self):
+        with StubTelegramServer(latency=0.5) as server:
+            client = TgClient('token', api_url=server.url, max_retries=2, backoff=0, timeout=0.2)
+
+            with pytest.raises(requests.ReadTimeout):
+                client.send_message(chat_id=1, text='text')
+            time.sleep(0.5)
+
+        assert [message['text'] for message in server.sent] == ['text']
+
+    def test_read_timeout_of_get_is_retried(self, monkeypatch):
+        client = TgClient('token', max_retries=2, backoff=0)
+        calls: list[str] = []
+
+        def timeout(*args, **kwargs):
+            calls.append(args[0])
+            raise requests.ReadTimeout()
+
+        monkeypatch.setattr(client.session, 'request', timeout)
+        with pytest.raises(requests.ReadTimeout):
+            client.get_updates(timeout=0)
+
+        assert calls == ['GET'] * 3
+
+    def test_shared_client(self):
+        assert get_tg_client() is get_tg_client()
@@ -0,0 +1,194 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.core.management import CommandError
+from django.db import OperationalError
+from django.utils import timezone
+
+from bot.management.commands.runbot import Command
+from bot.models import BotOffset, BotUpdate, TgUser
+from bot.tg.bot_data import StateEnum
+from bot.tg import coordinator
+from bot.tg.client import TgClient
+from bot.tg.coordinator import LeaseLost, OffsetLease, ShardWorker, UpdatePoller, purge_handled
+from bot.tg.db_storage import DbDataStorage
+from bot.tg.updates import Message, decode_update
+from goals.models import Goal
+from tests.bot.stub_server import StubTelegramServer, make_update
+
+
+class RecordingHandler:
+    def __init__(self, fail_on: str | None = None):
+        self.handled: list[tuple[int, str]] = []
+        self.fail_on = fail_on
+
+    def __call__(self, msg: Message) -> None:
+        self.handled.append((msg.chat.id, msg.text))
+        if msg.text == self.fail_on:
+            raise ValueError(msg.text)
+
+
+def store(*updates: dict, shards: int = 2) -> None:
+    lease = OffsetLease('owner')
+    lease.acquire()
+    lease.store([decode_update(update) for update in updates], shards=shards)
+
+
+@pytest.mark.django_db
+class TestOffsetLease:
+
+    def test_one_owner(self):
+        first, second = OffsetLease('first'), OffsetLease('second')
+
+        assert first.acquire() == 0
+        assert second.acquire() is None
+        assert first.acquire() == 0
+
+    def test_expired_lease_is_taken_over(self):
+        first, second = OffsetLease('first'), OffsetLease('second')
+        first.acquire()
+        BotOffset.objects.update(lease_expires=timezone.now() - timedelta(seconds=1))
+
+        assert second.acquire() == 0
+        with pytest.raises(LeaseLost):
+            first.store([decode_update(make_update(1, 1, 'text'))], shards=1)
+        assert not BotUpdate.objects.exists()
+
+    def test_release(self):
+        first, second = OffsetLease('first'), OffsetLease('second')
+        first.acquire()
+        first.release()
+
+        assert second.acquire() == 0
+
+
+@pytest.mark.django_db
+class TestUpdatePoller:
+
+    def test_polls_into_inbox(self):
+        with StubTelegramServer() as server:
+            server.push_updates(make_update(1, 10, 'a'), {'update_id': 2, 'edited_message': {}},
+                                make_update(3, 11, 'b'))
+            poller = UpdatePoller(TgClient('token', api_url=server.url), OffsetLease('first'), shards=2,
+                                  poll_timeout=0)
+
+            assert poller.poll_once() == 3
+            assert poller.poll_once() == 0
+
+            restarted = UpdatePoller(TgClient('token', api_url=server.url), OffsetLease('first'), shards=2,
+                                     poll_timeout=0)
+            assert restarted.poll_once() == 0
+
+        assert list(BotUpdate.objects.order_by('update_id').values_list('update_id', 'chat_id', 'shard')) == [
+            (1, 10, 0), (3, 11, 1),
+        ]
+        assert BotOffset.objects.get().offset == 4
+
+    def test_waits_for_lease(self):
+        OffsetLease('first').acquire()
+        poller = UpdatePoller(TgClient('token', api_url='http://127.0.0.1:9'), OffsetLease('second'), shards=1)
+
+        assert poller.poll_once() is None
+
+
+@pytest.mark.django_db
+class TestShardWorker:
+
+    def test_handles_own_shard_in_order(self):
+        store(*(make_update(i, i % 4, str(i)) for i in range(1, 9)))
+        handler = RecordingHandler()
+
+        assert ShardWorker(handler, shard=1).work_once() == 4
+        assert ShardWorker(handler, shard=1).work_once() == 0
+        assert handler.handled == [(1, '1'), (3, '3'), (1, '5'), (3, '7')]
+        assert BotUpdate.objects.filter(handled_at__isnull=True, shard=0).count() == 4
+
+    def test_failed_update_is_not_retried(self):
+        store(make_update(1, 0, 'fail'), make_update(2, 0, 'ok'))
+        handler = RecordingHandler(fail_on='fail')
+
+        ShardWorker(handler, shard=0).work_once()
+
+        assert handler.handled == [(0, 'fail'), (0, 'ok')]
+        assert not BotUpdate.objects.filter(handled_at__isnull=True).exists()
+
+    def test_failed_claim_does_not_stop_the_loop(self, monkeypatch):
+        monkeypatch.setattr(coordinator, 'ERROR_DELAY', 0)
+        worker = ShardWorker(RecordingHandler(), shard=0)
+        stop = threading.Event()
+        calls: list[int] = []
+
+        def work_once() -> int:
+            calls.append(len(calls))
+            if len(calls) == 1:
+                raise OperationalError('lock timeout')
+            stop.set()
+            return 0
+
+        monkeypatch.setattr(worker, 'work_once', work_once)
+        worker.run(stop)
+
+        assert calls == [0, 1]
+
+    def test_purge_handled(self):
+        store(make_update(1, 0, 'a'), make_update(2, 0, 'b'))
+        BotUpdate.objects.filter(update_id=1).update(handled_at=timezone.now() - timedelta(days=2))
+
+        assert purge_handled() == 1
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    def send_message(self, chat_id: int, text: str) -> None:
+        self.sent.append(text)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCoordinatedCommand:
+
+    def test_failed_handler_rolls_back_with_its_replies(self, user, goal_category):
+        TgUser.objects.create(tg_chat_id=1, tg_user_name='tg', user=user)
+        command = Command()
+        command.outbox = FakeOutbox()
+        command.storage.set_data(1, {'category_id': goal_category.pk, 'goal_title': None})
+        command.storage.set_state(1, StateEnum.CHOSEN_CATEGORY)
+        store(make_update(1, 1, 'New goal'), shards=1)
+
+        def failing_handler(msg: Message) -> None:
+            command.handle_message(msg)
+            raise ValueError('after the goal was created')
+
+        ShardWorker(failing_handler, shard=0).work_once()
+        assert not Goal.objects.exists()
+        assert command.outbox.sent == []
+
+        store(make_update(2, 1, '/goals'), shards=1)
+        ShardWorker(command.handle_message, shard=0).work_once()
+        assert command.outbox.sent == ['[No visible goals]']
+
+    def test_failed_handler_rolls_back_chat_state(self, user, goal_category):
+        TgUser.objects.create(tg_chat_id=1, tg_user_name='tg', user=user)
+        command = Command()
+        command.outbox = FakeOutbox()
+        command.storage = DbDataStorage()
+        command.storage.set_data(1, {'category_id': goal_category.pk, 'goal_title': None})
+        command.storage.set_state(1, StateEnum.CHOSEN_CATEGORY)
+        store(make_update(1, 1, 'New goal'), shards=1)
+
+        def failing_handler(msg: Message) -> None:
+            command.handle_message(msg)
+            raise ValueError('after the chat state was reset')
+
+        ShardWorker(failing_handler, shard=0).work_once()
+
+        assert command.storage.get_state(1) == StateEnum.CHOSEN_CATEGORY
+        assert command.storage.get_data(1) == {'category_id': goal_category.pk, 'goal_title': None}
+
+    def test_requires_db_storage(self, settings):
+        settings.BOT_STORAGE_BACKEND = 'bot.tg.data_storage.BotDataStorage'
+
+        with pytest.raises(CommandError):
+            Command().run_coordinated(shard=0, shards=1)
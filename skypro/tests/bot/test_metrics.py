@@ -0,0 +1,75 @@
+import re
+
+import pytest
+import requests
+
+from bot.management.commands.runbot import Command
+from bot.tg import metrics
+from bot.tg.client import TgClient
+from bot.tg.updates import decode_update
+from tests.bot.stub_server import StubTelegramServer, make_update
+
+
+class TestRegistry:
+
+    def test_render(self):
+        registry = metrics.Registry()
+        counter = registry.register(metrics.Counter('calls_total', 'Calls', ('method',)))
+        histogram = registry.register(metrics.Histogram('latency_seconds', 'Latency', buckets=(0.1, 1)))
+        registry.register(metrics.Gauge('depth', 'Depth', lambda: 3))
+        counter.inc(method='a"b')
+        histogram.observe(0.1)
+        histogram.observe(5)
+
+        assert registry.render() == (
+            '# HELP calls_total Calls\n'
+            '# TYPE calls_total counter\n'
+            'calls_total{method="a\\"b"} 1\n'
+            '# HELP latency_seconds Latency\n'
+            '# TYPE latency_seconds histogram\n'
+            'latency_seconds_bucket{le="0.1"} 1\n'
+            'latency_seconds_bucket{le="1"} 1\n'
+            'latency_seconds_bucket{le="+Inf"} 2\n'
+            'latency_seconds_sum 5.1\n'
+            'latency_seconds_count 2\n'
+            '# HELP depth Depth\n'
+            '# TYPE depth gauge\n'
+            'depth 3\n'
+        )
+
+    def test_wrong_labels(self):
+        with pytest.raises(ValueError):
+            metrics.Counter('calls_total', 'Calls', ('method',)).inc(status='200')
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+
+    def test_scrape(self):
+        command = Command()
+        server = command.start_metrics(port=0)
+        try:
+            with StubTelegramServer() as stub:
+                TgClient('token', api_url=stub.url).send_message(1, 'text')
+            command.handle_message(decode_update(make_update(1, 1, '/start')).message)
+
+            response = requests.get(server.url, timeout=5)
+        finally:
+            server.stop()
+
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        body: str = response.text
+        assert re.search(r'^tg_api_requests_total\{method="sendMessage",status="200"\} \d', body, re.M)
+        assert re.search(r'^tg_api_request_seconds_count\{method="sendMessage"\} \d', body, re.M)
+        assert re.search(r'^bot_handler_seconds_count\{command="unverified"\} \d', body, re.M)
+        assert re.search(r'^bot_handler_db_seconds_count\{command="unverified"\} \d', body, re.M)
+        assert re.search(r'^bot_update_age_seconds_count \d', body, re.M)
+        assert re.search(r'^bot_outbox_depth \d', body, re.M)
+
+    def test_unknown_path(self):
+        server = metrics.MetricsServer().start()
+        try:
+            assert requests.get(server.url.replace('/metrics', '/'), timeout=5).status_code == 404
+        finally:
+            server.stop()
@@ -0,0 +1,157 @@
+import pytest
+
+from bot.tg.client import TgClient
+from bot.tg.dc import SendMessagesResponse
+from bot.tg.outbox import Outbox
+from tests.bot.stub_server import StubTelegramServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeClient:
+    """Records sent messages, answers with queued responses or ok"""
+
+    def __init__(self):
+        self.sent: list[tuple[int, str]] = []
+        self.responses: list[dict] = []
+
+    def send_message(self, chat_id: int, text: str, retry_throttled: bool = True) -> SendMessagesResponse:
+        assert not retry_throttled
+        self.sent.append((chat_id, text))
+        return SendMessagesResponse(**(self.responses.pop(0) if self.responses else {'ok': True}))
+
+
+@pytest.fixture()
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture()
+def client() -> FakeClient:
+    return FakeClient()
+
+
+def make_outbox(client: FakeClient, clock: FakeClock, **kwargs) -> Outbox:
+    """Outbox without the sender thread, tests call step() themselves"""
+    outbox = Outbox(client, clock=clock, **kwargs)
+    outbox.start = lambda: None
+    return outbox
+
+
+def drain(outbox: Outbox, clock: FakeClock, until: float) -> None:
+    """Runs the sender on the fake clock, sleeping as long as step() asks"""
+    while (wait := outbox.step()) is not None and clock.now < until:
+        clock.now += wait
+
+
+class TestOutbox:
+
+    def test_coalesces_messages_of_one_chat(self, client: FakeClient, clock: FakeClock):
+        outbox = make_outbox(client, clock)
+        for text in ('a', 'b', 'c'):
+            outbox.send_message(1, text)
+
+        assert outbox.step() == 0
+        assert client.sent == [(1, 'a\nb\nc')]
+        assert outbox.step() is None
+
+    def test_coalesced_text_fits_message(self, client: FakeClient, clock: FakeClock):
+        outbox = make_outbox(client, clock)
+        outbox.send_message(1, 'a' * 3000)
+        outbox.send_message(1, 'b' * 2000)
+
+        drain(outbox, clock, until=10)
+
+        assert [len(text) for _, text in client.sent] == [3000, 2000]
+
+    def test_chat_rate(self, client: FakeClient, clock: FakeClock):
+        outbox = make_outbox(client, clock, chat_rate=1, chat_burst=1)
+        outbox.send_message(1, 'a')
+        outbox.step()
+        outbox.send_message(1, 'b')
+
+        assert outbox.step() == pytest.approx(1)
+        clock.now = 1
+        assert outbox.step() == 0
+        assert client.sent == [(1, 'a'), (1, 'b')]
+
+    def test_waiting_chat_does_not_block_others(self, client: FakeClient, clock: FakeClock):
+        outbox = make_outbox(client, clock, chat_rate=1, chat_burst=1)
+        outbox.send_message(1, 'a')
+        outbox.step()
+        outbox.send_message(1, 'b')
+        outbox.send_message(2, 'c')
+
+        assert outbox.step() == 0
+        assert client.sent == [(1, 'a'), (2, 'c')]
+
+    def test_global_rate(self, client: FakeClient, clock: FakeClock):
+        outbox = make_outbox(client, clock, rate=30)
+        for chat_id in range(100):
+            outbox.send_message(chat_id, 'text')
+
+        drain(outbox, clock, until=2)
+
+        # the burst of 30 and 30 per second after it
+        assert len(client.sent) == 90
+        assert outbox.depth == 10
+
+    def test_retry_after(self, client: FakeClient, clock: FakeClock):
+        outbox = make_outbox(client, clock)
+        client.responses.append({'ok': False, 'error_code': 429, 'parameters': {'retry_after': 5}})
+        outbox.send_message(1, 'a')
+
+        outbox.step()
+        outbox.send_message(1, 'b')
+        assert outbox.step() == pytest.approx(5)
+        clock.now = 5
+        outbox.step()
+
+        assert client.sent == [(1, 'a'), (1, 'a\nb')]
+        assert (outbox.sent, outbox.dropped) == (1, 0)
+
+    def test_gives_up(self, client: FakeClient, clock: FakeClock):
+        outbox = make_outbox(client, clock, max_retries=1)
+        client.responses = [{'ok': False, 'error_code': 429, 'parameters': {'retry_after': 1}}] * 2
+        outbox.send_message(1, 'a')
+
+        drain(outbox, clock, until=10)
+
+        assert len(client.sent) == 2
+        assert outbox.dropped == 1
+
+    def test_other_errors_are_dropped(self, client: FakeClient, clock: FakeClock):
+        outbox = make_outbox(client, clock)
+        client.responses.append({'ok': False, 'error_code': 400, 'description': 'chat not found'})
+        outbox.send_message(1, 'a')
+
+        outbox.step()
+
+        assert outbox.step() is None
+        assert outbox.dropped == 1
+
+    def test_idle_buckets_are_pruned(self, client: FakeClient, clock: FakeClock):
+        outbox = make_outbox(client, clock)
+        outbox.send_message(1, 'a')
+        outbox.step()
+
+        clock.now = 61
+        outbox.step()
+
+        assert not outbox.chat_buckets
+
+    def test_background_sender(self):
+        with StubTelegramServer() as server:
+            outbox = Outbox(TgClient('token', api_url=server.url))
+            for i in range(5):
+                outbox.send_message(i, str(i))
+
+            assert outbox.flush(timeout=5)
+
+        assert sorted(message['text'] for message in server.sent) == ['0', '1', '2', '3', '4']
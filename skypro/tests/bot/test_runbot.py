@@ -0,0 +1,125 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bot.management.commands.runbot import LIST_PAGE_SIZE, Command
+from bot.models import TgUser
+from bot.tg.paging import chunk_lines
+from bot.tg.updates import Message, decode_update
+from goals.models import Goal, GoalCategory
+from tests.bot.stub_server import make_update
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    def send_message(self, chat_id: int, text: str) -> None:
+        self.sent.append(text)
+
+
+def message(text: str) -> Message:
+    return decode_update(make_update(1, 1, text)).message
+
+
+@pytest.fixture()
+def command(user) -> Command:
+    TgUser.objects.create(tg_chat_id=1, tg_user_name='tg', user=user)
+    command = Command()
+    command.outbox = FakeOutbox()
+    return command
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGoalsList:
+
+    def test_pages(self, command: Command, user, category: GoalCategory):
+        goals = Goal.objects.bulk_create(
+            Goal(title=f'{i:03} ' + 'x' * 200, user=user, category=category) for i in range(LIST_PAGE_SIZE * 2 + 1)
+        )
+
+        command.handle_message(message('/goals'))
+        first_page: list[str] = command.outbox.sent
+        command.outbox.sent = []
+        command.handle_message(message('/goals next'))
+        second_page: list[str] = command.outbox.sent
+        command.outbox.sent = []
+        command.handle_message(message('/goals next'))
+
+        assert all(len(text) <= 4096 for text in first_page)
+        assert len(first_page) == 3
+        assert first_page[0].startswith(f'{goals[0].id} 000')
+        assert first_page[-1].endswith(f'{goals[LIST_PAGE_SIZE - 1].id} 049 {"x" * 200}\n[/goals next]')
+        assert second_page[0].startswith(f'{goals[LIST_PAGE_SIZE].id} 050')
+        assert command.outbox.sent == [f'{goals[-1].id} 100 {"x" * 200}']
+
+    def test_last_page(self, command: Command, goal: Goal):
+        command.handle_message(message('/goals'))
+        command.handle_message(message('/goals next'))
+
+        assert command.outbox.sent == [f'{goal.id} {goal.title}', '[No more items]']
+
+    def test_reads_only_listed_columns(self, command: Command, goal: Goal):
+        command.handle_message(message('/goals'))
+
+        with CaptureQueriesContext(connection) as context:
+            command.handle_message(message('/goals'))
+
+        goal_queries = [query['sql'] for query in context.captured_queries if 'goals_goal' in query['sql']]
+        assert len(goal_queries) == 1
+        assert 'description' not in goal_queries[0]
+
+    def test_no_goals(self, command: Command):
+        command.handle_message(message('/goals'))
+
+        assert command.outbox.sent == ['[No visible goals]']
+
+    def test_categories(self, command: Command, category: GoalCategory):
+        command.handle_message(message('/create'))
+
+        assert command.outbox.sent == [f'Select category\n{category.id} {category.title}']
+        assert command.storage.get_data(1) == {
+            'category_id': None, 'goal_title': None, 'category_ids': [category.id], 'categories_cursor': None,
+        }
+
+
+class TestChunkLines:
+
+    def test_long_line_is_cut(self):
+        assert list(chunk_lines(['a' * 10, 'b'], limit=4)) == ['aaaa', 'b']
+
+    def test_lines_are_joined(self):
+        assert list(chunk_lines(['a', 'b', 'c', 'd'], limit=3)) == ['a\nb', 'c\nd']
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCreateGoal:
+
+    def test_create(self, command: Command, category: GoalCategory):
+        command.handle_message(message('/create'))
+        with CaptureQueriesContext(connection) as context:
+            command.handle_message(message(str(category.id)))
+        command.handle_message(message('New goal'))
+
+        assert not [query for query in context.captured_queries if 'goals_goalcategory' in query['sql']]
+        assert command.outbox.sent[-2:] == ['[set title]', '[New goal created]']
+        assert Goal.objects.get().title == 'New goal'
+        assert command.storage.get_state(1) is None
+
+    def test_category_of_other_board(self, command: Command, category: GoalCategory, board_factory,
+                                     goal_category_factory, user):
+        other = goal_category_factory.create(board=board_factory.create(), user=user)
+        command.handle_message(message('/create'))
+        command.handle_message(message(str(other.id)))
+
+        assert command.outbox.sent[-1] == '[category not found]'
+
+    def test_duplicate_title(self, command: Command, goal: Goal):
+        command.handle_message(message('/create'))
+        command.handle_message(message(str(goal.category_id)))
+        command.handle_message(message(goal.title))
+
+        assert command.outbox.sent[-1] == '[Goal with this title already exists, set another title]'
+        command.handle_message(message('Another title'))
+        assert command.outbox.sent[-1] == '[New goal created]'
+        assert Goal.objects.count() == 2
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+import pytest
+from django.db.models import QuerySet
+from django.test import override_settings
+from django.utils import timezone
+
+from bot.models import BotState, TgUser, TgVerificationCode
+from bot.tg.bot_data import StateEnum, get_storage
+from bot.tg.data_storage import BotDataStorage
+from bot.tg.db_storage import DbDataStorage
+from bot.tg.housekeeping import Housekeeper
+from bot.tg.redis_storage import RedisDataStorage
+
+
+@pytest.fixture()
+def redis_client():
+    fakeredis = pytest.importorskip('fakeredis')
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture(params=['memory', 'db', 'redis'])
+def storage(request):
+    if request.param == 'memory':
+        return BotDataStorage(ttl=60)
+    if request.param == 'db':
+        request.getfixturevalue('db')
+        return DbDataStorage(ttl=60)
+    return RedisDataStorage(request.getfixturevalue('redis_client'), ttl=60)
+
+
+class TestStorage:
+
+    def test_empty_chat(self, storage):
+        assert storage.get_state(1) is None
+        assert storage.get_data(1) == {}
+        assert not storage.reset(1)
+
+    def test_state_and_data(self, storage):
+        storage.set_state(1, StateEnum.CREATE_CATEGORY_SELECT)
+        storage.set_data(1, {'category_id': None, 'goal_title': None})
+        storage.update_data(chat_id=1, category_id=5)
+
+        assert storage.get_state(1) == StateEnum.CREATE_CATEGORY_SELECT
+        assert storage.get_data(1) == {'category_id': 5, 'goal_title': None}
+        assert storage.get_state(2) is None
+
+    def test_reset(self, storage):
+        storage.set_state(1, StateEnum.CHOSEN_CATEGORY)
+
+        assert storage.reset(1)
+        assert storage.get_state(1) is None
+
+
+@pytest.mark.django_db
+class TestDbDataStorage:
+
+    def test_compact_state(self):
+        DbDataStorage().set_state(1, StateEnum.CHOSEN_CATEGORY)
+
+        assert BotState.objects.get(chat_id=1).state == StateEnum.CHOSEN_CATEGORY.value
+
+    def test_expiry(self):
+        storage = DbDataStorage(ttl=60)
+        storage.set_state(1, StateEnum.CHOSEN_CATEGORY)
+        storage.set_data(2, {'category_id': 1})
+        BotState.objects.filter(chat_id=1).update(updated=timezone.now() - timedelta(seconds=61))
+
+        assert storage.get_state(1) is None
+        storage.update_data(chat_id=1, category_id=3)
+        assert storage.get_state(1) is None
+        assert storage.get_data(1) == {'category_id': 3}
+
+        BotState.objects.filter(chat_id=1).update(updated=timezone.now() - timedelta(seconds=61))
+        assert storage.purge_expired() == 1
+        assert list(BotState.objects.values_list('chat_id', flat=True)) == [2]
+
+    def test_concurrent_first_write(self, monkeypatch):
+        # the row is inserted by another worker after this one found none
+        BotState.objects.create(chat_id=1, data={'category_id': 1})
+        get = QuerySet.get
+        missed: list[bool] = []
+
+        def get_after_insert(queryset, *args, **kwargs):
+            if not missed:
+                missed.append(True)
+                raise BotState.DoesNotExist
+            return get(queryset, *args, **kwargs)
+
+        monkeypatch.setattr(QuerySet, 'get', get_after_insert)
+        DbDataStorage(ttl=60).update_data(chat_id=1, goal_title='title')
+
+        assert BotState.objects.get(chat_id=1).data == {'category_id': 1, 'goal_title': 'title'}
+
+
+@pytest.mark.django_db
+class TestHousekeeper:
+
+    def test_purges_states_and_codes(self):
+        storage = DbDataStorage(ttl=60)
+        storage.set_state(1, StateEnum.CHOSEN_CATEGORY)
+        storage.set_state(2, StateEnum.CHOSEN_CATEGORY)
+        BotState.objects.filter(chat_id=1).update(updated=timezone.now() - timedelta(seconds=61))
+        tg_user = TgUser.objects.create(tg_chat_id=1, tg_user_name='tg')
+        TgVerificationCode.objects.create(tg_user=tg_user, code_hash='0' * 64,
+                                          expires_at=timezone.now() - timedelta(days=1))
+
+        Housekeeper(storage).run_once()
+
+        assert list(BotState.objects.values_list('chat_id', flat=True)) == [2]
+        assert not TgVerificationCode.objects.exists()
+
+
+class TestRedisDataStorage:
+
+    def test_ttl(self, redis_client):
+        storage = RedisDataStorage(redis_client, ttl=60)
+        storage.set_state(1, StateEnum.CHOSEN_CATEGORY)
+
+        assert 0 < redis_client.ttl('bot:chat:1') <= 60
+        assert redis_client.hget('bot:chat:1', 's') == b'2'
+
+
+class TestMemoryStorage:
+
+    def test_purge_expired(self):
+        storage = BotDataStorage(ttl=0)
+        storage.set_state(1, StateEnum.CHOSEN_CATEGORY)
+
+        assert storage.purge_expired() == 1
+        assert not storage.data
+
+
+class TestGetStorage:
+
+    @override_settings(BOT_STORAGE_BACKEND='bot.tg.db_storage.DbDataStorage', BOT_STORAGE_TTL=30)
+    def test_backend_from_settings(self):
+        storage = get_storage()
+
+        assert isinstance(storage, DbDataStorage)
+        assert storage.ttl == 30
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management import call_command
+
+from bot.management.commands.benchmark_update_decoding import RECORDED_PAYLOAD
+from bot.tg.client import TgClient
+from bot.tg.updates import decode_update, decode_updates
+from tests.bot.stub_server import StubTelegramServer, make_update
+
+
+class TestDecodeUpdates:
+
+    def test_recorded_payload(self):
+        response = decode_updates(json.loads(RECORDED_PAYLOAD.read_text()))
+        messages = [item.message for item in response.result if item.message]
+
+        assert response.ok
+        assert len(response.result) == 24
+        assert len(messages) == 18
+        assert (messages[0].chat.id, messages[0].from_.username, messages[0].text) == (100000, 'user0', '/start')
+
+    def test_group_message_without_username(self):
+        message = decode_updates(json.loads(RECORDED_PAYLOAD.read_text())).result[7].message
+
+        assert message.chat.id == -1001234567890
+        assert message.from_.username is None
+
+    def test_unknown_update_types(self):
+        update = decode_update({'update_id': 1, 'callback_query': {'id': '1'}})
+
+        assert update.update_id == 1
+        assert update.message is None
+
+    def test_invalid_items_are_skipped(self):
+        response = decode_updates({'ok': True, 'result': [{'message': {}}, 'text', make_update(2, 1, 'text')]})
+
+        assert [item.update_id for item in response.result] == [2]
+
+    def test_message_without_chat(self):
+        assert decode_update({'update_id': 1, 'message': {'text': 'text'}}).message is None
+
+    def test_get_updates_keeps_batch(self):
+        with StubTelegramServer() as server:
+            server.push_updates({'update_id': 1, 'edited_message': {}}, make_update(2, 1, 'text'))
+            result = TgClient('token', api_url=server.url).get_updates(timeout=0).result
+
+        assert [item.update_id for item in result] == [1, 2]
+        assert result[1].message.text == 'text'
+
+
+class TestBenchmark:
+
+    def test_runs(self, capsys):
+        call_command('benchmark_update_decoding', repeat=1)
+
+        assert '15 of 24 updates are accepted by pydantic models' in capsys.readouterr().out
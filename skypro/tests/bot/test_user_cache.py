@@ -0,0 +1,89 @@
+from unittest.mock import MagicMock
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from bot import views
+from bot.models import TgUser
+from bot.tg.user_cache import TgUserCache, resolve_tg_user, tg_user_cache
+from bot.verification import issue_code
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.django_db
+class TestResolveTgUser:
+
+    def test_verified_user_is_cached(self, user):
+        TgUser.objects.create(tg_chat_id=1, tg_user_name='tg', user=user)
+        resolve_tg_user(1, 'tg')
+
+        with CaptureQueriesContext(connection) as context:
+            tg_user = resolve_tg_user(1, 'tg')
+
+        assert not context.captured_queries
+        assert tg_user.user == user
+        assert tg_user_cache.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+    def test_unverified_user_is_not_cached(self):
+        resolve_tg_user(1, 'tg')
+
+        assert resolve_tg_user(1, 'tg').user is None
+        assert tg_user_cache.stats() == {'hits': 0, 'misses': 2, 'size': 0}
+
+    def test_new_code_invalidates(self, user):
+        TgUser.objects.create(tg_chat_id=1, tg_user_name='tg', user=user)
+        tg_user = resolve_tg_user(1, 'tg')
+
+        issue_code(tg_user)
+
+        assert tg_user_cache.get(1) is None
+
+    def test_verification_invalidates(self, auth_client, user, monkeypatch):
+        monkeypatch.setattr(views, 'get_tg_client', MagicMock())
+        code = issue_code(TgUser.objects.create(tg_chat_id=1, tg_user_name='tg'))
+        tg_user_cache.set(1, TgUser.objects.get(tg_chat_id=1))
+
+        response = auth_client.patch(path='/bot/verify', data={'verification_code': code})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert tg_user_cache.get(1) is None
+        assert resolve_tg_user(1, 'tg').user == user
+
+
+class TestTgUserCache:
+
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = TgUserCache(maxsize=10, ttl=60, clock=clock)
+        cache.set(1, TgUser(tg_chat_id=1))
+
+        clock.now = 59
+        assert cache.get(1) is not None
+        clock.now = 60
+        assert cache.get(1) is None
+
+    def test_lru(self):
+        cache = TgUserCache(maxsize=2, ttl=60)
+        for chat_id in (1, 2):
+            cache.set(chat_id, TgUser(tg_chat_id=chat_id))
+        cache.get(1)
+        cache.set(3, TgUser(tg_chat_id=3))
+
+        assert cache.get(2) is None
+        assert cache.get(1) is not None
+        assert cache.get(3) is not None
+
+    def test_disabled(self):
+        cache = TgUserCache(maxsize=0, ttl=60)
+        cache.set(1, TgUser(tg_chat_id=1))
+
+        assert cache.get(1) is None
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+
+from bot import views
+from bot.models import TgUser, TgVerificationCode
+from bot.verification import consume_code, hash_code, issue_code, purge_codes
+
+
+@pytest.fixture()
+def tg_user() -> TgUser:
+    return TgUser.objects.create(tg_chat_id=1, tg_user_name='tg')
+
+
+@pytest.mark.django_db
+class TestVerificationCodes:
+
+    def test_only_hash_is_stored(self, tg_user: TgUser):
+        code = issue_code(tg_user)
+
+        assert list(TgVerificationCode.objects.values_list('code_hash', flat=True)) == [hash_code(code)]
+
+    def test_single_use(self, tg_user: TgUser):
+        code = issue_code(tg_user)
+
+        assert consume_code(code) == tg_user
+        assert consume_code(code) is None
+
+    def test_expired(self, tg_user: TgUser):
+        code = issue_code(tg_user)
+        TgVerificationCode.objects.update(expires_at=timezone.now())
+
+        assert consume_code(code) is None
+
+    def test_lookup_uses_index(self, tg_user: TgUser):
+        code = issue_code(tg_user)
+
+        with CaptureQueriesContext(connection) as context:
+            consume_code(code)
+
+        assert 'code_hash' in context.captured_queries[0]['sql']
+
+    def test_rate_limit(self, tg_user: TgUser, settings):
+        settings.TG_VERIFICATION_CODE_LIMIT = 2
+
+        assert issue_code(tg_user)
+        assert issue_code(tg_user)
+        assert issue_code(tg_user) is None
+
+        TgVerificationCode.objects.update(created=timezone.now() - timedelta(hours=2))
+        assert issue_code(tg_user)
+
+    def test_rate_limit_locks_chat(self, tg_user: TgUser):
+        with CaptureQueriesContext(connection) as context:
+            issue_code(tg_user)
+
+        sqls: list[str] = [query['sql'] for query in context.captured_queries if 'SAVEPOINT' not in query['sql']]
+        assert '"bot_tguser"' in sqls[0]
+        assert 'COUNT(*)' in sqls[1]
+
+    def test_purge(self, tg_user: TgUser):
+        issue_code(tg_user)
+        issue_code(tg_user)
+        TgVerificationCode.objects.filter(pk=TgVerificationCode.objects.first().pk).update(
+            expires_at=timezone.now() - timedelta(hours=2))
+
+        assert purge_codes() == 1
+        assert TgVerificationCode.objects.count() == 1
+
+    def test_purge_command(self, tg_user: TgUser, capsys):
+        issue_code(tg_user)
+        TgVerificationCode.objects.update(expires_at=timezone.now() - timedelta(hours=2))
+
+        call_command('purge_verification_codes')
+
+        assert capsys.readouterr().out == '1 codes deleted\n'
+        assert not TgVerificationCode.objects.exists()
+
+    def test_verify_view(self, auth_client, user, tg_user: TgUser, monkeypatch):
+        monkeypatch.setattr(views, 'get_tg_client', MagicMock())
+        code = issue_code(tg_user)
+
+        response = auth_client.patch(path='/bot/verify', data={'verification_code': code})
+        again = auth_client.patch(path='/bot/verify', data={'verification_code': code})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'tg_chat_id': 1, 'tg_user_name': 'tg', 'user': user.pk}
+        assert again.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,125 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import status
+
+from bot import views
+from bot.management.commands.runbot import Command
+from bot.models import TgUser
+from bot.tg.client import TgClient
+from bot.tg.dispatcher import UpdateDispatcher, get_dispatcher
+from bot.tg.housekeeping import Housekeeper
+from bot.tg.outbox import Outbox
+from tests.bot.stub_server import StubTelegramServer, make_update
+
+SECRET = 'webhook-secret'
+
+
+class FakeTelegram:
+    """Posts updates to the webhook the way the Bot API does"""
+
+    def __init__(self, client, secret: str = SECRET):
+        self.client = client
+        self.secret = secret
+
+    def post(self, update: dict):
+        return self.client.post(path='/bot/webhook', data=update, format='json',
+                                HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=self.secret)
+
+
+@pytest.fixture()
+def dispatcher(monkeypatch):
+    handled: list = []
+    dispatcher = UpdateDispatcher(handled.append, workers=2)
+    dispatcher.handled = handled
+    monkeypatch.setattr(views, 'get_dispatcher', lambda: dispatcher)
+    return dispatcher
+
+
+@pytest.fixture(autouse=True)
+def webhook_secret(settings):
+    settings.TG_WEBHOOK_SECRET = SECRET
+
+
+class TestWebhook:
+
+    def test_update_is_queued(self, client, dispatcher: UpdateDispatcher):
+        response = FakeTelegram(client).post(make_update(1, 10, '/goals'))
+        dispatcher.join()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [(msg.chat.id, msg.text) for msg in dispatcher.handled] == [(10, '/goals')]
+
+    def test_wrong_secret(self, client, dispatcher: UpdateDispatcher):
+        response = FakeTelegram(client, secret='wrong').post(make_update(1, 10, '/goals'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not dispatcher.handled
+
+    def test_webhook_disabled(self, client, dispatcher: UpdateDispatcher, settings):
+        settings.TG_WEBHOOK_SECRET = ''
+        response = FakeTelegram(client, secret='').post(make_update(1, 10, '/goals'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_unsupported_update_is_acknowledged(self, client, dispatcher: UpdateDispatcher):
+        response = FakeTelegram(client).post({'update_id': 1, 'edited_message': {}})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not dispatcher.handled
+
+    def test_full_queue(self, client, monkeypatch):
+        dispatcher = UpdateDispatcher(lambda msg: None, workers=1, queue_size=1)
+        dispatcher.start = lambda: None
+        monkeypatch.setattr(views, 'get_dispatcher', lambda: dispatcher)
+        fake_telegram = FakeTelegram(client)
+
+        assert fake_telegram.post(make_update(1, 10, 'first')).status_code == status.HTTP_200_OK
+        assert fake_telegram.post(make_update(2, 10, 'second')).status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    def test_per_chat_order(self, client, dispatcher: UpdateDispatcher):
+        fake_telegram = FakeTelegram(client)
+        for i in range(20):
+            fake_telegram.post(make_update(i, i % 3, str(i)))
+        dispatcher.join()
+
+        for chat_id in range(3):
+            assert [msg.text for msg in dispatcher.handled if msg.chat.id == chat_id] == [
+                str(i) for i in range(20) if i % 3 == chat_id
+            ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_end_to_end(self, client, monkeypatch):
+        with StubTelegramServer() as server:
+            command = Command()
+            command.outbox = Outbox(TgClient('token', api_url=server.url))
+            dispatcher = UpdateDispatcher(command.handle_message, workers=2)
+            monkeypatch.setattr(views, 'get_dispatcher', lambda: dispatcher)
+
+            response = FakeTelegram(client).post(make_update(1, 10, '/start'))
+            dispatcher.join()
+            command.outbox.flush(timeout=5)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert TgUser.objects.get(tg_chat_id=10).tg_user_name == 'user10'
+        assert server.sent[0]['text'].startswith('[verification code]')
+
+
+class TestGetDispatcher:
+
+    @pytest.fixture(autouse=True)
+    def fresh_dispatcher(self, monkeypatch):
+        monkeypatch.setattr(Housekeeper, 'start', lambda self: None)
+        get_dispatcher.cache_clear()
+        yield
+        get_dispatcher.cache_clear()
+
+    def test_requires_shared_storage(self, settings):
+        settings.BOT_STORAGE_BACKEND = 'bot.tg.data_storage.BotDataStorage'
+
+        with pytest.raises(ImproperlyConfigured, match='BOT_STORAGE_BACKEND'):
+            get_dispatcher()
+
+    def test_db_storage(self, settings):
+        settings.BOT_STORAGE_BACKEND = 'bot.tg.db_storage.DbDataStorage'
+
+        assert isinstance(get_dispatcher(), UpdateDispatcher)
@@ -1,6 +1,12 @@
 import pytest
+from django.core.cache import cache
 from rest_framework.test import APIClient
+
+from bot.tg.user_cache import tg_user_cache
 from core.models import User
+from goals import archival
+from goals.dashboard import dashboard_cache
+from goals.response_cache import response_cache_stats
 
 
 @pytest.fixture
@@ -12,3 +18,38 @@ def client() -> APIClient:
 def auth_client(client: APIClient, user: User) -> APIClient:
     client.force_login(user)
     return client
+
+
+@pytest.fixture(autouse=True)
+def clear_tg_user_cache():
+    """Cached TgUsers must not outlive the test's database"""
+    yield
+    tg_user_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_dashboard_cache():
+    """Cached dashboards must not outlive the test's database"""
+    yield
+    dashboard_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached responses and board versions must not outlive the test's database"""
+    yield
+    cache.clear()
+    response_cache_stats.clear()
+
+
+@pytest.fixture()
+def response_cache(settings):
+    """List responses are cached, the tests' local memory cache is shared by their single process"""
+    settings.GOALS_RESPONSE_CACHE_TIMEOUT = 5 * 60
+
+
+@pytest.fixture()
+def inline_archival(monkeypatch, settings):
+    """Archival jobs run in the committing thread instead of a background one"""
+    settings.GOALS_ARCHIVAL_BATCH_PAUSE = 0
+    monkeypatch.setattr(archival, 'start_job', archival.run_job)
@@ -0,0 +1,138 @@
+import pytest
+from django.core.management import call_command
+from rest_framework import status
+
+from goals import archival
+from goals.models import ArchivalJob, Board, Goal, GoalCategory, GoalComment
+
+
+@pytest.mark.django_db
+class TestArchival:
+
+    @pytest.fixture()
+    def goals(self, user, category: GoalCategory, goal_factory, goal_comment_factory) -> list[Goal]:
+        goals: list[Goal] = goal_factory.create_batch(5, category=category, user=user)
+        goal_comment_factory.create(goal=goals[0], user=user)
+        return goals
+
+    def test_category_delete_returns_before_archival(self, auth_client, user, category: GoalCategory,
+                                                     goals: list[Goal], monkeypatch,
+                                                     django_capture_on_commit_callbacks):
+        started: list[int] = []
+        monkeypatch.setattr(archival, 'start_job', started.append)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = auth_client.delete(f'/goals/goal_category/{category.pk}')
+
+        job = ArchivalJob.objects.get()
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert response['Location'] == f'/goals/archival_job/{job.pk}'
+        assert started == [job.pk]
+        # the runner counts the goals
+        assert (job.status, job.total, job.archived) == (ArchivalJob.Status.pending, 0, 0)
+        assert GoalCategory.objects.get(pk=category.pk).is_deleted
+        assert not Goal.objects.filter(status=Goal.Status.archived).exists()
+
+    def test_category_goals_hidden_before_archival(self, auth_client, user, category: GoalCategory,
+                                                   goals: list[Goal], monkeypatch):
+        monkeypatch.setattr(archival, 'start_job', lambda job_id: None)
+
+        auth_client.delete(f'/goals/goal_category/{category.pk}')
+
+        assert not Goal.objects.filter(status=Goal.Status.archived).exists()
+        assert not Goal.objects.visible_to(user).exists()
+        assert not GoalComment.objects.visible_to(user).exists()
+        assert auth_client.patch(f'/goals/goal/{goals[0].pk}', data={'title': 'title'},
+                                 format='json').status_code == status.HTTP_404_NOT_FOUND
+        assert auth_client.post('/goals/goal_comment/create', data={'goal': goals[0].pk, 'text': 'text'},
+                                format='json').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_category_dashboard_dropped_on_commit(self, user, category: GoalCategory, goals: list[Goal],
+                                                  monkeypatch, django_capture_on_commit_callbacks):
+        monkeypatch.setattr(archival, 'start_job', lambda job_id: None)
+        invalidated: list[int] = []
+        monkeypatch.setattr(archival.dashboard_cache, 'invalidate_categories',
+                            lambda *category_ids: invalidated.extend(category_ids))
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            archival.delete_category(category, user)
+        assert invalidated == []
+
+        for callback in callbacks:
+            callback()
+        assert invalidated == [category.pk]
+
+    def test_category_archived_in_batches(self, auth_client, user, category: GoalCategory, goals: list[Goal],
+                                          inline_archival, settings, django_capture_on_commit_callbacks):
+        settings.GOALS_ARCHIVAL_BATCH_SIZE = 2
+
+        with django_capture_on_commit_callbacks(execute=True):
+            auth_client.delete(f'/goals/goal_category/{category.pk}')
+
+        job = ArchivalJob.objects.get()
+        assert (job.status, job.total, job.archived, job.last_id) == (
+            ArchivalJob.Status.done, 5, 5, max(goal.pk for goal in goals))
+        assert set(Goal.objects.values_list('status', 'board_id')) == {(Goal.Status.archived, None)}
+        assert set(GoalComment.objects.values_list('board_id', flat=True)) == {None}
+        assert not Goal.objects.visible_to(user).exists()
+
+    def test_board_goals_hidden_before_archival(self, auth_client, user, board: Board, goals: list[Goal],
+                                                monkeypatch):
+        monkeypatch.setattr(archival, 'start_job', lambda job_id: None)
+
+        auth_client.delete(f'/goals/board/{board.pk}')
+
+        assert not Goal.objects.filter(status=Goal.Status.archived).exists()
+        assert not Goal.objects.visible_to(user).exists()
+        assert not GoalComment.objects.visible_to(user).exists()
+
+    def test_batch_moves_cursor(self, user, board: Board, goals: list[Goal]):
+        job = archival.delete_board(board, user)
+
+        job = archival.run_batch(job.pk, batch_size=3)
+
+        assert (job.status, job.archived, job.last_id) == (ArchivalJob.Status.running, 3, goals[2].pk)
+        assert list(Goal.objects.exclude(status=Goal.Status.archived)) == goals[3:]
+
+    def test_failed_job_is_resumed(self, user, board: Board, goals: list[Goal], monkeypatch):
+        job = archival.delete_board(board, user)
+        archival.run_batch(job.pk, batch_size=2)
+        run_batch = archival.run_batch
+
+        def crash(job_id, batch_size):
+            raise RuntimeError('connection lost')
+
+        monkeypatch.setattr(archival, 'run_batch', crash)
+        job = archival.run_job(job.pk, pause=0)
+        assert (job.status, job.error, job.archived) == (ArchivalJob.Status.failed, 'connection lost', 2)
+
+        monkeypatch.setattr(archival, 'run_batch', run_batch)
+        call_command('resume_archival_jobs', batch_size=2)
+
+        job.refresh_from_db()
+        assert (job.status, job.error, job.archived) == (ArchivalJob.Status.done, '', 5)
+        assert not Goal.objects.exclude(status=Goal.Status.archived).exists()
+
+    def test_done_job_is_not_rerun(self, user, board: Board, goals: list[Goal], goal_factory, category):
+        job = archival.run_job(archival.delete_board(board, user).pk, pause=0)
+        goal_factory.create(category=category, user=user)
+
+        assert archival.run_batch(job.pk, batch_size=10).archived == 5
+
+    def test_job_api(self, auth_client, user, board: Board, goals: list[Goal], client, user_factory):
+        job = archival.run_job(archival.delete_board(board, user).pk, pause=0)
+
+        response = auth_client.get(f'/goals/archival_job/{job.pk}')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() | {'created': None, 'updated': None, 'finished': None} == {
+            'id': job.pk, 'board': board.pk, 'category': None, 'status': ArchivalJob.Status.done,
+            'total': 5, 'archived': 5, 'last_id': goals[-1].pk, 'error': '',
+            'created': None, 'updated': None, 'finished': None,
+        }
+        assert [item['id'] for item in auth_client.get('/goals/archival_job/list').json()] == [job.pk]
+
+    def test_job_of_other_user_is_hidden(self, user, board: Board, client, user_factory):
+        job = archival.delete_board(board, user)
+        client.force_login(user_factory.create())
+
+        assert client.get(f'/goals/archival_job/{job.pk}').status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,111 @@
+import pytest
+from rest_framework import status
+
+from goals import batch
+from goals.models import BoardParticipant, GoalCategory, Goal, GoalComment
+
+
+@pytest.mark.django_db
+class TestBatchViews:
+
+    def test_goal_batch_create(self, auth_client, user, goal_category: GoalCategory, goal_category_factory, goal):
+        foreign_category: GoalCategory = goal_category_factory.create(user=user)
+        response = auth_client.post(path='/goals/goal/batch_create', data=[
+            {'title': 'first', 'category': goal_category.pk, 'priority': Goal.Priority.high},
+            {'title': 'second', 'category': goal_category.pk},
+            {'title': goal.title, 'category': goal_category.pk},
+            {'title': 'fourth', 'category': foreign_category.pk},
+            {'title': 'fifth'},
+        ], format='json')
+
+        results = response.json()['results']
+        assert response.status_code == status.HTTP_200_OK
+        assert [result['status'] for result in results] == ['created', 'created', 'error', 'error', 'error']
+        assert results[2]['errors'] == {'title': ['Goal with this title already exists.']}
+        assert results[3]['errors'] == {'non_field_errors': ['No write permission']}
+        assert results[4]['errors'] == {'category': ['This field is required.']}
+        assert Goal.objects.get(pk=results[0]['id']).priority == Goal.Priority.high
+        assert Goal.objects.get(pk=results[1]['id']).user == user
+
+    def test_goal_batch_create_queries(self, auth_client, goal_category: GoalCategory,
+                                       django_assert_num_queries):
+        # session, user, categories, titles, roles, savepoint, insert, release
+        with django_assert_num_queries(8):
+            auth_client.post(path='/goals/goal/batch_create', data=[
+                {'title': f'goal {i}', 'category': goal_category.pk} for i in range(20)
+            ], format='json')
+
+        assert Goal.objects.filter(category=goal_category).count() == 20
+
+    def test_goal_batch_create_archived(self, auth_client, goal_category: GoalCategory):
+        response = auth_client.post(path='/goals/goal/batch_create', data=[
+            {'title': 'archived', 'category': goal_category.pk, 'status': Goal.Status.archived},
+            {'title': 'active', 'category': goal_category.pk},
+        ], format='json')
+
+        ids = [result['id'] for result in response.json()['results']]
+        assert Goal.objects.get(pk=ids[0]).archived_at is not None
+        assert Goal.objects.get(pk=ids[1]).archived_at is None
+
+    def test_goal_batch_create_title_taken_concurrently(self, auth_client, goal_category: GoalCategory, goal,
+                                                         monkeypatch):
+        # the title check passes as if the goal was created right after it
+        monkeypatch.setattr(batch, '_taken_titles', lambda titles: set() if len(titles) > 1 else titles & {goal.title})
+        response = auth_client.post(path='/goals/goal/batch_create', data=[
+            {'title': 'first', 'category': goal_category.pk},
+            {'title': goal.title, 'category': goal_category.pk},
+            {'title': 'third', 'category': goal_category.pk},
+        ], format='json')
+
+        results = response.json()['results']
+        assert response.status_code == status.HTTP_200_OK
+        assert [result['status'] for result in results] == ['created', 'error', 'created']
+        assert results[1]['errors'] == {'title': ['Goal with this title already exists.']}
+        assert Goal.objects.filter(title__in=('first', 'third')).count() == 2
+
+    def test_goal_batch_update(self, auth_client, user, user_factory, goal_category: GoalCategory, goal_factory):
+        goals: list[Goal] = goal_factory.create_batch(2, user=user, category=goal_category)
+        reader = user_factory.create()
+        BoardParticipant.objects.create(board=goal_category.board, user=reader, role=BoardParticipant.Role.reader)
+
+        response = auth_client.post(path='/goals/goal/batch_update', data=[
+            {'id': goals[0].pk, 'status': Goal.Status.archived},
+            {'id': goals[1].pk, 'priority': Goal.Priority.critical},
+            {'id': goals[1].pk + 100, 'priority': Goal.Priority.critical},
+            {'id': goals[1].pk},
+        ], format='json')
+
+        results = response.json()['results']
+        assert [result['status'] for result in results] == ['updated', 'updated', 'error', 'error']
+        assert Goal.objects.get(pk=goals[0].pk).status == Goal.Status.archived
+        assert Goal.objects.get(pk=goals[1].pk).priority == Goal.Priority.critical
+
+        auth_client.force_login(reader)
+        response = auth_client.post(path='/goals/goal/batch_update', data=[
+            {'id': goals[1].pk, 'status': Goal.Status.done},
+        ], format='json')
+        assert response.json()['results'][0]['errors'] == {'non_field_errors': ['No write permission']}
+
+    def test_comment_batch_create(self, auth_client, user, goal: Goal, goal_factory, goal_category: GoalCategory):
+        archived: Goal = goal_factory.create(user=user, category=goal_category, status=Goal.Status.archived)
+        response = auth_client.post(path='/goals/goal_comment/batch_create', data=[
+            {'goal': goal.pk, 'text': 'first'},
+            {'goal': goal.pk, 'text': 'second'},
+            {'goal': archived.pk, 'text': 'third'},
+            {'goal': goal.pk, 'text': ''},
+        ], format='json')
+
+        results = response.json()['results']
+        assert [result['status'] for result in results] == ['created', 'created', 'error', 'error']
+        texts = GoalComment.objects.filter(goal=goal).order_by('id').values_list('text', flat=True)
+        assert list(texts) == ['first', 'second']
+
+    def test_batch_must_be_list(self, auth_client):
+        response = auth_client.post(path='/goals/goal/batch_create', data={'title': 'goal'}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_batch_not_authenticated(self, client):
+        response = client.post(path='/goals/goal/batch_create', data=[], format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
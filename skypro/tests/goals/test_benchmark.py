@@ -0,0 +1,28 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from core.models import User
+from goals.management.commands.benchmark_goal_lists import Command
+from goals.models import Board, BoardParticipant, Goal, GoalCategory, GoalComment
+
+
+@pytest.mark.django_db
+class TestBenchmarkGoalLists:
+
+    def test_refuses_without_throwaway_database(self):
+        with pytest.raises(CommandError):
+            call_command('benchmark_goal_lists', goals=10)
+
+        assert not Goal.objects.exists()
+
+    def test_cleanup_deletes_seeded_rows(self, goal):
+        command = Command()
+        command.seed('test', goals=250, categories=3, batch_size=100)
+        assert Goal.objects.count() == 251
+
+        command.cleanup('test', batch_size=100)
+
+        assert list(Goal.objects.all()) == [goal]
+        assert GoalComment.objects.count() == 0
+        assert GoalCategory.objects.count() == BoardParticipant.objects.count() == Board.objects.count() == 1
+        assert not User.objects.filter(username='bench-test').exists()
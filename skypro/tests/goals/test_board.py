@@ -1,7 +1,7 @@
 import pytest
 from rest_framework import status
 from rest_framework.fields import DateTimeField
-from goals.models import Board
+from goals.models import Board, BoardParticipant
 from unittest.mock import ANY
 
 
@@ -116,3 +116,51 @@ class TestBoardViews:
 
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert response.data is None
+
+    def test_board_update_participants(self, auth_client, user, user_factory, board: Board):
+        kept, removed, added = user_factory.create_batch(3)
+        BoardParticipant.objects.create(board=board, user=kept, role=BoardParticipant.Role.reader)
+        BoardParticipant.objects.create(board=board, user=removed, role=BoardParticipant.Role.reader)
+
+        response = auth_client.put(path=f'/goals/board/{board.pk}', data={
+            'title': board.title,
+            'participants': [
+                {'user': kept.username, 'role': BoardParticipant.Role.writer},
+                {'user': added.username, 'role': BoardParticipant.Role.reader},
+            ]
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert dict(board.participants.values_list('user_id', 'role')) == {
+            user.pk: BoardParticipant.Role.owner,
+            kept.pk: BoardParticipant.Role.writer,
+            added.pk: BoardParticipant.Role.reader,
+        }
+
+    def test_board_update_unknown_participant(self, auth_client, user, board: Board):
+        response = auth_client.put(path=f'/goals/board/{board.pk}', data={
+            'title': board.title,
+            'participants': [
+                {'user': user.username, 'role': BoardParticipant.Role.owner},
+                {'user': 'unknown', 'role': BoardParticipant.Role.reader},
+            ]
+        }, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {'participants': [{}, {'user': ['Object with username=unknown does not exist.']}]}
+
+    def test_board_update_participants_queries(self, auth_client, user_factory, board: Board,
+                                               django_assert_max_num_queries):
+        participants = [
+            {'user': participant.username, 'role': BoardParticipant.Role.reader}
+            for participant in user_factory.create_batch(5)
+        ]
+
+        with django_assert_max_num_queries(12):
+            response = auth_client.put(path=f'/goals/board/{board.pk}', data={
+                'title': board.title,
+                'participants': participants,
+            }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()['participants']) == 6
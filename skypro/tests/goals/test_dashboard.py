@@ -0,0 +1,175 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from goals.dashboard import DashboardCache
+from goals.models import Board, BoardParticipant, Goal, GoalCategory
+
+DASHBOARD_PATH = '/goals/goal/dashboard'
+# every authenticated request starts with session and user lookups
+AUTH_QUERIES = 2
+
+
+def board_counts(response, board: Board) -> dict:
+    return next(item for item in response.json()['boards'] if item['id'] == board.pk)
+
+
+@pytest.mark.django_db
+class TestGoalDashboard:
+
+    @pytest.fixture()
+    def goals(self, user, category: GoalCategory, goal_factory) -> list[Goal]:
+        yesterday = timezone.localdate() - datetime.timedelta(days=1)
+        return [
+            goal_factory.create(category=category, user=user, status=Goal.Status.to_do,
+                                priority=Goal.Priority.high, due_date=yesterday),
+            goal_factory.create(category=category, user=user, status=Goal.Status.in_progress,
+                                priority=Goal.Priority.high),
+            goal_factory.create(category=category, user=user, status=Goal.Status.done,
+                                priority=Goal.Priority.low, due_date=yesterday),
+            goal_factory.create(category=category, user=user, status=Goal.Status.archived),
+        ]
+
+    def test_counts(self, auth_client, board: Board, category: GoalCategory, goals: list[Goal],
+                    goal_category_factory, user):
+        empty_category = goal_category_factory.create(board=board, user=user)
+
+        response = auth_client.get(DASHBOARD_PATH)
+
+        assert response.status_code == status.HTTP_200_OK
+        counts = board_counts(response, board)
+        assert counts['total'] == 3
+        assert counts['status'] == {'1': 1, '2': 1, '3': 1}
+        assert counts['priority'] == {'1': 1, '2': 0, '3': 2, '4': 0}
+        assert counts['overdue'] == 1
+        assert {item['id']: item['total'] for item in counts['categories']} == {category.pk: 3,
+                                                                                empty_category.pk: 0}
+
+    def test_only_participated_boards(self, client, user_factory, board: Board, goals: list[Goal]):
+        client.force_login(user_factory.create())
+
+        response = client.get(DASHBOARD_PATH)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['boards'] == []
+
+    def test_board_without_categories(self, auth_client, board: Board):
+        response = auth_client.get(DASHBOARD_PATH)
+
+        assert board_counts(response, board)['categories'] == []
+
+    def test_deleted_category_is_skipped(self, auth_client, board: Board, category: GoalCategory,
+                                         goals: list[Goal]):
+        auth_client.delete(f'/goals/goal_category/{category.pk}')
+
+        response = auth_client.get(DASHBOARD_PATH)
+
+        assert board_counts(response, board) | {'categories': None} == {
+            'id': board.pk, 'title': board.title, 'total': 0, 'status': {'1': 0, '2': 0, '3': 0},
+            'priority': {'1': 0, '2': 0, '3': 0, '4': 0}, 'overdue': 0, 'categories': None,
+        }
+
+    def test_one_query_then_cached(self, auth_client, board: Board, goals: list[Goal],
+                                   django_assert_num_queries):
+        with django_assert_num_queries(AUTH_QUERIES + 1):
+            auth_client.get(DASHBOARD_PATH)
+        with django_assert_num_queries(AUTH_QUERIES):
+            auth_client.get(DASHBOARD_PATH)
+
+    def test_goal_write_invalidates(self, auth_client, board: Board, goals: list[Goal]):
+        assert board_counts(auth_client.get(DASHBOARD_PATH), board)['status']['1'] == 1
+
+        auth_client.patch(f'/goals/goal/{goals[0].pk}', data={'status': Goal.Status.done}, format='json')
+
+        assert board_counts(auth_client.get(DASHBOARD_PATH), board)['status'] == {'1': 0, '2': 1, '3': 2}
+
+    def test_goal_move_invalidates_old_board(self, auth_client, user, board: Board, goals: list[Goal],
+                                             board_factory, goal_category_factory):
+        other_category = goal_category_factory.create(board=board_factory.create(set_owner=user), user=user)
+        assert board_counts(auth_client.get(DASHBOARD_PATH), board)['total'] == 3
+
+        auth_client.patch(f'/goals/goal/{goals[0].pk}', data={'category': other_category.pk}, format='json')
+
+        response = auth_client.get(DASHBOARD_PATH)
+        assert board_counts(response, board)['total'] == 2
+        assert board_counts(response, other_category.board)['total'] == 1
+
+    def test_batch_update_invalidates(self, auth_client, board: Board, goals: list[Goal]):
+        assert board_counts(auth_client.get(DASHBOARD_PATH), board)['priority']['4'] == 0
+
+        auth_client.post('/goals/goal/batch_update', data=[
+            {'id': goals[0].pk, 'priority': Goal.Priority.critical},
+        ], format='json')
+
+        assert board_counts(auth_client.get(DASHBOARD_PATH), board)['priority']['4'] == 1
+
+    def test_new_participant_sees_board(self, client, user_factory, board: Board, goals: list[Goal]):
+        reader = user_factory.create()
+        client.force_login(reader)
+        assert client.get(DASHBOARD_PATH).json()['boards'] == []
+
+        BoardParticipant.objects.create(board=board, user=reader, role=BoardParticipant.Role.reader)
+
+        assert board_counts(client.get(DASHBOARD_PATH), board)['total'] == 3
+
+    def test_participant_added_by_board_update_sees_board(self, auth_client, user_factory, board: Board,
+                                                           goals: list[Goal]):
+        reader = user_factory.create()
+        client = APIClient()
+        client.force_login(reader)
+        assert client.get(DASHBOARD_PATH).json()['boards'] == []
+
+        auth_client.put(f'/goals/board/{board.pk}', data={
+            'title': board.title,
+            'participants': [{'user': reader.username, 'role': BoardParticipant.Role.reader}],
+        }, format='json')
+
+        assert board_counts(client.get(DASHBOARD_PATH), board)['total'] == 3
+
+    def test_requires_auth(self, client):
+        assert client.get(DASHBOARD_PATH).status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestDashboardCache:
+    today = datetime.date(2023, 1, 2)
+
+    def test_invalidate_by_board_and_category(self):
+        cache = DashboardCache(maxsize=10, ttl=60)
+        cache.set(1, self.today, {10}, {100}, {'user': 1})
+        cache.set(2, self.today, {20}, {200}, {'user': 2})
+
+        cache.invalidate_boards(10)
+        cache.invalidate_categories(200)
+
+        assert cache.get(1, self.today) is None
+        assert cache.get(2, self.today) is None
+
+    def test_expires(self):
+        now = [0.0]
+        cache = DashboardCache(maxsize=10, ttl=60, clock=lambda: now[0])
+        cache.set(1, self.today, set(), set(), {})
+
+        assert cache.get(1, self.today) == {}
+        assert cache.get(1, self.today + datetime.timedelta(days=1)) is None
+        cache.set(1, self.today, set(), set(), {})
+        now[0] = 60
+        assert cache.get(1, self.today) is None
+
+    def test_evicts_least_recently_used(self):
+        cache = DashboardCache(maxsize=2, ttl=60)
+        cache.set(1, self.today, set(), set(), {})
+        cache.set(2, self.today, set(), set(), {})
+        cache.get(1, self.today)
+        cache.set(3, self.today, set(), set(), {})
+
+        assert cache.get(2, self.today) is None
+        assert cache.get(1, self.today) == {}
+
+    def test_disabled(self):
+        cache = DashboardCache(maxsize=0, ttl=60)
+        cache.set(1, self.today, set(), set(), {})
+
+        assert cache.get(1, self.today) is None
@@ -141,3 +141,36 @@ class TestGoalViews:
 
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert response.data is None
+
+
+@pytest.mark.django_db
+class TestGoalCreate:
+
+    def test_duplicate_title(self, auth_client, goal: Goal):
+        response = auth_client.post(path='/goals/goal/create', data={
+            'title': goal.title,
+            'category': goal.category.pk,
+        }, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {'title': ['Goal with this title already exists.']}
+
+    def test_unknown_category(self, auth_client, faker):
+        response = auth_client.post(path='/goals/goal/create', data={
+            'title': faker.company(),
+            'category': 100,
+        }, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {'category': ['Invalid pk "100" - object does not exist.']}
+
+    def test_no_write_permission(self, client, user_factory, goal_category: GoalCategory, faker):
+        client.force_login(user_factory.create())
+
+        response = client.post(path='/goals/goal/create', data={
+            'title': faker.company(),
+            'category': goal_category.pk,
+        }, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert response.json() == {'non_field_errors': ['No write permission']}
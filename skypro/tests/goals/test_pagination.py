@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from goals.models import GoalCategory
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    @pytest.fixture()
+    def goal_titles(self, user, goal_category: GoalCategory, goal_factory) -> list[str]:
+        return sorted(goal.title for goal in goal_factory.create_batch(5, user=user, category=goal_category))
+
+    def test_goal_list_pages(self, auth_client, goal_titles: list[str]):
+        response = auth_client.get(path='/goals/goal/list', data={'pagination': 'cursor', 'limit': 2})
+        first_page = response.json()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in first_page
+        assert first_page['previous'] is None
+        assert [goal['title'] for goal in first_page['results']] == goal_titles[:2]
+
+        titles: list[str] = []
+        next_url = first_page['next']
+        while next_url:
+            page = auth_client.get(path=next_url).json()
+            titles.extend(goal['title'] for goal in page['results'])
+            next_url = page['next']
+
+        assert titles == goal_titles[2:]
+
+    def test_ordering_choice(self, auth_client, goal_titles: list[str]):
+        response = auth_client.get(path='/goals/goal/list', data={
+            'pagination': 'cursor', 'limit': 3, 'ordering': '-title'
+        })
+
+        assert [goal['title'] for goal in response.json()['results']] == goal_titles[::-1][:3]
+
+    def test_no_count_query(self, auth_client, goal_titles: list[str]):
+        with CaptureQueriesContext(connection) as context:
+            auth_client.get(path='/goals/goal/list', data={'pagination': 'cursor', 'limit': 2})
+
+        assert not [query for query in context.captured_queries if 'COUNT(' in query['sql']]
+
+    def test_insert_before_cursor(self, auth_client, user, goal_category: GoalCategory, goal_factory,
+                                  goal_titles: list[str]):
+        first_page = auth_client.get(path='/goals/goal/list', data={'pagination': 'cursor', 'limit': 2}).json()
+        goal_factory.create(user=user, category=goal_category, title='0' + goal_titles[0])
+
+        second_page = auth_client.get(path=first_page['next']).json()
+
+        assert [goal['title'] for goal in second_page['results']] == goal_titles[2:4]
+
+    def test_comment_list_pages(self, auth_client, user, goal, goal_comment_factory):
+        comments = goal_comment_factory.create_batch(3, user=user, goal=goal)
+        response = auth_client.get(path='/goals/goal_comment/list', data={
+            'pagination': 'cursor', 'limit': 2, 'goal': goal.pk
+        })
+
+        assert [comment['id'] for comment in response.json()['results']] == [comments[2].pk, comments[1].pk]
+
+    def test_limit_offset_by_default(self, auth_client, goal_titles: list[str]):
+        response = auth_client.get(path='/goals/goal/list', data={'limit': 2})
+
+        assert response.json()['count'] == len(goal_titles)
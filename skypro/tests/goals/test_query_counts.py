@@ -0,0 +1,54 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from goals.models import Board, BoardParticipant, GoalCategory, Goal
+
+# every authenticated request starts with session and user lookups
+AUTH_QUERIES = 2
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('response_cache')
+class TestQueryCounts:
+
+    @pytest.fixture()
+    def board_data(self, user, user_factory, board: Board, goal_category_factory, goal_factory,
+                   goal_comment_factory) -> dict:
+        for participant in user_factory.create_batch(3):
+            BoardParticipant.objects.create(board=board, user=participant, role=BoardParticipant.Role.reader)
+        categories: list[GoalCategory] = goal_category_factory.create_batch(10, board=board, user=user)
+        goals: list[Goal] = goal_factory.create_batch(10, category=categories[0], user=user)
+        comments = goal_comment_factory.create_batch(10, goal=goals[0], user=user)
+        return {'board': board, 'category': categories[0], 'goal': goals[0], 'comment': comments[0]}
+
+    @pytest.mark.parametrize('path, queries', [
+        # a cache miss takes the user's board ids for the key from the cache
+        ('/goals/goal_category/list', 1),
+        ('/goals/goal/list', 1),
+        ('/goals/goal_comment/list?goal={goal.pk}', 2),  # goal filter validates the goal exists
+        ('/goals/board/list', 1),
+        # detail views read the role from the participant row the object query joins
+        ('/goals/goal_category/{category.pk}', 1),
+        ('/goals/goal/{goal.pk}', 1),
+        ('/goals/goal_comment/{comment.pk}', 1),
+        ('/goals/board/{board.pk}', 2),
+    ])
+    def test_read_endpoints(self, auth_client, board_data: dict, django_assert_num_queries, path: str,
+                            queries: int):
+        with django_assert_num_queries(AUTH_QUERIES + queries):
+            response = auth_client.get(path=path.format(**board_data))
+
+        assert response.status_code == 200
+
+    def test_goal_create(self, auth_client, goal_category: GoalCategory, faker):
+        with CaptureQueriesContext(connection) as context:
+            response = auth_client.post(path='/goals/goal/create', data={
+                'title': faker.company(),
+                'category': goal_category.pk,
+            }, format='json')
+
+        statements = [query['sql'] for query in context.captured_queries if 'SAVEPOINT' not in query['sql']]
+        assert response.status_code == 201
+        # one permission query and one insert
+        assert len(statements) == AUTH_QUERIES + 2
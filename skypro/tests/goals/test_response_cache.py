@@ -0,0 +1,161 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import pytest
+from django.http import QueryDict
+from rest_framework import status
+
+from goals.models import Board, BoardParticipant, Goal, GoalCategory
+from goals.response_cache import bump_board_versions, get_board_versions, response_key
+
+# every authenticated request starts with session and user lookups
+AUTH_QUERIES = 2
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('response_cache')
+class TestListResponseCache:
+
+    @pytest.mark.parametrize('path', ['/goals/goal/list', '/goals/goal_category/list', '/goals/board/list'])
+    def test_second_read_is_a_hit(self, auth_client, goal: Goal, path: str, django_assert_num_queries):
+        first = auth_client.get(path)
+        with django_assert_num_queries(AUTH_QUERIES):
+            second = auth_client.get(path)
+
+        assert first['X-Cache'] == 'MISS'
+        assert second['X-Cache'] == 'HIT'
+        assert second.json() == first.json()
+
+    def test_query_params_order_does_not_matter(self, auth_client, goal: Goal):
+        auth_client.get('/goals/goal/list?status=1&ordering=title')
+
+        assert auth_client.get('/goals/goal/list?ordering=title&status=1')['X-Cache'] == 'HIT'
+        assert auth_client.get('/goals/goal/list?ordering=-title&status=1')['X-Cache'] == 'MISS'
+
+    def test_goal_write_makes_list_stale(self, auth_client, goal: Goal, faker):
+        auth_client.get('/goals/goal/list')
+        title = faker.company()
+
+        auth_client.patch(f'/goals/goal/{goal.pk}', data={'title': title}, format='json')
+
+        response = auth_client.get('/goals/goal/list')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()[0]['title'] == title
+
+    def test_goal_create_makes_list_stale(self, auth_client, category: GoalCategory, goal: Goal, faker):
+        auth_client.get('/goals/goal/list')
+
+        auth_client.post('/goals/goal/create', data={'title': faker.company(), 'category': category.pk},
+                         format='json')
+
+        assert len(auth_client.get('/goals/goal/list').json()) == 2
+
+    def test_comment_write_bumps_board(self, auth_client, goal: Goal):
+        auth_client.get('/goals/goal/list')
+
+        auth_client.post('/goals/goal_comment/create', data={'goal': goal.pk, 'text': 'text'}, format='json')
+
+        assert auth_client.get('/goals/goal/list')['X-Cache'] == 'MISS'
+
+    def test_other_boards_stay_cached(self, auth_client, user, goal: Goal, board_factory, goal_category_factory):
+        auth_client.get('/goals/goal/list')
+        other_board: Board = board_factory.create()
+
+        goal_category_factory.create(board=other_board, user=user)
+
+        assert auth_client.get('/goals/goal/list')['X-Cache'] == 'HIT'
+
+    def test_new_participant_does_not_get_others_response(self, client, user_factory, goal: Goal):
+        reader = user_factory.create()
+        client.force_login(reader)
+        assert client.get('/goals/goal/list').json() == []
+
+        BoardParticipant.objects.create(board=goal.category.board, user=reader, role=BoardParticipant.Role.reader)
+
+        assert [item['id'] for item in client.get('/goals/goal/list').json()] == [goal.pk]
+
+    def test_removed_participant_loses_response(self, client, user_factory, goal: Goal):
+        reader = user_factory.create()
+        participant = BoardParticipant.objects.create(board=goal.category.board, user=reader,
+                                                      role=BoardParticipant.Role.reader)
+        client.force_login(reader)
+        client.get('/goals/goal/list')
+
+        participant.delete()
+
+        assert client.get('/goals/goal/list').json() == []
+
+    def test_participant_added_by_board_update(self, auth_client, user, user_factory, goal: Goal):
+        reader = user_factory.create()
+        board: Board = goal.category.board
+        auth_client.force_login(reader)
+        auth_client.get('/goals/goal/list')
+        auth_client.force_login(user)
+
+        auth_client.put(f'/goals/board/{board.pk}', data={
+            'title': board.title, 'participants': [{'user': reader.username, 'role': BoardParticipant.Role.reader}],
+        }, format='json')
+
+        auth_client.force_login(reader)
+        assert [item['id'] for item in auth_client.get('/goals/goal/list').json()] == [goal.pk]
+
+    def test_write_in_another_process_makes_list_stale(self, auth_client, goal: Goal, settings, tmp_path):
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path),
+        }}
+        auth_client.get('/goals/goal/list')
+        assert auth_client.get('/goals/goal/list')['X-Cache'] == 'HIT'
+
+        # a write in another worker replaces the board's version in the shared cache
+        worker = multiprocessing.get_context('fork').Process(target=bump_board_versions, args=(goal.board_id,))
+        worker.start()
+        worker.join()
+
+        assert worker.exitcode == 0
+        assert auth_client.get('/goals/goal/list')['X-Cache'] == 'MISS'
+
+    def test_disabled(self, auth_client, goal: Goal, settings):
+        settings.GOALS_RESPONSE_CACHE_TIMEOUT = 0
+        auth_client.get('/goals/goal/list')
+
+        assert 'X-Cache' not in auth_client.get('/goals/goal/list')
+
+    def test_stats(self, admin_client, auth_client, goal: Goal):
+        auth_client.get('/goals/goal/list')
+        auth_client.get('/goals/goal/list')
+
+        response = admin_client.get('/goals/response_cache/stats')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['GoalListView'] == {'hits': 1, 'misses': 1, 'hit_ratio': 0.5}
+
+    def test_stats_are_for_admins(self, auth_client):
+        assert auth_client.get('/goals/response_cache/stats').status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestCacheSettings:
+
+    @pytest.mark.parametrize('url', ['redis://redis:6379/1', 'rediscache://redis:6379/1'])
+    def test_redis_cache_url(self, url: str, settings):
+        """Loads the settings in a fresh process, creating the backend does not connect to Redis"""
+        code = ('import django; django.setup(); '
+                'from django.conf import settings; from django.core.cache import caches; '
+                'print(type(caches["default"]).__module__, settings.GOALS_RESPONSE_CACHE_TIMEOUT)')
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True,
+                                text=True, check=True, env=os.environ | {'CACHE_URL': url})
+
+        assert result.stdout.split() == ['django.core.cache.backends.redis', '300']
+
+
+class TestBoardVersions:
+
+    def test_bump_changes_key(self):
+        params = QueryDict('status=1')
+        before = response_key('view', 1, params, get_board_versions([1, 2]))
+
+        bump_board_versions(2)
+
+        assert response_key('view', 1, params, get_board_versions([1, 2])) != before
+        assert get_board_versions([1])[0][1] == get_board_versions([1])[0][1]
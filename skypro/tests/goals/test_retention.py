@@ -0,0 +1,176 @@
+import datetime
+import importlib
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from goals import archival
+from goals.models import ArchivalJob, Board, BoardParticipant, Goal, GoalCategory, GoalComment
+from goals.retention import purge
+
+
+def age(days: int) -> None:
+    """Moves every row's last update, deletion and archival and every job's finish the given days back"""
+    past = timezone.now() - datetime.timedelta(days=days)
+    for model in (Board, BoardParticipant, GoalCategory, Goal, GoalComment):
+        model.objects.update(updated=past)
+    Board.objects.exclude(deleted_at=None).update(deleted_at=past)
+    GoalCategory.objects.exclude(deleted_at=None).update(deleted_at=past)
+    Goal.objects.exclude(archived_at=None).update(archived_at=past)
+    ArchivalJob.objects.exclude(finished=None).update(finished=past)
+
+
+def counts() -> dict[str, int]:
+    return {model.__name__: model.objects.count()
+            for model in (Board, BoardParticipant, GoalCategory, Goal, GoalComment, ArchivalJob)}
+
+
+@pytest.mark.django_db
+class TestRetention:
+
+    @pytest.fixture()
+    def deleted_board(self, user, board: Board, category: GoalCategory, goal_factory,
+                      goal_comment_factory) -> Board:
+        goals: list[Goal] = goal_factory.create_batch(3, category=category, user=user)
+        goal_comment_factory.create_batch(2, goal=goals[0], user=user)
+        archival.run_job(archival.delete_board(board, user).pk, pause=0)
+        return board
+
+    @pytest.fixture()
+    def live_goals(self, user, board_factory, goal_category_factory, goal_factory) -> tuple[Goal, Goal]:
+        """An active and an archived goal of a board that is not deleted"""
+        category: GoalCategory = goal_category_factory.create(board=board_factory.create(set_owner=user), user=user)
+        return (goal_factory.create(category=category, user=user),
+                goal_factory.create(category=category, user=user, status=Goal.Status.archived))
+
+    def test_old_deleted_board_purged(self, user, deleted_board: Board, live_goals: tuple[Goal, Goal]):
+        age(days=91)
+
+        results = purge(batch_size=2, pause=0)
+
+        assert {name: result['rows'] for name, result in results.items()} == {
+            'comments': 2, 'goals': 4, 'archival jobs': 1, 'categories': 1, 'participants': 1, 'boards': 1,
+        }
+        assert not Board.objects.filter(pk=deleted_board.pk).exists()
+        assert list(Goal.objects.all()) == [live_goals[0]]
+        assert counts() == {'Board': 1, 'BoardParticipant': 1, 'GoalCategory': 1, 'Goal': 1, 'GoalComment': 0,
+                            'ArchivalJob': 0}
+
+    def test_recent_deletion_kept(self, deleted_board: Board, live_goals: tuple[Goal, Goal]):
+        age(days=89)
+        before = counts()
+
+        results = purge(pause=0)
+
+        assert sum(result['rows'] for result in results.values()) == 0
+        assert counts() == before
+
+    def test_age_is_from_archival_not_update(self, deleted_board: Board, live_goals: tuple[Goal, Goal]):
+        age(days=91)
+        Goal.objects.update(updated=timezone.now())
+
+        assert purge(pause=0, dry_run=True)['goals']['rows'] == 4
+
+    def test_restored_goal_loses_archival_date(self, live_goals: tuple[Goal, Goal]):
+        archived: Goal = live_goals[1]
+        assert archived.archived_at is not None
+
+        archived.status = Goal.Status.to_do
+        archived.save()
+
+        assert Goal.objects.get(pk=archived.pk).archived_at is None
+
+    def test_legacy_rows_kept_a_full_period(self, deleted_board: Board, live_goals: tuple[Goal, Goal]):
+        """Rows archived or deleted before the dates existed, by code that left updated alone"""
+        age(days=365)
+        Board.objects.update(deleted_at=None)
+        GoalCategory.objects.update(deleted_at=None)
+        Goal.objects.update(archived_at=None)
+        backfill = importlib.import_module('goals.migrations.0015_backfill_retention_dates')
+
+        backfill.backfill_retention_dates(apps, SimpleNamespace(connection=connection))
+
+        results = purge(pause=0)
+
+        # the finished job has its own date
+        assert {name: result['rows'] for name, result in results.items() if name != 'archival jobs'} == dict.fromkeys(
+            ('comments', 'goals', 'categories', 'participants', 'boards'), 0)
+        assert not Goal.objects.filter(status=Goal.Status.archived, archived_at=None).exists()
+        assert not Board.objects.filter(is_deleted=True, deleted_at=None).exists()
+
+    def test_older_than(self, deleted_board: Board):
+        age(days=10)
+
+        purge(older_than=datetime.timedelta(days=7), pause=0)
+
+        assert not Board.objects.exists()
+
+    def test_unfinished_archival_keeps_board(self, user, board: Board, category: GoalCategory, goal_factory):
+        goal_factory.create_batch(3, category=category, user=user)
+        job: ArchivalJob = archival.delete_board(board, user)
+        archival.run_batch(job.pk, batch_size=2)
+        age(days=91)
+
+        results = purge(pause=0)
+
+        assert results['goals']['rows'] == 2
+        assert {name: result['rows'] for name, result in results.items() if name != 'goals'} == dict.fromkeys(
+            ('comments', 'archival jobs', 'categories', 'participants', 'boards'), 0)
+        assert Goal.objects.get().status != Goal.Status.archived
+        assert ArchivalJob.objects.filter(board=board).exists()
+
+    def test_dry_run(self, deleted_board: Board, live_goals: tuple[Goal, Goal]):
+        age(days=91)
+        before = counts()
+
+        dry_run = purge(pause=0, dry_run=True)
+
+        assert counts() == before
+        assert dry_run == purge(pause=0)
+
+    def test_idempotent(self, deleted_board: Board):
+        age(days=91)
+        purge(batch_size=1, pause=0)
+        after = counts()
+
+        results = purge(pause=0)
+
+        assert sum(result['rows'] for result in results.values()) == 0
+        assert counts() == after
+
+    def test_bytes_reported(self, deleted_board: Board):
+        age(days=91)
+
+        results = purge(pause=0)
+
+        for name, result in results.items():
+            assert result['bytes'] is None or result['bytes'] > 0, name
+
+    def test_dump_loads_back(self, deleted_board: Board, tmp_path):
+        age(days=91)
+        before = counts()
+
+        purge(pause=0, dump_dir=tmp_path)
+
+        assert not Board.objects.exists()
+        for name in ('board', 'boardparticipant', 'goalcategory', 'archivaljob', 'goal', 'goalcomment'):
+            call_command('loaddata', str(tmp_path / f'goals.{name}.jsonl'), verbosity=0)
+        assert counts() == before
+
+    def test_command(self, deleted_board: Board):
+        age(days=91)
+        out = StringIO()
+
+        call_command('purge_deleted_goals', '--dry-run', stdout=out)
+        assert 'goals: 3 rows to purge' in out.getvalue()
+        assert Board.objects.exists()
+
+        call_command('purge_deleted_goals', '--pause', '0', stdout=out)
+        assert 'boards: 1 rows purged' in out.getvalue()
+        assert 'total: 9 rows purged' in out.getvalue()
+        assert not Board.objects.exists()
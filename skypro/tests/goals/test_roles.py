@@ -0,0 +1,112 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from goals.models import BoardParticipant, GoalCategory, Goal
+from goals.roles import BoardRolesCache, roles_cache, load_board_roles
+
+
+def participant_queries(context: CaptureQueriesContext) -> list[str]:
+    return [query['sql'] for query in context.captured_queries if 'goals_boardparticipant' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestBoardRoles:
+
+    def test_goal_create_checks_membership_once(self, auth_client, goal_category: GoalCategory, faker):
+        with CaptureQueriesContext(connection) as context:
+            response = auth_client.post(path='/goals/goal/create', data={
+                'title': faker.company(),
+                'category': goal_category.pk,
+            }, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(participant_queries(context)) == 1
+
+    def test_goal_update_checks_membership_once(self, auth_client, goal: Goal, faker):
+        with CaptureQueriesContext(connection) as context:
+            response = auth_client.patch(path=f'/goals/goal/{goal.pk}', data={'title': faker.company()})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(participant_queries(context)) == 1
+
+    def test_category_update_checks_membership_once(self, auth_client, category: GoalCategory, faker):
+        with CaptureQueriesContext(connection) as context:
+            response = auth_client.patch(path=f'/goals/goal_category/{category.pk}', data={'title': faker.company()})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(participant_queries(context)) == 1
+
+    def test_reader_can_not_write(self, client, user_factory, goal: Goal, faker):
+        reader = user_factory.create()
+        BoardParticipant.objects.create(board=goal.category.board, user=reader, role=BoardParticipant.Role.reader)
+        client.force_login(reader)
+
+        assert client.get(path=f'/goals/goal/{goal.pk}').status_code == status.HTTP_200_OK
+        response = client.patch(path=f'/goals/goal/{goal.pk}', data={'title': faker.company()})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_category_create_without_membership(self, client, user_factory, board, faker):
+        client.force_login(user_factory.create())
+        response = client.post(path='/goals/goal_category/create', data={
+            'title': faker.company(),
+            'board': board.pk
+        }, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_cache_is_invalidated_on_participant_change(self, user, user_factory, board, monkeypatch):
+        monkeypatch.setattr(roles_cache, 'maxsize', 10)
+        roles_cache.clear()
+        assert load_board_roles(user) == {board.pk: BoardParticipant.Role.owner}
+
+        participant = BoardParticipant.objects.get(board=board, user=user)
+        participant.role = BoardParticipant.Role.reader
+        participant.save()
+
+        assert load_board_roles(user) == {board.pk: BoardParticipant.Role.reader}
+        roles_cache.clear()
+
+    def test_cache_is_invalidated_on_commit(self, user, board, monkeypatch, django_capture_on_commit_callbacks):
+        monkeypatch.setattr(roles_cache, 'maxsize', 10)
+        participant = BoardParticipant.objects.get(board=board, user=user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            participant.role = BoardParticipant.Role.reader
+            participant.save()
+            # a concurrent request reads the roles between the save and the commit
+            roles_cache.set(user.pk, {board.pk: BoardParticipant.Role.owner})
+
+        assert roles_cache.get(user.pk) is None
+        roles_cache.clear()
+
+
+class TestBoardRolesCache:
+
+    def test_lru_eviction(self):
+        cache = BoardRolesCache(maxsize=2, ttl=60)
+        cache.set(1, {1: 1})
+        cache.set(2, {2: 1})
+        cache.get(1)
+        cache.set(3, {3: 1})
+
+        assert cache.get(2) is None
+        assert cache.get(1) == {1: 1}
+        assert cache.get(3) == {3: 1}
+
+    def test_ttl(self):
+        now = [0.0]
+        cache = BoardRolesCache(maxsize=2, ttl=30, clock=lambda: now[0])
+        cache.set(1, {1: 1})
+
+        now[0] = 29
+        assert cache.get(1) == {1: 1}
+        now[0] = 30
+        assert cache.get(1) is None
+
+    def test_disabled(self):
+        cache = BoardRolesCache(maxsize=0, ttl=60)
+        cache.set(1, {1: 1})
+
+        assert cache.get(1) is None
@@ -0,0 +1,93 @@
+import pytest
+from django.db import connection
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from goals.models import Goal, GoalCategory
+from goals.search import RankedSearchFilter, has_fts
+from goals.views import GoalListView
+
+pytestmark = pytest.mark.skipif(connection.vendor not in ('sqlite', 'postgresql') or
+                                connection.vendor == 'sqlite' and not has_fts(connection),
+                                reason='search indexes are not installed')
+
+
+def titles(response) -> list[str]:
+    return [item['title'] for item in response.json()]
+
+
+@pytest.mark.django_db
+class TestGoalSearch:
+
+    @pytest.fixture()
+    def goals(self, user, category: GoalCategory, goal_factory) -> list[Goal]:
+        return [
+            goal_factory.create(category=category, user=user, title='Купить молоко', description='и хлеб'),
+            goal_factory.create(category=category, user=user, title='Молоко', description='молоко молоко'),
+            goal_factory.create(category=category, user=user, title='Прочитать книгу', description=None),
+        ]
+
+    def test_substring_of_title_and_description(self, auth_client, goals: list[Goal]):
+        assert set(titles(auth_client.get('/goals/goal/list?search=олок'))) == {'Купить молоко', 'Молоко'}
+        assert titles(auth_client.get('/goals/goal/list?search=хлеб')) == ['Купить молоко']
+
+    def test_every_term_must_match(self, auth_client, goals: list[Goal]):
+        assert titles(auth_client.get('/goals/goal/list?search=молоко купить')) == ['Купить молоко']
+
+    def test_ranked_by_relevance(self, auth_client, goals: list[Goal]):
+        assert titles(auth_client.get('/goals/goal/list?search=молоко')) == ['Молоко', 'Купить молоко']
+
+    def test_explicit_ordering_wins(self, auth_client, goals: list[Goal]):
+        response = auth_client.get('/goals/goal/list?search=молоко&ordering=-title')
+
+        assert titles(response) == ['Молоко', 'Купить молоко']
+        assert titles(auth_client.get('/goals/goal/list?search=молоко&ordering=created')) == [
+            'Купить молоко', 'Молоко']
+
+    def test_short_term(self, auth_client, goals: list[Goal]):
+        assert titles(auth_client.get('/goals/goal/list?search=кн')) == ['Прочитать книгу']
+
+    def test_operators_are_plain_text(self, auth_client, goals: list[Goal]):
+        assert titles(auth_client.get('/goals/goal/list?search="молоко OR книгу*')) == []
+
+    def test_follows_writes(self, auth_client, goals: list[Goal]):
+        auth_client.patch(f'/goals/goal/{goals[2].pk}', data={'title': 'Прочитать статью'}, format='json')
+        goals[0].delete()
+
+        assert titles(auth_client.get('/goals/goal/list?search=статью')) == ['Прочитать статью']
+        assert titles(auth_client.get('/goals/goal/list?search=книгу')) == []
+        assert titles(auth_client.get('/goals/goal/list?search=хлеб')) == []
+
+    def test_only_visible_goals(self, auth_client, goals: list[Goal], goal_factory):
+        goal_factory.create(title='Чужое молоко')
+
+        assert 'Чужое молоко' not in titles(auth_client.get('/goals/goal/list?search=молоко'))
+
+    def test_category_search(self, auth_client, user, board, goal_category_factory):
+        goal_category_factory.create(board=board, user=user, title='Покупки')
+        goal_category_factory.create(board=board, user=user, title='Работа')
+
+        assert titles(auth_client.get('/goals/goal_category/list?search=купк')) == ['Покупки']
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite', reason='SQLite plan')
+    def test_sqlite_uses_fts(self, user, goals: list[Goal]):
+        request = Request(APIRequestFactory().get('/', {'search': 'молоко'}))
+        queryset = RankedSearchFilter().filter_queryset(request, Goal.objects.visible_to(user), GoalListView())
+        plan = queryset.explain()
+
+        assert 'goals_goal_fts VIRTUAL TABLE INDEX' in plan
+        assert 'SCAN goals_goal ' not in plan
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='PostgreSQL plan')
+    def test_postgresql_uses_trgm_index(self, user, goals: list[Goal]):
+        request = Request(APIRequestFactory().get('/', {'search': 'молоко'}))
+        queryset = RankedSearchFilter().filter_queryset(request, Goal.objects.visible_to(user), GoalListView())
+        with connection.cursor() as cursor:
+            # a few test rows are cheaper to scan, the plan must still be able to use the indexes
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+
+        assert 'goals_goal_title_upper_trgm_idx' in plan
+        assert 'goals_goal_description_upper_trgm_idx' in plan
+        assert 'Seq Scan on goals_goal ' not in plan
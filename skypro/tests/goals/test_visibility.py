@@ -0,0 +1,159 @@
+import importlib
+from types import SimpleNamespace
+
+import pytest
+from django.apps import apps
+from django.db import connection
+
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment
+
+VISIBLE_MODELS = [Board, GoalCategory, Goal, GoalComment]
+
+
+@pytest.mark.django_db
+class TestVisibleQuerysets:
+
+    def test_goal_visible_to(self, user, user_factory, board, category, goal_factory):
+        other_user = user_factory.create()
+        BoardParticipant.objects.create(board=board, user=other_user, role=BoardParticipant.Role.reader)
+        goal = goal_factory.create(category=category, user=user)
+        goal_factory.create(category=category, user=user, status=Goal.Status.archived)
+        goal_factory.create(user=other_user)
+
+        assert list(Goal.objects.visible_to(user)) == [goal]
+        assert list(Goal.objects.visible_to(other_user).filter(category=category)) == [goal]
+
+    def test_deleted_category_is_hidden(self, user, category, goal):
+        category.is_deleted = True
+        category.save()
+
+        assert not GoalCategory.objects.visible_to(user).exists()
+        assert not Goal.objects.visible_to(user).exists()
+
+    def test_comment_visible_to(self, user, user_factory, goal, goal_comment_factory):
+        comment = goal_comment_factory.create(goal=goal, user=user)
+        goal_comment_factory.create()
+
+        assert list(GoalComment.objects.visible_to(user)) == [comment]
+        assert not GoalComment.objects.visible_to(user_factory.create()).exists()
+
+    @pytest.mark.parametrize('model', VISIBLE_MODELS)
+    def test_single_select(self, user, model):
+        sql = str(model.objects.visible_to(user).query)
+
+        assert sql.count('SELECT') == 1
+        assert 'DISTINCT' not in sql
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite', reason='SQLite plan')
+    @pytest.mark.parametrize('model', VISIBLE_MODELS)
+    def test_sqlite_plan(self, user, model):
+        plan = model.objects.visible_to(user).explain()
+
+        assert 'SUBQUERY' not in plan
+        assert 'SCAN' not in plan
+        assert 'SEARCH goals_boardparticipant USING' in plan
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='PostgreSQL plan')
+    @pytest.mark.parametrize('model', VISIBLE_MODELS)
+    def test_postgresql_plan(self, user, model):
+        plan = model.objects.visible_to(user).explain()
+
+        assert 'SubPlan' not in plan
+        assert 'Unique' not in plan
+
+
+@pytest.mark.django_db
+class TestDenormalisedBoard:
+
+    def test_set_on_create(self, auth_client, board, category, faker):
+        response = auth_client.post('/goals/goal/create', data={'title': faker.company(), 'category': category.pk},
+                                    format='json')
+        goal = Goal.objects.get(pk=response.json()['id'])
+        response = auth_client.post('/goals/goal_comment/create', data={'goal': goal.pk, 'text': 'text'},
+                                    format='json')
+
+        assert 'board' not in response.json()
+        assert goal.board_id == board.pk
+        assert GoalComment.objects.get(pk=response.json()['id']).board_id == board.pk
+
+    def test_set_by_batch_create(self, auth_client, board, category, faker):
+        response = auth_client.post('/goals/goal/batch_create', data=[
+            {'title': faker.company(), 'category': category.pk},
+        ], format='json')
+        goal_id = response.json()['results'][0]['id']
+        response = auth_client.post('/goals/goal_comment/batch_create', data=[
+            {'goal': goal_id, 'text': 'text'},
+        ], format='json')
+
+        assert Goal.objects.get(pk=goal_id).board_id == board.pk
+        assert GoalComment.objects.get(pk=response.json()['results'][0]['id']).board_id == board.pk
+
+    def test_goal_moves_to_category_of_another_board(self, auth_client, user, goal, goal_comment_factory,
+                                                     board_factory, goal_category_factory):
+        comment = goal_comment_factory.create(goal=goal, user=user)
+        other_board = board_factory.create(set_owner=user)
+        other_category = goal_category_factory.create(board=other_board, user=user)
+
+        auth_client.patch(f'/goals/goal/{goal.pk}', data={'category': other_category.pk}, format='json')
+
+        goal.refresh_from_db()
+        comment.refresh_from_db()
+        assert goal.board_id == comment.board_id == other_board.pk
+
+    def test_category_moves_to_another_board(self, user, category, goal, goal_comment_factory, board_factory):
+        comment = goal_comment_factory.create(goal=goal, user=user)
+        other_board = board_factory.create()
+
+        category = GoalCategory.objects.get(pk=category.pk)
+        category.board = other_board
+        category.save()
+
+        goal.refresh_from_db()
+        comment.refresh_from_db()
+        assert goal.board_id == comment.board_id == other_board.pk
+        assert not Goal.objects.visible_to(user).exists()
+
+    def test_deleted_category_leaves_board(self, user, board, category, goal, goal_comment_factory):
+        goal_comment_factory.create(goal=goal, user=user)
+        category = GoalCategory.objects.get(pk=category.pk)
+
+        category.is_deleted = True
+        category.save()
+        assert not GoalComment.objects.visible_to(user).exists()
+        assert set(Goal.objects.values_list('board_id', flat=True)) == {None}
+
+        category.is_deleted = False
+        category.save()
+        assert GoalComment.objects.visible_to(user).exists()
+        assert set(Goal.objects.values_list('board_id', flat=True)) == {board.pk}
+
+    def test_deleted_board_leaves_board(self, auth_client, user, board, goal, goal_comment_factory, inline_archival,
+                                        django_capture_on_commit_callbacks):
+        goal_comment_factory.create(goal=goal, user=user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            auth_client.delete(f'/goals/board/{board.pk}')
+
+        assert set(Goal.objects.values_list('board_id', flat=True)) == {None}
+        assert set(GoalComment.objects.values_list('board_id', flat=True)) == {None}
+
+    def test_visibility_joins_denormalised_board(self, user):
+        goal_sql = str(Goal.objects.visible_to(user).query)
+        comment_sql = str(GoalComment.objects.visible_to(user).query)
+
+        # the category is joined by its key only to hide goals of a deleted one
+        assert 'ON ("goals_goal"."board" = "goals_board"."id")' in goal_sql
+        assert 'ON ("goals_goalcomment"."board" = "goals_board"."id")' in comment_sql
+        assert '"goals_goalcategory"."board"' not in goal_sql + comment_sql
+
+    def test_backfill(self, user, board, category, goal, goal_comment_factory):
+        comment = goal_comment_factory.create(goal=goal, user=user)
+        Goal.objects.update(board=None)
+        GoalComment.objects.update(board=None)
+        backfill = importlib.import_module('goals.migrations.0011_backfill_board')
+
+        backfill.backfill_board(apps, SimpleNamespace(connection=connection))
+
+        goal.refresh_from_db()
+        comment.refresh_from_db()
+        assert goal.board_id == comment.board_id == board.pk